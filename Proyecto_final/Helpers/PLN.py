@@ -10,11 +10,19 @@ from transformers import pipeline
 import pandas as pd
 from datetime import datetime
 import re
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, Tuple, Optional, Iterator
 import warnings
+from .resumen import MotorResumen
+from .funciones import Funciones
 
 warnings.filterwarnings('ignore')
 
+# Índice aproximado (HNSW) opcional para corpus muy grandes
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
 # Descargar recursos de NLTK si no están disponibles
 try:
     nltk.download('stopwords', quiet=True)
@@ -28,7 +36,11 @@ class PLN:
     
     def __init__(self, modelo_spacy: str = 'es_core_news_lg', 
                  modelo_embeddings: str = 'paraphrase-multilingual-MiniLM-L12-v2',
-                 cargar_modelos: bool = True):
+                 cargar_modelos: bool = True,
+                 motor_resumen: Optional[MotorResumen] = None,
+                 max_caracteres_fragmento: int = 100000,
+                 n_procesos: int = 1,
+                 tam_lote_fragmentos: int = 4):
         """
         Inicializa la clase PLN con los modelos necesarios
         
@@ -36,12 +48,30 @@ class PLN:
             modelo_spacy: Nombre del modelo de spaCy a cargar
             modelo_embeddings: Nombre del modelo de SentenceTransformer
             cargar_modelos: Si True, carga los modelos al inicializar (puede tardar)
+            motor_resumen: MotorResumen entrenado sobre el corpus (opcional). Si se
+                indica, generar_resumen() usa sus pesos IDF en lugar de ajustar
+                un TF-IDF nuevo por documento
+            max_caracteres_fragmento: Los textos más largos se procesan por fragmentos
+                (páginas/párrafos) para no superar nlp.max_length ni disparar la memoria
+            n_procesos: Procesos de spaCy para los fragmentos de un documento largo
+            tam_lote_fragmentos: Fragmentos por lote en nlp.pipe()
         """
         self.modelo_spacy_nombre = modelo_spacy
         self.modelo_embeddings_nombre = modelo_embeddings
         self.nlp = None
         self.model_embeddings = None
         self.stopwords_es = None
+        self.motor_resumen = motor_resumen
+        self._pipelines = {}
+        self.max_caracteres_fragmento = max_caracteres_fragmento
+        self.n_procesos = n_procesos
+        self.tam_lote_fragmentos = tam_lote_fragmentos
+        
+        # Corpus de embeddings normalizados para vecinos_semanticos()
+        self.corpus_embeddings = None
+        self.corpus_ids = []
+        self._posiciones_corpus = {}
+        self.indice_aproximado = None
         
         if cargar_modelos:
             self._cargar_modelos()
@@ -76,6 +106,95 @@ class PLN:
             nltk.download('stopwords', quiet=True)
             self.stopwords_es = set(stopwords.words('spanish'))
     
+    def _procesar(self, texto: str) -> Iterator[Tuple[int, 'spacy.tokens.Doc']]:
+        """
+        Procesa el texto con spaCy. Si es largo, lo divide en fragmentos por
+        páginas/párrafos y los procesa por lotes con nlp.pipe(), de modo que
+        solo hay un lote de Docs en memoria a la vez.
+        
+        Args:
+            texto: Texto a procesar
+            
+        Returns:
+            Iterador de tuplas (offset del fragmento en el texto, Doc)
+        """
+        if not self.nlp:
+            raise ValueError("Modelo de spaCy no está cargado. Llama a _cargar_modelos() primero.")
+        
+        if len(texto) <= self.max_caracteres_fragmento:
+            yield 0, self.nlp(texto)
+            return
+        
+        fragmentos = Funciones.dividir_en_fragmentos(texto, self.max_caracteres_fragmento)
+        docs = self.nlp.pipe(
+            (fragmento for _, fragmento in fragmentos),
+            batch_size=self.tam_lote_fragmentos,
+            n_process=self.n_procesos
+        )
+        for (offset, _), doc in zip(fragmentos, docs):
+            yield offset, doc
+    
+    def _tokens(self, texto: str):
+        """Tokens de todo el texto, fragmento a fragmento"""
+        for _, doc in self._procesar(texto):
+            yield from doc
+    
+    def _entidades(self, texto: str):
+        """Entidades de todo el texto, fragmento a fragmento"""
+        for _, doc in self._procesar(texto):
+            yield from doc.ents
+    
+    def _oraciones(self, texto: str):
+        """Oraciones de todo el texto, fragmento a fragmento"""
+        for _, doc in self._procesar(texto):
+            yield from doc.sents
+    
+    def analizar_documento(self, texto: str) -> Dict:
+        """
+        Analiza un documento (de cualquier longitud) en una sola pasada de spaCy
+        y combina los resultados de todos sus fragmentos con offsets globales.
+        
+        Args:
+            texto: Texto completo del documento
+            
+        Returns:
+            Diccionario con:
+              - entidades: lista de {texto, tipo, inicio, fin}
+              - conteo_terminos: Counter de lemas relevantes
+              - oraciones: lista de {texto, inicio, fin}
+        """
+        entidades = []
+        conteo_terminos = Counter()
+        oraciones = []
+        
+        for offset, doc in self._procesar(texto):
+            for ent in doc.ents:
+                entidades.append({
+                    'texto': ent.text,
+                    'tipo': ent.label_,
+                    'inicio': offset + ent.start_char,
+                    'fin': offset + ent.end_char
+                })
+            
+            for sent in doc.sents:
+                oraciones.append({
+                    'texto': sent.text.strip(),
+                    'inicio': offset + sent.start_char,
+                    'fin': offset + sent.end_char
+                })
+            
+            conteo_terminos.update(
+                token.lemma_.lower() for token in doc
+                if (not token.is_stop and not token.is_punct and not token.is_space and
+                    len(token.text) > 3 and token.pos_ in ['NOUN', 'PROPN', 'ADJ', 'VERB'])
+            )
+        
+        return {
+            'entidades': entidades,
+            'conteo_terminos': conteo_terminos,
+            'oraciones': oraciones
+        }
+    
     def extraer_entidades(self, texto: str) -> Dict[str, List[str]]:
         """
         Extrae entidades nombradas del texto usando spaCy.
@@ -89,8 +208,6 @@ class PLN:
         if not self.nlp:
             raise ValueError("Modelo de spaCy no está cargado. Llama a _cargar_modelos() primero.")
         
-        doc = self.nlp(texto)
-        
         entidades = {
             'personas': [],
             'lugares': [],
@@ -100,7 +217,7 @@ class PLN:
             'otros': []
         }
         
-        for ent in doc.ents:
+        for ent in self._entidades(texto):
             if ent.label_ == 'PER':
                 entidades['personas'].append(ent.text)
             elif ent.label_ == 'LOC':
@@ -134,12 +251,12 @@ class PLN:
         if not self.nlp:
             raise ValueError("Modelo de spaCy no está cargado. Llama a _cargar_modelos() primero.")
         
-        doc = self.nlp(texto)
+        tokens = self._tokens(texto)
         
         # Filtrar stopwords y tokens no relevantes
         palabras_relevantes = []
         
-        for token in doc:
+        for token in tokens:
             if (not token.is_stop and
                 not token.is_punct and
                 not token.is_space and
@@ -174,8 +291,7 @@ class PLN:
         if not self.nlp:
             raise ValueError("Modelo de spaCy no está cargado. Llama a _cargar_modelos() primero.")
         
-        doc = self.nlp(texto)
-        oraciones = [sent.text.strip() for sent in doc.sents if len(sent.text.strip()) > 20]
+        oraciones = [sent.text.strip() for sent in self._oraciones(texto) if len(sent.text.strip()) > 20]
         
         if len(oraciones) <= num_oraciones:
             return ' '.join(oraciones)
@@ -183,6 +299,12 @@ class PLN:
         if len(oraciones) == 0:
             return texto[:200] + "..." if len(texto) > 200 else texto
         
+        # Con un motor entrenado sobre el corpus basta con transformar las oraciones
+        if self.motor_resumen is not None and self.motor_resumen.entrenado:
+            puntuaciones = self.motor_resumen.puntuar_oraciones(oraciones)
+            indices_importantes = sorted(np.argpartition(-puntuaciones, num_oraciones - 1)[:num_oraciones])
+            return ' '.join([oraciones[i] for i in indices_importantes])
+        
         # Calcular importancia usando TF-IDF
         try:
             vectorizer = TfidfVectorizer(stop_words=list(self.stopwords_es))
@@ -206,6 +328,7 @@ class PLN:
         """
         Calcula similitud semántica usando embeddings de transformers.
         Método más avanzado que captura mejor el significado.
+        Construye la matriz completa N×N: para corpus grandes usar vecinos_semanticos().
         
         Args:
             textos: Lista de textos a comparar
@@ -234,6 +357,137 @@ class PLN:
         
         return df
     
+    def calcular_embeddings(self, textos: List[str], batch_size: int = 64) -> np.ndarray:
+        """
+        Calcula embeddings normalizados (norma L2 = 1) para una lista de textos.
+        Con vectores normalizados el producto punto equivale a la similitud del coseno.
+        
+        Args:
+            textos: Lista de textos
+            batch_size: Tamaño de lote para el modelo de embeddings
+            
+        Returns:
+            Matriz float32 de forma (len(textos), dimensión)
+        """
+        if not self.model_embeddings:
+            raise ValueError("Modelo de embeddings no está cargado. Llama a _cargar_modelos() primero.")
+        
+        embeddings = self.model_embeddings.encode(
+            textos,
+            batch_size=batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True
+        )
+        return np.asarray(embeddings, dtype=np.float32)
+    
+    def indexar_corpus_semantico(self, textos: List[str], ids: List[str] = None,
+                                 indice_aproximado: bool = False,
+                                 batch_size: int = 64) -> int:
+        """
+        Calcula una sola vez los embeddings normalizados del corpus para
+        consultas posteriores con vecinos_semanticos().
+        
+        Args:
+            textos: Textos del corpus (p.ej. resumen o inicio de cada resolución)
+            ids: Identificadores de cada texto (p.ej. pdf_id). Por defecto, su posición
+            indice_aproximado: Si True y faiss está instalado, construye un índice HNSW
+            batch_size: Tamaño de lote para el modelo de embeddings
+            
+        Returns:
+            Número de documentos indexados
+        """
+        if ids is None:
+            ids = [str(i) for i in range(len(textos))]
+        
+        if len(ids) != len(textos):
+            raise ValueError("textos e ids deben tener la misma longitud")
+        
+        self.corpus_embeddings = self.calcular_embeddings(textos, batch_size=batch_size)
+        self.corpus_ids = list(ids)
+        self._posiciones_corpus = {doc_id: i for i, doc_id in enumerate(self.corpus_ids)}
+        self.indice_aproximado = None
+        
+        if indice_aproximado:
+            if faiss is None:
+                print("Advertencia: faiss no está instalado, se usará búsqueda exacta por bloques")
+            else:
+                indice = faiss.IndexHNSWFlat(self.corpus_embeddings.shape[1], 32,
+                                             faiss.METRIC_INNER_PRODUCT)
+                indice.add(self.corpus_embeddings)
+                self.indice_aproximado = indice
+        
+        return len(self.corpus_ids)
+    
+    def vecinos_semanticos(self, textos_o_ids: List[str], k: int = 5,
+                           tam_bloque: int = 2048,
+                           usar_indice_aproximado: bool = True) -> List[List[Tuple[str, float]]]:
+        """
+        Encuentra los k documentos más similares del corpus para cada consulta,
+        sin construir la matriz completa N×N de similitudes.
+        
+        Cada elemento de textos_o_ids puede ser un id del corpus (se reutiliza su
+        embedding y se excluye a sí mismo de los resultados) o un texto libre.
+        
+        Args:
+            textos_o_ids: Lista de ids del corpus y/o textos de consulta
+            k: Número de vecinos por consulta
+            tam_bloque: Tamaño de los bloques de la multiplicación de matrices
+            usar_indice_aproximado: Usa el índice HNSW si fue construido
+            
+        Returns:
+            Lista (una por consulta) de tuplas (id, similitud) ordenadas de mayor a menor
+        """
+        if self.corpus_embeddings is None:
+            raise ValueError("No hay corpus indexado. Llama a indexar_corpus_semantico() primero.")
+        
+        if isinstance(textos_o_ids, str):
+            textos_o_ids = [textos_o_ids]
+        
+        if not textos_o_ids:
+            return []
+        
+        # Separar ids conocidos de textos libres (que sí hay que codificar)
+        posiciones_propias = np.full(len(textos_o_ids), -1, dtype=np.int64)
+        textos_nuevos = []
+        filas_nuevas = []
+        for i, elemento in enumerate(textos_o_ids):
+            posicion = self._posiciones_corpus.get(elemento)
+            if posicion is not None:
+                posiciones_propias[i] = posicion
+            else:
+                textos_nuevos.append(elemento)
+                filas_nuevas.append(i)
+        
+        consultas = np.empty((len(textos_o_ids), self.corpus_embeddings.shape[1]), dtype=np.float32)
+        ids_conocidos = posiciones_propias >= 0
+        consultas[ids_conocidos] = self.corpus_embeddings[posiciones_propias[ids_conocidos]]
+        if textos_nuevos:
+            consultas[filas_nuevas] = self.calcular_embeddings(textos_nuevos)
+        
+        k = min(k, len(self.corpus_ids) - (1 if ids_conocidos.any() else 0))
+        if k <= 0:
+            return [[] for _ in textos_o_ids]
+        
+        if usar_indice_aproximado and self.indice_aproximado is not None:
+            # Se pide un vecino extra por si aparece el propio documento
+            similitudes, indices = self.indice_aproximado.search(consultas, k + 1)
+            resultados = []
+            for fila in range(len(consultas)):
+                vecinos = [
+                    (self.corpus_ids[j], float(sim))
+                    for j, sim in zip(indices[fila], similitudes[fila])
+                    if j >= 0 and j != posiciones_propias[fila]
+                ]
+                resultados.append(vecinos[:k])
+            return resultados
+        
+        indices, similitudes = _top_k_por_bloques(consultas, self.corpus_embeddings, k,
+                                                  tam_bloque, posiciones_propias)
+        return [
+            [(self.corpus_ids[j], float(sim)) for j, sim in zip(indices[fila], similitudes[fila])]
+            for fila in range(len(consultas))
+        ]
+    
     def preprocesar_texto(self, texto: str, 
                           remover_stopwords: bool = True,
                           lematizar: bool = True,
@@ -255,10 +509,10 @@ class PLN:
         if not self.nlp:
             raise ValueError("Modelo de spaCy no está cargado. Llama a _cargar_modelos() primero.")
         
-        doc = self.nlp(texto)
+        tokens = self._tokens(texto)
         palabras_procesadas = []
         
-        for token in doc:
+        for token in tokens:
             # Filtrar por longitud
             if len(token.text) < min_longitud:
                 continue
@@ -297,9 +551,13 @@ class PLN:
             Diccionario con el análisis de sentimiento
         """
         try:
-            classifier = pipeline('sentiment-analysis', 
-                                model=modelo,
-                                tokenizer=modelo)
+            # El pipeline se crea una sola vez por modelo y se reutiliza
+            classifier = self._pipelines.get(modelo)
+            if classifier is None:
+                classifier = pipeline('sentiment-analysis', 
+                                    model=modelo,
+                                    tokenizer=modelo)
+                self._pipelines[modelo] = classifier
             resultado = classifier(texto)
             return {
                 'sentimiento': resultado[0]['label'],
@@ -326,10 +584,10 @@ class PLN:
         if not self.nlp:
             raise ValueError("Modelo de spaCy no está cargado. Llama a _cargar_modelos() primero.")
         
-        doc = self.nlp(texto)
+        tokens = self._tokens(texto)
         nombres_propios = []
         
-        for token in doc:
+        for token in tokens:
             if token.pos_ == 'PROPN' and len(token.text) > 2:
                 nombres_propios.append(token.text)
         
@@ -350,8 +608,7 @@ class PLN:
         if not self.nlp:
             raise ValueError("Modelo de spaCy no está cargado. Llama a _cargar_modelos() primero.")
         
-        doc = self.nlp(texto)
-        palabras = [token.text.lower() for token in doc 
+        palabras = [token.text.lower() for token in self._tokens(texto) 
                    if not token.is_punct and not token.is_space and not token.is_stop]
         
         if unicas:
@@ -364,3 +621,53 @@ class PLN:
         # pero podemos agregar limpieza aquí si es necesario
         pass
 
+
+def _top_k_por_bloques(consultas: np.ndarray, corpus: np.ndarray, k: int,
+                       tam_bloque: int = 2048,
+                       excluir: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Calcula los k mayores productos punto de cada consulta contra el corpus
+    procesando bloques de tamaño fijo. La memoria usada es O(tam_bloque² + n·k)
+    en lugar de O(n²).
+    
+    Args:
+        consultas: Matriz (m, d) de embeddings normalizados
+        corpus: Matriz (n, d) de embeddings normalizados
+        k: Número de vecinos por fila
+        tam_bloque: Filas/columnas por bloque
+        excluir: Para cada consulta, posición del corpus a ignorar (-1 = ninguna)
+        
+    Returns:
+        Tupla (indices, similitudes), ambas de forma (m, k), ordenadas de mayor a menor
+    """
+    m, n = consultas.shape[0], corpus.shape[0]
+    mejores_sim = np.full((m, k), -np.inf, dtype=np.float32)
+    mejores_idx = np.full((m, k), -1, dtype=np.int64)
+    
+    for inicio_f in range(0, m, tam_bloque):
+        fin_f = min(inicio_f + tam_bloque, m)
+        bloque_consultas = consultas[inicio_f:fin_f]
+        
+        for inicio_c in range(0, n, tam_bloque):
+            fin_c = min(inicio_c + tam_bloque, n)
+            sims = bloque_consultas @ corpus[inicio_c:fin_c].T
+            
+            if excluir is not None:
+                propias = excluir[inicio_f:fin_f]
+                filas = np.nonzero((propias >= inicio_c) & (propias < fin_c))[0]
+                sims[filas, propias[filas] - inicio_c] = -np.inf
+            
+            # Unir el top-k acumulado con el bloque actual y volver a recortar
+            candidatos_sim = np.concatenate([mejores_sim[inicio_f:fin_f], sims], axis=1)
+            candidatos_idx = np.concatenate([
+                mejores_idx[inicio_f:fin_f],
+                np.broadcast_to(np.arange(inicio_c, fin_c), sims.shape)
+            ], axis=1)
+            
+            top = np.argpartition(-candidatos_sim, k - 1, axis=1)[:, :k]
+            mejores_sim[inicio_f:fin_f] = np.take_along_axis(candidatos_sim, top, axis=1)
+            mejores_idx[inicio_f:fin_f] = np.take_along_axis(candidatos_idx, top, axis=1)
+    
+    orden = np.argsort(-mejores_sim, axis=1)
+    return (np.take_along_axis(mejores_idx, orden, axis=1),
+            np.take_along_axis(mejores_sim, orden, axis=1))
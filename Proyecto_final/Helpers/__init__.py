@@ -1,7 +1,22 @@
 from .mongoDB import MongoDB
 from .funciones import Funciones
+from .cacheExtraccion import CacheExtraccion
+from .corpusEmpaquetado import CorpusEmpaquetado
+from .metadatosParquet import AlmacenMetadatos
 from .elastic import ElasticSearch
+from .fronteraRastreo import FronteraRastreo
+from .limitadorHosts import LimitadorHosts
+from .gestorDescargas import GestorDescargas
+from .cacheHTTP import CacheHTTP
 from .webScraping import WebScraping
+from .gacetaANLA import GacetaANLA
+from .duplicados import DetectorDuplicados
+from .resumen import MotorResumen
+from .temas import AgrupadorTemas
+from .servidorPLN import ServidorPLN, ClientePLN
+from .enriquecimiento import EnriquecedorPLN
+from .gestorCargas import GestorCargas
+from .espaciosTrabajo import EspaciosTrabajo
 #from .PLN import PLN
 #__all__ = ['MongoDB', 'Funciones', 'ElasticSearch', 'WebScraping']
-__all__ = ['MongoDB', 'Funciones', 'ElasticSearch', 'WebScraping', 'PLN']
\ No newline at end of file
+__all__ = ['MongoDB', 'Funciones', 'CacheExtraccion', 'CorpusEmpaquetado', 'AlmacenMetadatos', 'ElasticSearch', 'FronteraRastreo', 'LimitadorHosts', 'GestorDescargas', 'CacheHTTP', 'WebScraping', 'GacetaANLA', 'PLN', 'DetectorDuplicados', 'MotorResumen', 'AgrupadorTemas', 'ServidorPLN', 'ClientePLN', 'EnriquecedorPLN', 'GestorCargas', 'EspaciosTrabajo']
\ No newline at end of file
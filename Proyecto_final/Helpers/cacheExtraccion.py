@@ -0,0 +1,98 @@
+import os
+import gzip
+import json
+import hashlib
+import tempfile
+from typing import Dict, Optional
+
+# Carpeta por defecto de la caché (vacía = caché desactivada)
+CACHE_EXTRACCION_DIR = os.getenv('CACHE_EXTRACCION_DIR', os.path.join('Data', 'cache_extraccion'))
+
+
+class CacheExtraccion:
+    """
+    Caché en disco del texto extraído de PDFs, direccionada por contenido.
+
+    La clave es el SHA-256 de los bytes del PDF: el mismo archivo descargado
+    o subido otra vez (con cualquier nombre) reutiliza la extracción anterior
+    y solo cuesta leerlo una vez para calcular el hash. Cada entrada es un
+    JSON comprimido con gzip con el texto por página, el método y los tiempos.
+    """
+
+    def __init__(self, directorio: str = None):
+        """
+        Inicializa la caché
+
+        Args:
+            directorio: Carpeta de la caché (por defecto CACHE_EXTRACCION_DIR)
+        """
+        self.directorio = directorio or CACHE_EXTRACCION_DIR
+
+    @staticmethod
+    def sha256_archivo(ruta: str, tam_bloque: int = 1 << 20) -> str:
+        """
+        Calcula el SHA-256 de un archivo leyéndolo por bloques
+
+        Args:
+            ruta: Ruta del archivo
+            tam_bloque: Bytes leídos en cada lectura
+
+        Returns:
+            Hash en hexadecimal
+        """
+        sha = hashlib.sha256()
+        with open(ruta, 'rb') as f:
+            for bloque in iter(lambda: f.read(tam_bloque), b''):
+                sha.update(bloque)
+        return sha.hexdigest()
+
+    def _ruta(self, sha: str) -> str:
+        # Subcarpetas por los dos primeros caracteres para no llenar un solo directorio
+        return os.path.join(self.directorio, sha[:2], f"{sha}.json.gz")
+
+    def obtener(self, sha: str) -> Optional[Dict]:
+        """
+        Lee la entrada de un PDF
+
+        Args:
+            sha: SHA-256 del PDF
+
+        Returns:
+            La entrada guardada, o None si no existe o está dañada
+        """
+        ruta = self._ruta(sha)
+        if not os.path.exists(ruta):
+            return None
+        try:
+            with gzip.open(ruta, 'rt', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"Error al leer caché de extracción {ruta}: {e}")
+            return None
+
+    def guardar(self, sha: str, entrada: Dict) -> bool:
+        """
+        Guarda la entrada de un PDF (escritura atómica: archivo temporal + rename)
+
+        Args:
+            sha: SHA-256 del PDF
+            entrada: Datos de la extracción (paginas_texto, ocr, tiempos...)
+
+        Returns:
+            True si se guardó correctamente
+        """
+        ruta = self._ruta(sha)
+        try:
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta), suffix='.tmp')
+            try:
+                with os.fdopen(descriptor, 'wb') as f, gzip.GzipFile(fileobj=f, mode='wb') as gz:
+                    gz.write(json.dumps(entrada, ensure_ascii=False).encode('utf-8'))
+                os.replace(temporal, ruta)
+            except Exception:
+                os.unlink(temporal)
+                raise
+            return True
+        except Exception as e:
+            print(f"Error al guardar caché de extracción {ruta}: {e}")
+            return False
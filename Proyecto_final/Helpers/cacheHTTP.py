@@ -0,0 +1,227 @@
+import os
+import gzip
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+# Carpeta por defecto de la caché HTTP (WebScraping la usa con SCRAPING_CACHE=1 o en modo offline)
+CACHE_HTTP_DIR = os.getenv('CACHE_HTTP_DIR', os.path.join('Data', 'cache_http'))
+
+# Respuestas que se guardan: las redirecciones también, para poder repetir offline
+# un rastreo que pasó por ellas (la sesión sigue el Location desde la caché)
+_ESTADOS_CACHEABLES = {200, 301, 302, 303, 307, 308}
+
+# Cabeceras que no se guardan: el cuerpo se guarda ya descomprimido y completo
+_CABECERAS_EXCLUIDAS = {'content-encoding', 'transfer-encoding', 'content-length', 'connection'}
+
+
+class CacheHTTP(HTTPAdapter):
+    """
+    Adaptador de requests con caché en disco de las respuestas GET.
+
+    Se monta en la sesión (session.mount) y funciona para cualquier código
+    que use esa sesión. Una respuesta guardada se revalida con el servidor
+    (If-None-Match / If-Modified-Since): si responde 304 se devuelve la copia
+    local sin volver a transferir la página. Cada entrada es un gzip con la
+    cabecera JSON y el cuerpo; cuando la caché supera max_mb se eliminan las
+    entradas usadas hace más tiempo.
+
+    En modo offline no se hace ninguna petición: se responde desde la caché y
+    las URLs no guardadas fallan con ConnectionError (repetir un rastreo sin red).
+
+    Las peticiones con stream=True (descargas de PDFs) no pasan por la caché:
+    GestorDescargas ya hace sus propias peticiones condicionales.
+    """
+
+    def __init__(self, directorio: str = None, max_mb: float = 512, max_edad: float = 0,
+                 offline: bool = False, **kwargs):
+        """
+        Inicializa el adaptador
+
+        Args:
+            directorio: Carpeta de la caché (por defecto CACHE_HTTP_DIR)
+            max_mb: Tamaño máximo de la caché en disco
+            max_edad: Segundos durante los que una entrada se usa sin revalidar (0 = siempre revalida)
+            offline: Responder solo desde la caché, sin red
+            **kwargs: Argumentos de HTTPAdapter (pool_connections, pool_maxsize...)
+        """
+        super().__init__(**kwargs)
+        self.directorio = directorio or CACHE_HTTP_DIR
+        self.max_bytes = max_mb * 1024 * 1024
+        self.max_edad = max_edad
+        self.offline = offline
+        self.estadisticas = {'aciertos': 0, 'revalidadas': 0, 'fallos': 0}
+
+        self._lock = threading.Lock()
+        self._total_bytes: Optional[int] = None
+
+    @staticmethod
+    def _clave(url: str) -> str:
+        return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+    def _ruta(self, clave: str) -> str:
+        return os.path.join(self.directorio, clave[:2], f"{clave}.gz")
+
+    def _leer(self, url: str) -> Optional[Dict]:
+        ruta = self._ruta(self._clave(url))
+        try:
+            with gzip.open(ruta, 'rb') as f:
+                cabecera, cuerpo = f.read().split(b'\n', 1)
+            entrada = json.loads(cabecera)
+            entrada['cuerpo'] = cuerpo
+            return entrada
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Error al leer caché HTTP de {url}: {e}")
+            return None
+
+    def _guardar(self, url: str, respuesta: requests.Response):
+        cabeceras = {k: v for k, v in respuesta.headers.items()
+                     if k.lower() not in _CABECERAS_EXCLUIDAS}
+        entrada = {'url': url, 'estado': respuesta.status_code, 'razon': respuesta.reason,
+                   'cabeceras': cabeceras, 'guardada': time.time()}
+        self._escribir(url, entrada, respuesta.content)
+
+    def _escribir(self, url: str, entrada: Dict, cuerpo: bytes):
+        """Escribe una entrada (escritura atómica: archivo temporal + rename)"""
+        ruta = self._ruta(self._clave(url))
+        try:
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            anterior = os.path.getsize(ruta) if os.path.exists(ruta) else 0
+            descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta), suffix='.tmp')
+            try:
+                with os.fdopen(descriptor, 'wb') as f, gzip.GzipFile(fileobj=f, mode='wb') as gz:
+                    metadatos = {k: v for k, v in entrada.items() if k != 'cuerpo'}
+                    gz.write(json.dumps(metadatos, ensure_ascii=False).encode('utf-8'))
+                    gz.write(b'\n')
+                    gz.write(cuerpo)
+                os.replace(temporal, ruta)
+            except Exception:
+                os.unlink(temporal)
+                raise
+            self._sumar(os.path.getsize(ruta) - anterior)
+        except Exception as e:
+            print(f"Error al guardar caché HTTP de {url}: {e}")
+
+    def _sumar(self, delta: int):
+        """Actualiza el tamaño total y, si se supera max_mb, elimina las entradas menos usadas"""
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(e['bytes'] for e in self._entradas())
+            else:
+                self._total_bytes += delta
+            if self._total_bytes <= self.max_bytes:
+                return
+
+            # Se deja margen (90 %) para no desalojar en cada escritura
+            objetivo = self.max_bytes * 0.9
+            for entrada in sorted(self._entradas(), key=lambda e: e['uso']):
+                if self._total_bytes <= objetivo:
+                    break
+                try:
+                    os.remove(entrada['ruta'])
+                    self._total_bytes -= entrada['bytes']
+                except OSError:
+                    pass
+
+    def _entradas(self):
+        if not os.path.isdir(self.directorio):
+            return []
+        entradas = []
+        for carpeta, _, archivos in os.walk(self.directorio):
+            for archivo in archivos:
+                if not archivo.endswith('.gz'):
+                    continue
+                ruta = os.path.join(carpeta, archivo)
+                try:
+                    estado = os.stat(ruta)
+                except OSError:
+                    continue
+                entradas.append({'ruta': ruta, 'bytes': estado.st_size, 'uso': estado.st_mtime})
+        return entradas
+
+    def _respuesta(self, entrada: Dict, request: requests.PreparedRequest) -> requests.Response:
+        """Arma una Response de requests a partir de una entrada de la caché"""
+        respuesta = requests.Response()
+        respuesta.status_code = entrada['estado']
+        respuesta.reason = entrada.get('razon')
+        respuesta.headers = CaseInsensitiveDict(entrada['cabeceras'])
+        respuesta.headers['Content-Length'] = str(len(entrada['cuerpo']))
+        respuesta.encoding = get_encoding_from_headers(respuesta.headers)
+        respuesta.url = entrada['url']
+        respuesta.request = request
+        respuesta._content = entrada['cuerpo']
+        respuesta._content_consumed = True
+        respuesta.from_cache = True
+        respuesta.connection = self
+        # LRU: la fecha de modificación del archivo es la del último uso
+        try:
+            os.utime(self._ruta(self._clave(entrada['url'])))
+        except OSError:
+            pass
+        return respuesta
+
+    def sirve_sin_red(self, url: str) -> bool:
+        """Indica si un GET a la URL se responderá sin contactar al servidor"""
+        if self.offline:
+            return True
+        if self.max_edad <= 0:
+            return False
+        entrada = self._leer(url)
+        return entrada is not None and time.time() - entrada['guardada'] < self.max_edad
+
+    def send(self, request: requests.PreparedRequest, stream: bool = False, **kwargs) -> requests.Response:
+        # Solo GET completos y sin cabeceras condicionales propias del llamador
+        cacheable = (request.method == 'GET' and not stream
+                     and not any(h in request.headers for h in ('Range', 'If-None-Match', 'If-Modified-Since')))
+
+        if not cacheable:
+            if self.offline:
+                raise requests.exceptions.ConnectionError(f"Modo offline: {request.url} no está en caché")
+            return super().send(request, stream=stream, **kwargs)
+
+        url = request.url
+        entrada = self._leer(url)
+
+        if self.offline:
+            if entrada is None:
+                raise requests.exceptions.ConnectionError(f"Modo offline: {url} no está en caché")
+            self.estadisticas['aciertos'] += 1
+            return self._respuesta(entrada, request)
+
+        if entrada is not None and time.time() - entrada['guardada'] < self.max_edad:
+            self.estadisticas['aciertos'] += 1
+            return self._respuesta(entrada, request)
+
+        if entrada is not None:
+            cabeceras = CaseInsensitiveDict(entrada['cabeceras'])
+            if cabeceras.get('ETag'):
+                request.headers['If-None-Match'] = cabeceras['ETag']
+            if cabeceras.get('Last-Modified'):
+                request.headers['If-Modified-Since'] = cabeceras['Last-Modified']
+
+        respuesta = super().send(request, stream=stream, **kwargs)
+
+        if respuesta.status_code == 304 and entrada is not None:
+            respuesta.close()
+            self.estadisticas['revalidadas'] += 1
+            # La entrada sigue vigente: se renueva su fecha para max_edad
+            entrada['guardada'] = time.time()
+            if self.max_edad > 0:
+                self._escribir(url, entrada, entrada['cuerpo'])
+            return self._respuesta(entrada, request)
+
+        self.estadisticas['fallos'] += 1
+        control = respuesta.headers.get('Cache-Control', '').lower()
+        if respuesta.status_code in _ESTADOS_CACHEABLES and 'no-store' not in control:
+            self._guardar(url, respuesta)
+        return respuesta
@@ -0,0 +1,254 @@
+import os
+import json
+import mmap
+import zlib
+import time
+import shutil
+import argparse
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Archivo del índice dentro de la carpeta del paquete
+ARCHIVO_INDICE = 'indice.json'
+
+# Cada empaquetado escribe sus segmentos en una carpeta de generación nueva
+PREFIJO_GENERACION = 'generacion_'
+
+# Separador para leer un documento con Funciones.leer_json: "ruta_paquete::pdf_id"
+SEPARADOR_PAQUETE = '::'
+
+
+class CorpusEmpaquetado:
+    """
+    Corpus empaquetado: los JSON de una carpeta (p.ej. Data/ANLA_json) en
+    pocos archivos de segmento, con cada documento comprimido por separado
+    con zlib, y un índice pdf_id -> (segmento, offset, longitud).
+
+    Los segmentos se leen con mmap: leer un documento es tomar un slice,
+    descomprimirlo y parsearlo, sin abrir un archivo ni listar la carpeta.
+    Recorrer todo el corpus es una lectura secuencial de pocos archivos.
+
+    Reempaquetar no modifica los segmentos en uso: escribe una generación
+    nueva y reemplaza el índice al final. Un paquete ya abierto sigue leyendo
+    su generación (abre todos sus segmentos al crearse, así borrarlos después
+    no le afecta).
+    """
+
+    def __init__(self, ruta: str):
+        """
+        Abre un paquete existente
+
+        Args:
+            ruta: Carpeta del paquete (contiene indice.json y los segmentos)
+        """
+        self.ruta = ruta
+        self._archivos: List = []
+        self._mapas: Dict[int, mmap.mmap] = {}
+        for intento in range(2):
+            with open(os.path.join(ruta, ARCHIVO_INDICE), 'r', encoding='utf-8') as f:
+                datos = json.load(f)
+            self.segmentos: List[str] = datos['segmentos']
+            self.indice: Dict[str, List] = datos['documentos']
+            try:
+                self._archivos = [open(os.path.join(ruta, segmento), 'rb')
+                                  for segmento in self.segmentos]
+                break
+            except FileNotFoundError:
+                # Se reempaquetó entre leer el índice y abrir los segmentos
+                self.cerrar()
+                if intento:
+                    raise
+
+    @staticmethod
+    def es_paquete(ruta: str) -> bool:
+        """Indica si una carpeta es un corpus empaquetado"""
+        return os.path.isfile(os.path.join(ruta, ARCHIVO_INDICE))
+
+    def _mapa(self, segmento: int) -> mmap.mmap:
+        if segmento not in self._mapas:
+            self._mapas[segmento] = mmap.mmap(self._archivos[segmento].fileno(), 0,
+                                              access=mmap.ACCESS_READ)
+        return self._mapas[segmento]
+
+    def __len__(self) -> int:
+        return len(self.indice)
+
+    def __contains__(self, doc_id) -> bool:
+        return str(doc_id) in self.indice
+
+    def ids(self) -> List[str]:
+        """Ids de los documentos en el orden en que están en los segmentos"""
+        return list(self.indice)
+
+    def leer(self, doc_id) -> Optional[Dict]:
+        """
+        Lee un documento por su id
+
+        Args:
+            doc_id: pdf_id del documento
+
+        Returns:
+            El documento, o None si no está en el paquete
+        """
+        entrada = self.indice.get(str(doc_id))
+        if entrada is None:
+            return None
+        segmento, offset, longitud = entrada[0], entrada[1], entrada[2]
+        datos = self._mapa(segmento)[offset:offset + longitud]
+        return json.loads(zlib.decompress(datos))
+
+    def iterar(self) -> Iterator[Tuple[str, Dict]]:
+        """
+        Recorre todos los documentos en orden de segmento (lectura secuencial)
+
+        Returns:
+            Generador de tuplas (doc_id, documento)
+        """
+        for doc_id in self.indice:
+            yield doc_id, self.leer(doc_id)
+
+    def nombre_archivo(self, doc_id) -> Optional[str]:
+        """Nombre del JSON original del documento"""
+        entrada = self.indice.get(str(doc_id))
+        return entrada[3] if entrada else None
+
+    def cerrar(self):
+        """Libera los mmap y los archivos de segmento"""
+        for mapa in self._mapas.values():
+            mapa.close()
+        for archivo in self._archivos:
+            archivo.close()
+        self._mapas = {}
+        self._archivos = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.cerrar()
+
+    @staticmethod
+    def empaquetar(json_dir: str, destino: str, tam_segmento_mb: int = 256,
+                   nivel_compresion: int = 6) -> Dict:
+        """
+        Convierte una carpeta de JSON (uno por documento) en un paquete
+
+        Si destino ya es un paquete, los segmentos nuevos van a otra carpeta de
+        generación, el índice se reemplaza al final (os.replace) y luego se
+        borran los segmentos de las generaciones anteriores.
+
+        Args:
+            json_dir: Carpeta con los JSON
+            destino: Carpeta del paquete (se crea si no existe)
+            tam_segmento_mb: Tamaño máximo aproximado de cada segmento
+            nivel_compresion: Nivel de zlib (1 = rápido, 9 = más compacto)
+
+        Returns:
+            Diccionario con documentos, segmentos y bytes antes/después
+        """
+        os.makedirs(destino, exist_ok=True)
+        tam_segmento = tam_segmento_mb * 1024 * 1024
+        generacion = f"{PREFIJO_GENERACION}{time.time_ns():x}"
+        os.makedirs(os.path.join(destino, generacion))
+
+        segmentos: List[str] = []
+        documentos: Dict[str, List] = {}
+        bytes_originales = 0
+        bytes_paquete = 0
+        archivo_segmento = None
+        offset = 0
+
+        try:
+            for fname in sorted(os.listdir(json_dir)):
+                if not fname.lower().endswith('.json'):
+                    continue
+
+                ruta = os.path.join(json_dir, fname)
+                with open(ruta, 'r', encoding='utf-8') as f:
+                    doc = json.load(f)
+                bytes_originales += os.path.getsize(ruta)
+
+                # Mismo id que usa indexar_json_anla
+                doc_id = str(doc.get('pdf_id', os.path.splitext(fname)[0]))
+                comprimido = zlib.compress(
+                    json.dumps(doc, ensure_ascii=False, separators=(',', ':')).encode('utf-8'),
+                    nivel_compresion
+                )
+
+                if archivo_segmento is None or offset + len(comprimido) > tam_segmento:
+                    if archivo_segmento is not None:
+                        archivo_segmento.close()
+                    segmentos.append(f"{generacion}/segmento_{len(segmentos):05d}.bin")
+                    archivo_segmento = open(os.path.join(destino, segmentos[-1]), 'wb')
+                    offset = 0
+
+                archivo_segmento.write(comprimido)
+                documentos[doc_id] = [len(segmentos) - 1, offset, len(comprimido), fname]
+                offset += len(comprimido)
+                bytes_paquete += len(comprimido)
+        finally:
+            if archivo_segmento is not None:
+                archivo_segmento.close()
+
+        # El índice se escribe al final: un paquete a medias no se reconoce como válido
+        temporal = os.path.join(destino, ARCHIVO_INDICE + '.tmp')
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump({'version': 1, 'segmentos': segmentos, 'documentos': documentos}, f)
+        os.replace(temporal, os.path.join(destino, ARCHIVO_INDICE))
+        CorpusEmpaquetado._eliminar_generaciones(destino, generacion)
+
+        return {
+            'success': True,
+            'documentos': len(documentos),
+            'segmentos': len(segmentos),
+            'bytes_originales': bytes_originales,
+            'bytes_paquete': bytes_paquete
+        }
+
+    @staticmethod
+    def _eliminar_generaciones(destino: str, vigente: str):
+        """Borra los segmentos que el índice vigente ya no usa (incluye los del formato sin generaciones)"""
+        for nombre in os.listdir(destino):
+            ruta = os.path.join(destino, nombre)
+            try:
+                if nombre.startswith(PREFIJO_GENERACION) and nombre != vigente:
+                    shutil.rmtree(ruta)
+                elif nombre.startswith('segmento_') and nombre.endswith('.bin'):
+                    os.remove(ruta)
+            except OSError as e:
+                print(f"Error al eliminar {ruta}: {e}")
+
+    def desempaquetar(self, destino: str, indent: int = 2) -> Dict:
+        """
+        Escribe cada documento del paquete como un JSON individual (conversión inversa)
+
+        Args:
+            destino: Carpeta de salida
+            indent: Sangría de los JSON escritos
+
+        Returns:
+            Diccionario con el número de documentos escritos
+        """
+        os.makedirs(destino, exist_ok=True)
+        escritos = 0
+        for doc_id, doc in self.iterar():
+            fname = self.nombre_archivo(doc_id) or f"{doc_id}.json"
+            with open(os.path.join(destino, fname), 'w', encoding='utf-8') as f:
+                json.dump(doc, f, ensure_ascii=False, indent=indent)
+            escritos += 1
+        return {'success': True, 'documentos': escritos}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Empaqueta o desempaqueta un corpus de JSON')
+    parser.add_argument('accion', choices=['empaquetar', 'desempaquetar'])
+    parser.add_argument('origen', help='Carpeta de JSON (empaquetar) o del paquete (desempaquetar)')
+    parser.add_argument('destino')
+    parser.add_argument('--tam-segmento-mb', type=int, default=256)
+    argumentos = parser.parse_args()
+
+    if argumentos.accion == 'empaquetar':
+        print(CorpusEmpaquetado.empaquetar(argumentos.origen, argumentos.destino,
+                                           tam_segmento_mb=argumentos.tam_segmento_mb))
+    else:
+        with CorpusEmpaquetado(argumentos.origen) as paquete:
+            print(paquete.desempaquetar(argumentos.destino))
@@ -0,0 +1,227 @@
+import re
+import zlib
+import unicodedata
+from collections import defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+# Hashing multiply-shift: h(x) = ((a*x + b) mod 2^64) >> 32, con a impar.
+# Evita la operación módulo y es unas dos veces más rápido que (a*x + b) % p
+_DESPLAZAMIENTO = np.uint64(32)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_MULTIPLICADOR_SHINGLE = np.uint64(1000003)
+
+
+class DetectorDuplicados:
+    """
+    Detección de resoluciones casi idénticas con shingling + MinHash + LSH.
+
+    Cada documento se reduce a una firma MinHash de tamaño fijo; la firma se
+    divide en bandas y dos documentos son candidatos si coinciden en alguna
+    banda completa. Así se evitan las comparaciones todos contra todos y el
+    costo total es aproximadamente lineal en el número de documentos.
+
+    Un documento sin palabras (extracción fallida o vacía) no tiene shingles
+    ni firma útil: queda en un grupo propio y fuera de las cubetas.
+    """
+
+    def __init__(self, num_permutaciones: int = 128, bandas: int = 16,
+                 tam_shingle: int = 5, umbral: float = 0.8, semilla: int = 42,
+                 tam_lote: int = 8192):
+        """
+        Inicializa el detector
+
+        Args:
+            num_permutaciones: Tamaño de la firma MinHash
+            bandas: Número de bandas LSH (debe dividir a num_permutaciones)
+            tam_shingle: Número de palabras por shingle
+            umbral: Similitud de Jaccard estimada mínima para considerar duplicados
+            semilla: Semilla de las funciones hash (fija para que las firmas sean reproducibles)
+            tam_lote: Shingles procesados a la vez al calcular una firma (limita memoria)
+        """
+        if num_permutaciones % bandas != 0:
+            raise ValueError("bandas debe dividir exactamente a num_permutaciones")
+
+        self.num_permutaciones = num_permutaciones
+        self.bandas = bandas
+        self.filas_por_banda = num_permutaciones // bandas
+        self.tam_shingle = tam_shingle
+        self.umbral = umbral
+        self.tam_lote = tam_lote
+
+        rng = np.random.RandomState(semilla)
+        self._a = rng.randint(0, 1 << 63, size=num_permutaciones, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._b = rng.randint(0, 1 << 63, size=num_permutaciones, dtype=np.uint64)
+
+        self.firmas: Dict[str, np.ndarray] = {}
+        self._cubetas: List[Dict[bytes, List[str]]] = [defaultdict(list) for _ in range(bandas)]
+        self._padres: Dict[str, str] = {}
+
+    @staticmethod
+    def _normalizar(texto: str) -> List[str]:
+        """Minúsculas, sin acentos y separado en palabras"""
+        texto = unicodedata.normalize('NFKD', texto.lower()).encode('ascii', 'ignore').decode('ascii')
+        return re.findall(r'\w+', texto)
+
+    def _hashes_shingles(self, texto: str) -> np.ndarray:
+        """Devuelve los hashes (32 bits, sin repetir) de los shingles de palabras del texto"""
+        palabras = self._normalizar(texto or '')
+        if not palabras:
+            return np.empty(0, dtype=np.uint64)
+
+        # Cada palabra distinta se hashea una sola vez; el hash del shingle se
+        # combina de forma vectorizada en lugar de construir cada cadena con join()
+        vocabulario: Dict[str, int] = {}
+        posiciones = np.fromiter((vocabulario.setdefault(p, len(vocabulario)) for p in palabras),
+                                 dtype=np.int64, count=len(palabras))
+        hashes_vocabulario = np.fromiter((zlib.crc32(p.encode('ascii')) for p in vocabulario),
+                                         dtype=np.uint64, count=len(vocabulario))
+        hashes_palabras = hashes_vocabulario[posiciones]
+        n = min(self.tam_shingle, len(palabras))
+        total = len(palabras) - n + 1
+
+        hashes = np.zeros(total, dtype=np.uint64)
+        for j in range(n):
+            hashes = (hashes * _MULTIPLICADOR_SHINGLE + hashes_palabras[j:j + total]) & _MAX_HASH
+
+        return np.unique(hashes)
+
+    def firma(self, texto: str) -> np.ndarray:
+        """
+        Calcula la firma MinHash de un texto
+
+        Args:
+            texto: Texto a firmar (normalmente texto_completo)
+
+        Returns:
+            Arreglo uint64 de tamaño num_permutaciones
+        """
+        hashes = self._hashes_shingles(texto)
+        firma = np.full(self.num_permutaciones, _MAX_HASH, dtype=np.uint64)
+
+        for inicio in range(0, len(hashes), self.tam_lote):
+            lote = hashes[inicio:inicio + self.tam_lote, None]
+            permutados = (lote * self._a + self._b) >> _DESPLAZAMIENTO
+            np.minimum(firma, permutados.min(axis=0), out=firma)
+
+        return firma
+
+    def similitud_estimada(self, id_a: str, id_b: str) -> float:
+        """Estimación de la similitud de Jaccard entre dos documentos ya agregados"""
+        if np.all(self.firmas[id_a] == _MAX_HASH) or np.all(self.firmas[id_b] == _MAX_HASH):
+            return 0.0
+        return float(np.mean(self.firmas[id_a] == self.firmas[id_b]))
+
+    def _raiz(self, doc_id: str) -> str:
+        """Busca el representante del grupo (union-find con compresión de caminos)"""
+        raiz = doc_id
+        while self._padres[raiz] != raiz:
+            raiz = self._padres[raiz]
+        while self._padres[doc_id] != raiz:
+            self._padres[doc_id], doc_id = raiz, self._padres[doc_id]
+        return raiz
+
+    def _unir(self, id_a: str, id_b: str):
+        raiz_a, raiz_b = self._raiz(id_a), self._raiz(id_b)
+        if raiz_a != raiz_b:
+            # El menor id queda como representante para que el grupo sea estable
+            if raiz_b < raiz_a:
+                raiz_a, raiz_b = raiz_b, raiz_a
+            self._padres[raiz_b] = raiz_a
+
+    def candidatos(self, firma: np.ndarray) -> List[str]:
+        """
+        Documentos ya agregados que comparten al menos una banda con la firma
+
+        Args:
+            firma: Firma MinHash de la consulta
+
+        Returns:
+            Lista de ids candidatos (sin verificar contra el umbral)
+        """
+        encontrados = {}
+        for banda, cubetas in enumerate(self._cubetas):
+            clave = firma[banda * self.filas_por_banda:(banda + 1) * self.filas_por_banda].tobytes()
+            for doc_id in cubetas.get(clave, ()):
+                encontrados[doc_id] = True
+        return list(encontrados)
+
+    def _quitar_de_cubetas(self, doc_id: str, firma: np.ndarray):
+        for banda, cubetas in enumerate(self._cubetas):
+            clave = firma[banda * self.filas_por_banda:(banda + 1) * self.filas_por_banda].tobytes()
+            ids = cubetas.get(clave)
+            if ids and doc_id in ids:
+                ids.remove(doc_id)
+                if not ids:
+                    del cubetas[clave]
+
+    def agregar(self, doc_id: str, texto: str) -> List[str]:
+        """
+        Agrega un documento de forma incremental y lo une con sus casi-duplicados
+
+        Args:
+            doc_id: Identificador del documento (p.ej. pdf_id)
+            texto: Texto del documento
+
+        Returns:
+            Lista de ids existentes que superan el umbral de similitud
+        """
+        doc_id = str(doc_id)
+        firma = self.firma(texto)
+
+        # Agregar de nuevo el mismo doc_id reemplaza su firma: no deja entradas repetidas
+        anterior = self.firmas.get(doc_id)
+        if anterior is not None:
+            self._quitar_de_cubetas(doc_id, anterior)
+
+        # Sin shingles la firma queda en _MAX_HASH: todos los textos vacíos
+        # coincidirían entre sí, así que el documento no entra a las cubetas
+        if np.all(firma == _MAX_HASH):
+            self.firmas[doc_id] = firma
+            self._padres.setdefault(doc_id, doc_id)
+            return []
+
+        duplicados = [
+            otro for otro in self.candidatos(firma)
+            if otro != doc_id and float(np.mean(self.firmas[otro] == firma)) >= self.umbral
+        ]
+
+        self.firmas[doc_id] = firma
+        self._padres.setdefault(doc_id, doc_id)
+        for banda, cubetas in enumerate(self._cubetas):
+            clave = firma[banda * self.filas_por_banda:(banda + 1) * self.filas_por_banda].tobytes()
+            cubetas[clave].append(doc_id)
+
+        for otro in duplicados:
+            self._unir(doc_id, otro)
+
+        return duplicados
+
+    def grupos(self) -> Dict[str, str]:
+        """
+        Devuelve el id de grupo de cada documento agregado.
+        Los documentos sin duplicados forman un grupo propio (su mismo id).
+        """
+        return {doc_id: self._raiz(doc_id) for doc_id in self._padres}
+
+    def clusters(self, min_tamano: int = 2) -> List[List[str]]:
+        """Lista de grupos con al menos min_tamano documentos"""
+        miembros: Dict[str, List[str]] = defaultdict(list)
+        for doc_id, grupo in self.grupos().items():
+            miembros[grupo].append(doc_id)
+        return [sorted(ids) for ids in miembros.values() if len(ids) >= min_tamano]
+
+    def detectar(self, documentos: Iterable[Tuple[str, str]]) -> Dict[str, str]:
+        """
+        Procesa una colección de documentos y asigna grupo_duplicados a cada uno
+
+        Args:
+            documentos: Iterable de tuplas (doc_id, texto)
+
+        Returns:
+            Diccionario doc_id -> grupo_duplicados
+        """
+        for doc_id, texto in documentos:
+            self.agregar(doc_id, texto)
+        return self.grupos()
@@ -23,6 +23,15 @@ ELASTIC_PASSWORD = os.getenv("ELASTIC_PASSWORD")
 # Índice por defecto ANLA
 ELASTIC_INDEX_DEFAULT = os.getenv("ELASTIC_INDEX_DEFAULT", "anla_resoluciones")
 
+# Índice opcional de pasajes (páginas/párrafos) de las resoluciones ANLA
+ELASTIC_INDEX_PASAJES = os.getenv("ELASTIC_INDEX_PASAJES", f"{ELASTIC_INDEX_DEFAULT}_pasajes")
+
+# Dimensión del vector semántico (paraphrase-multilingual-MiniLM-L12-v2 = 384)
+ELASTIC_EMBEDDING_DIMS = int(os.getenv("ELASTIC_EMBEDDING_DIMS", "384"))
+
+# Búsqueda híbrida: candidatos de cada recuperador = factor x resultados pedidos
+ELASTIC_FACTOR_CANDIDATOS = int(os.getenv("ELASTIC_FACTOR_CANDIDATOS", "2"))
+
 
 def get_es_client() -> Elasticsearch:
     """
@@ -243,13 +252,14 @@ class ElasticSearch:
             print(f"Error al indexar documento: {e}")
             return False
     
-    def indexar_bulk(self, index: str, documentos: List[Dict]) -> Dict:
+    def indexar_bulk(self, index: str, documentos: List[Dict], ids: List[str] = None) -> Dict:
         """
         Indexa múltiples documentos de forma masiva
         
         Args:
             index: Nombre del índice
             documentos: Lista de documentos a indexar
+            ids: IDs de los documentos, en el mismo orden (opcional)
             
         Returns:
             Diccionario con estadísticas de indexación
@@ -259,11 +269,13 @@ class ElasticSearch:
         try:
             # Preparar acciones para bulk
             acciones = []
-            for doc in documentos:
+            for i, doc in enumerate(documentos):
                 accion = {
                     '_index': index,
                     '_source': doc
                 }
+                if ids:
+                    accion['_id'] = ids[i]
                 acciones.append(accion)
             
             # Ejecutar bulk
@@ -281,6 +293,50 @@ class ElasticSearch:
                 'error': str(e)
             }
     
+    def indexar_streaming(self, index: str, documentos, chunk_size: int = 500,
+                          max_errores: int = 50) -> Dict:
+        """
+        Indexa documentos a medida que llegan desde un iterable (generador),
+        sin construir la lista de acciones en memoria
+        
+        Args:
+            index: Nombre del índice
+            documentos: Iterable de documentos (dict)
+            chunk_size: Documentos por petición bulk
+            max_errores: Máximo de errores devueltos en el detalle
+            
+        Returns:
+            Diccionario con estadísticas de indexación
+        """
+        from elasticsearch.helpers import streaming_bulk
+        
+        try:
+            acciones = ({'_index': index, '_source': doc} for doc in documentos)
+            
+            indexados = 0
+            fallidos = 0
+            errores = []
+            for ok, item in streaming_bulk(self.client, acciones, chunk_size=chunk_size,
+                                           raise_on_error=False):
+                if ok:
+                    indexados += 1
+                else:
+                    fallidos += 1
+                    if len(errores) < max_errores:
+                        errores.append(item)
+            
+            return {
+                'success': True,
+                'indexados': indexados,
+                'fallidos': fallidos,
+                'errores': errores
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e)
+            }
+    
     def buscar(self, index: str, query: Dict, aggs=None, size: int = 10) -> Dict:
         """
         Realiza una búsqueda en ElasticSearch
@@ -460,22 +516,154 @@ class ElasticSearch:
 elastic = ElasticSearch(client=es_client)
 
 
-from elasticsearch.helpers import bulk
+from elasticsearch.helpers import bulk, streaming_bulk, scan
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import threading
+from .duplicados import DetectorDuplicados
+from .resumen import MotorResumen
+from .temas import AgrupadorTemas
+from .funciones import Funciones
+
+# Campos de la búsqueda por texto (BM25) en el índice ANLA
+CAMPOS_TEXTO_ANLA = [
+    "texto_completo",
+    "descripcion",
+    "empresa",
+    "empresa_normalizada",   # <<< también miramos la normalizada
+    "nombre_proyecto",
+    "nombre_proyecto_normalizado",
+    "ubicación",
+    "numero_expediente",
+    "numero_resolución"
+]
+
+# Metadatos de la resolución que se copian en cada pasaje
+CAMPOS_PADRE_PASAJE = [
+    "pdf_id", "file_name", "numero_resolución", "fecha_resolución", "anio_resolucion",
+    "nombre_proyecto", "empresa", "empresa_normalizada", "numero_expediente",
+    "descripcion", "tipos_infraccion", "tipos_infraccion_normalizados", "grupo_duplicados",
+    "tema_cluster", "tema_etiqueta"
+]
+
+# Búsqueda en pasajes: un hit por resolución con sus mejores pasajes resaltados
+COLAPSO_PASAJES_ANLA = {
+    "field": "pdf_id",
+    "inner_hits": {
+        "name": "mejores_pasajes",
+        "size": 3,
+        "_source": ["pagina", "numero_pasaje"],
+        "highlight": {
+            "encoder": "html",
+            "fields": {"texto": {"number_of_fragments": 1, "fragment_size": 200}}
+        }
+    }
+}
+RESALTADO_PASAJES_ANLA = {
+    "encoder": "html",
+    "fields": {"texto": {"number_of_fragments": 2, "fragment_size": 200}}
+}
+
+# Caché LRU de embeddings de consultas (las consultas repetidas no pasan por el modelo)
+_CACHE_EMBEDDINGS_MAX = 1024
+_cache_embeddings: "OrderedDict[str, List[float]]" = OrderedDict()
+_lock_cache_embeddings = threading.Lock()
+
+# Hilos para ejecutar en paralelo los recuperadores de la búsqueda híbrida
+_executor_busquedas = ThreadPoolExecutor(max_workers=4)
+
+# Pipeline de ingesta por defecto del índice ANLA: todo documento recibe un
+# grupo_duplicados (si no, el collapse junta en un solo grupo nulo todos los
+# documentos cargados por web scraping, ZIP o DML)
+PIPELINE_GRUPO_DUPLICADOS = "anla_grupo_duplicados"
 
 # ====================================
 # FUNCIONES ESPECÍFICAS PARA ANLA
 # ====================================
 
+def asegurar_grupo_duplicados(index_name: str = None, completar_existentes: bool = False) -> bool:
+    """
+    Instala el pipeline que asigna grupo_duplicados a los documentos que no lo
+    traen y lo deja como pipeline por defecto del índice.
+
+    Un documento sin grupo toma su pdf_id (grupo propio, igual que en
+    DetectorDuplicados); si no tiene pdf_id, una huella SHA-1 de su texto, así
+    solo se colapsan las copias exactas. Un documento sin texto toma su _id:
+    las extracciones vacías no se colapsan entre sí. Los documentos de
+    indexar_json_anla ya traen el grupo calculado con MinHash y no se modifican.
+
+    Es una operación de mantenimiento: crear_indice_anla_si_no_existe la
+    ejecuta al crear el índice y cargar_json_anla.py --completar-grupos-duplicados
+    sobre un índice existente.
+
+    Args:
+        index_name: Índice ANLA (por defecto ELASTIC_INDEX_DEFAULT)
+        completar_existentes: Asignar también el grupo a los documentos ya
+            indexados sin él (update_by_query en segundo plano en el clúster)
+
+    Returns:
+        True si el pipeline quedó activo en el índice
+    """
+    index_name = index_name or ELASTIC_INDEX_DEFAULT
+    try:
+        elastic.client.ingest.put_pipeline(
+            id=PIPELINE_GRUPO_DUPLICADOS,
+            description="Asigna grupo_duplicados a los documentos que no lo tienen",
+            processors=[
+                {"set": {
+                    "if": "ctx.grupo_duplicados == null && ctx.pdf_id != null",
+                    "field": "grupo_duplicados",
+                    "value": "{{{pdf_id}}}"
+                }},
+                {"fingerprint": {
+                    "if": ("ctx.grupo_duplicados == null && "
+                           "((ctx.texto_completo != null && ctx.texto_completo.toString().trim() != '') || "
+                           "(ctx.texto != null && ctx.texto.toString().trim() != ''))"),
+                    "fields": ["texto_completo", "texto"],
+                    "target_field": "grupo_duplicados",
+                    "ignore_missing": True
+                }},
+                {"set": {
+                    "if": "ctx.grupo_duplicados == null && ctx._id != null",
+                    "field": "grupo_duplicados",
+                    "value": "{{{_id}}}"
+                }}
+            ]
+        )
+
+        if elastic.client.indices.exists(index=index_name):
+            elastic.client.indices.put_settings(
+                index=index_name,
+                settings={"index": {"default_pipeline": PIPELINE_GRUPO_DUPLICADOS}}
+            )
+            if completar_existentes:
+                elastic.client.update_by_query(
+                    index=index_name,
+                    pipeline=PIPELINE_GRUPO_DUPLICADOS,
+                    query={"bool": {"must_not": {"exists": {"field": "grupo_duplicados"}}}},
+                    conflicts="proceed",
+                    wait_for_completion=False
+                )
+        return True
+    except Exception as e:
+        print(f"Error al configurar grupo_duplicados en {index_name}: {e}")
+        return False
+
+
 def crear_indice_anla_si_no_existe(index_name: str = None):
     """
-    Crea el índice de resoluciones ANLA con el mapping adecuado
-    si aún no existe.
+    Crea el índice de resoluciones ANLA con el mapping adecuado si aún no
+    existe, con el pipeline de grupo_duplicados como pipeline por defecto.
+    Un índice existente no se modifica (ver asegurar_grupo_duplicados).
     """
     index_name = index_name or ELASTIC_INDEX_DEFAULT
 
     if elastic.client.indices.exists(index=index_name):
         return
 
+    # El pipeline debe existir antes de referenciarlo en los settings
+    pipeline = asegurar_grupo_duplicados(index_name, completar_existentes=False)
+
     body = {
         "mappings": {
             "properties": {
@@ -509,6 +697,9 @@ def crear_indice_anla_si_no_existe(index_name: str = None):
                 "radicados":         { "type": "keyword" },
                 "descripcion":       { "type": "text" },
 
+                # Resumen extractivo calculado durante la ingesta (MotorResumen)
+                "resumen":           { "type": "text" },
+
                 # Lista legible
                 "tipos_infraccion":  { "type": "keyword" },
 
@@ -517,32 +708,76 @@ def crear_indice_anla_si_no_existe(index_name: str = None):
 
                 "pdf_id":            { "type": "keyword" },
                 "file_name":         { "type": "keyword" },
-                "texto_completo":    { "type": "text" }
+                "texto_completo":    { "type": "text" },
+
+                # Grupo de casi-duplicados (MinHash/LSH); permite colapsar resultados
+                "grupo_duplicados":  { "type": "keyword" },
+
+                # Tema del corpus (k-means por mini-lotes) y su etiqueta de términos
+                "tema_cluster":      { "type": "keyword" },
+                "tema_etiqueta":     { "type": "keyword" },
+
+                # Embedding del resumen / inicio de la resolución (búsqueda kNN con HNSW)
+                "embedding": {
+                    "type": "dense_vector",
+                    "dims": ELASTIC_EMBEDDING_DIMS,
+                    "index": True,
+                    "similarity": "cosine",
+                    "index_options": { "type": "hnsw", "m": 16, "ef_construction": 100 }
+                }
             }
         }
     }
+    if pipeline:
+        body["settings"] = {"index": {"default_pipeline": PIPELINE_GRUPO_DUPLICADOS}}
 
     elastic.client.indices.create(index=index_name, body=body)
 
 
-def indexar_json_anla(json_dir: str, index_name: str = None) -> Dict:
+def texto_para_embedding(doc: Dict, max_caracteres: int = 2000) -> str:
+    """
+    Texto corto que representa a una resolución para el embedding:
+    el resumen si existe; si no, descripción + inicio del texto completo.
+    """
+    if doc.get("resumen"):
+        return doc["resumen"][:max_caracteres]
+
+    partes = [doc.get("descripcion") or "", doc.get("texto_completo") or ""]
+    return " ".join(p for p in partes if p)[:max_caracteres]
+
+
+def indexar_json_anla(json_dir: str, index_name: str = None,
+                      detectar_duplicados: bool = True,
+                      motor_resumen: Optional[MotorResumen] = None,
+                      tam_lote_resumen: int = 32,
+                      pln=None,
+                      tam_lote_embeddings: int = 32,
+                      agrupador_temas: Optional[AgrupadorTemas] = None) -> Dict:
     """
-    Lee todos los JSON de una carpeta y los indexa en el índice ANLA.
+    Lee todos los JSON de una carpeta (o de un corpus empaquetado) y los indexa en el índice ANLA.
+
+    Si detectar_duplicados es True, agrupa las resoluciones casi idénticas
+    (MinHash/LSH sobre texto_completo) y guarda el campo grupo_duplicados.
+
+    Si se pasa un motor_resumen entrenado, calcula por lotes el campo resumen
+    de los documentos que aún no lo tienen.
+
+    Si se pasa pln (PLN o ClientePLN), calcula por lotes el campo embedding
+    para la búsqueda semántica (kNN).
+
+    Si se pasa un agrupador_temas, lo entrena por mini-lotes (si aún no lo
+    está) y asigna tema_cluster y tema_etiqueta a cada resolución.
     """
     index_name = index_name or ELASTIC_INDEX_DEFAULT
     crear_indice_anla_si_no_existe(index_name)
 
-    documentos = []
-    for fname in os.listdir(json_dir):
-        if not fname.lower().endswith(".json"):
-            continue
-
-        path = os.path.join(json_dir, fname)
-        with open(path, "r", encoding="utf-8") as f:
-            doc = json.load(f)
+    detector = DetectorDuplicados() if detectar_duplicados else None
 
-        # Usamos pdf_id como _id si existe
-        doc_id = doc.get("pdf_id", os.path.splitext(fname)[0])
+    documentos = []
+    # Usamos pdf_id como _id si existe (json_dir puede ser un corpus empaquetado)
+    for doc_id, doc in Funciones.iterar_documentos_json(json_dir):
+        if detector:
+            detector.agregar(doc_id, doc.get("texto_completo") or "")
 
         documentos.append({
             "_index": index_name,
@@ -553,19 +788,95 @@ def indexar_json_anla(json_dir: str, index_name: str = None) -> Dict:
     if not documentos:
         return {"success": True, "indexados": 0, "fallidos": 0, "errores": []}
 
+    if motor_resumen is not None:
+        pendientes = [a["_source"] for a in documentos if not a["_source"].get("resumen")]
+        for inicio in range(0, len(pendientes), tam_lote_resumen):
+            lote = pendientes[inicio:inicio + tam_lote_resumen]
+            resumenes = motor_resumen.resumir_lote([d.get("texto_completo") or "" for d in lote])
+            for doc, resumen in zip(lote, resumenes):
+                doc["resumen"] = resumen
+
+    if pln is not None:
+        fuentes = [a["_source"] for a in documentos]
+        for inicio in range(0, len(fuentes), tam_lote_embeddings):
+            lote = fuentes[inicio:inicio + tam_lote_embeddings]
+            vectores = pln.calcular_embeddings([texto_para_embedding(d) for d in lote])
+            for doc, vector in zip(lote, vectores):
+                doc["embedding"] = [float(x) for x in vector]
+
+    temas_asignados = {}
+    if agrupador_temas is not None:
+        if not agrupador_temas.entrenado:
+            agrupador_temas.entrenar(a["_source"].get("texto_completo") or "" for a in documentos)
+        for inicio in range(0, len(documentos), agrupador_temas.tam_lote):
+            lote = documentos[inicio:inicio + agrupador_temas.tam_lote]
+            temas = agrupador_temas.asignar([a["_source"].get("texto_completo") or "" for a in lote])
+            for accion, tema in zip(lote, temas):
+                if tema:
+                    accion["_source"].update(tema)
+                    temas_asignados[accion["_id"]] = tema
+
+    grupos = {}
+    if detector:
+        # Los grupos se asignan al final: un documento posterior puede unir grupos previos
+        grupos = detector.grupos()
+        for accion in documentos:
+            accion["_source"]["grupo_duplicados"] = grupos[str(accion["_id"])]
+
     success, errors = bulk(elastic.client, documentos, raise_on_error=False)
 
     return {
         "success": True,
         "indexados": success,
         "fallidos": len(errors) if errors else 0,
-        "errores": errors or []
+        "errores": errors or [],
+        "grupos_duplicados": grupos,
+        "temas": temas_asignados
+    }
+
+
+def reasignar_temas_anla(agrupador_temas: AgrupadorTemas, index_name: str = None) -> Dict:
+    """
+    Recalcula tema_cluster y tema_etiqueta de los documentos cargados desde la
+    app (web scraping, campo texto), después de reentrenar los temas. Las
+    resoluciones del corpus ya reciben el tema nuevo en indexar_json_anla.
+    """
+    index_name = index_name or ELASTIC_INDEX_DEFAULT
+    consulta = {"query": {"bool": {
+        "must": [{"exists": {"field": "texto"}}],
+        "must_not": [{"exists": {"field": "pdf_id"}}]
+    }}}
+
+    def _acciones():
+        lote = []
+        for hit in scan(elastic.client, index=index_name, query=consulta, _source=["texto"]):
+            lote.append(hit)
+            if len(lote) >= agrupador_temas.tam_lote:
+                yield from _actualizar(lote)
+                lote = []
+        yield from _actualizar(lote)
+
+    def _actualizar(lote):
+        temas = agrupador_temas.asignar([h["_source"].get("texto") or "" for h in lote]) if lote else []
+        for hit, tema in zip(lote, temas):
+            if tema:
+                yield {"_op_type": "update", "_index": index_name, "_id": hit["_id"], "doc": tema}
+
+    actualizados, errores = bulk(elastic.client, _acciones(), raise_on_error=False)
+    return {
+        "success": True,
+        "actualizados": actualizados,
+        "fallidos": len(errores) if errores else 0
     }
 
 
-def buscar_resoluciones_anla(texto: str, size: int = 10, index_name: str = None) -> Dict:
+def buscar_resoluciones_anla(texto: str, size: int = 10, index_name: str = None,
+                             colapsar_duplicados: bool = False) -> Dict:
     """
     Búsqueda de texto en el índice ANLA (para usar en app.py / vistas).
+
+    Con colapsar_duplicados=True solo se devuelve el mejor resultado de cada
+    grupo_duplicados.
     """
     index_name = index_name or ELASTIC_INDEX_DEFAULT
 
@@ -573,21 +884,389 @@ def buscar_resoluciones_anla(texto: str, size: int = 10, index_name: str = None)
         "query": {
             "multi_match": {
                 "query": texto,
-                "fields": [
-                    "texto_completo",
-                    "descripcion",
-                    "empresa",
-                    "empresa_normalizada",   # <<< también miramos la normalizada
-                    "nombre_proyecto",
-                    "nombre_proyecto_normalizado",
-                    "ubicación",
-                    "numero_expediente",
-                    "numero_resolución"
-                ],
+                "fields": CAMPOS_TEXTO_ANLA,
                 "type": "best_fields"
             }
         }
     }
 
+    if colapsar_duplicados:
+        query["collapse"] = {"field": "grupo_duplicados"}
+
     resp = elastic.client.search(index=index_name, body=query, size=size)
     return resp
+
+
+def vector_consulta(texto: str, pln) -> List[float]:
+    """
+    Embedding de una consulta, con caché LRU en memoria por texto normalizado.
+    """
+    clave = " ".join(texto.lower().split())
+
+    with _lock_cache_embeddings:
+        vector = _cache_embeddings.get(clave)
+        if vector is not None:
+            _cache_embeddings.move_to_end(clave)
+            return vector
+
+    vector = [float(x) for x in pln.calcular_embeddings([texto])[0]]
+
+    with _lock_cache_embeddings:
+        _cache_embeddings[clave] = vector
+        if len(_cache_embeddings) > _CACHE_EMBEDDINGS_MAX:
+            _cache_embeddings.popitem(last=False)
+    return vector
+
+
+def construir_knn_anla(texto: str, pln, k: int = 10, num_candidates: int = 100,
+                       filtros: List[Dict] = None) -> Dict:
+    """
+    Construye la cláusula knn (campo embedding) para una consulta en lenguaje natural.
+    """
+    knn = {
+        "field": "embedding",
+        "query_vector": vector_consulta(texto, pln),
+        "k": k,
+        "num_candidates": max(num_candidates, k)
+    }
+    if filtros:
+        knn["filter"] = {"bool": {"must": filtros}}
+    return knn
+
+
+def buscar_resoluciones_anla_knn(texto: str, pln, size: int = 10,
+                                 num_candidates: int = 100,
+                                 filtros: List[Dict] = None,
+                                 index_name: str = None) -> Dict:
+    """
+    Búsqueda semántica (kNN sobre el campo embedding) en el índice ANLA.
+    Encuentra resoluciones parafraseadas aunque no compartan palabras con la consulta.
+
+    Args:
+        texto: Consulta en lenguaje natural (p.ej. "derrame de crudo en río")
+        pln: PLN o ClientePLN para calcular el embedding de la consulta
+        size: Número de resultados
+        num_candidates: Candidatos por shard que explora HNSW
+        filtros: Cláusulas de filtro adicionales (term, range...)
+        index_name: Índice (por defecto ELASTIC_INDEX_DEFAULT)
+    """
+    index_name = index_name or ELASTIC_INDEX_DEFAULT
+
+    body = {
+        "knn": construir_knn_anla(texto, pln, size, num_candidates, filtros),
+        "_source": {"excludes": ["embedding"]}
+    }
+
+    resp = elastic.client.search(index=index_name, body=body, size=size)
+    return resp
+
+
+def fusionar_rrf(listas_hits: List[List[Dict]], k_rrf: int = 60) -> List[Dict]:
+    """
+    Reciprocal Rank Fusion: puntaje(d) = suma de 1 / (k_rrf + posición de d en cada lista).
+    Solo usa posiciones, así que no hace falta normalizar puntajes BM25 y coseno.
+
+    Args:
+        listas_hits: Listas de hits de Elastic, cada una ordenada por relevancia
+        k_rrf: Constante de suavizado (60 es el valor habitual)
+
+    Returns:
+        Hits fusionados y ordenados, con _score = puntaje RRF
+    """
+    puntajes: Dict[str, float] = {}
+    hits_por_id: Dict[str, Dict] = {}
+
+    for hits in listas_hits:
+        for posicion, hit in enumerate(hits, start=1):
+            doc_id = hit["_id"]
+            puntajes[doc_id] = puntajes.get(doc_id, 0.0) + 1.0 / (k_rrf + posicion)
+            hits_por_id.setdefault(doc_id, hit)
+
+    fusionados = []
+    for doc_id in sorted(puntajes, key=puntajes.get, reverse=True):
+        hit = dict(hits_por_id[doc_id])
+        hit["_score"] = puntajes[doc_id]
+        fusionados.append(hit)
+    return fusionados
+
+
+def buscar_resoluciones_anla_hibrida(texto: str, pln, size: int = 10,
+                                     candidatos: int = None, k_rrf: int = 60,
+                                     filtros: List[Dict] = None,
+                                     colapsar_duplicados: bool = False,
+                                     index_name: str = None) -> Dict:
+    """
+    Búsqueda híbrida: BM25 (multi_match) y kNN (embedding) se ejecutan en
+    paralelo con pocos candidatos cada una y se fusionan con RRF.
+
+    Args:
+        texto: Consulta
+        pln: PLN o ClientePLN para el embedding de la consulta (con caché)
+        size: Número de resultados finales
+        candidatos: Resultados que aporta cada recuperador
+            (por defecto ELASTIC_FACTOR_CANDIDATOS x size)
+        k_rrf: Constante de RRF
+        filtros: Cláusulas de filtro aplicadas a ambos recuperadores
+        colapsar_duplicados: Deja solo el mejor hit de cada grupo_duplicados
+        index_name: Índice (por defecto ELASTIC_INDEX_DEFAULT)
+
+    Returns:
+        Diccionario con la forma de una respuesta de Elastic: {'hits': {'total', 'hits'}}
+    """
+    index_name = index_name or ELASTIC_INDEX_DEFAULT
+    candidatos = max(candidatos or ELASTIC_FACTOR_CANDIDATOS * size, size)
+    fuente = {"excludes": ["embedding"]}
+
+    cuerpo_bm25 = {
+        "query": {
+            "bool": {
+                "must": [{
+                    "multi_match": {
+                        "query": texto,
+                        "fields": CAMPOS_TEXTO_ANLA,
+                        "type": "best_fields"
+                    }
+                }],
+                "filter": filtros or []
+            }
+        },
+        "_source": fuente
+    }
+
+    # El embedding se calcula (o sale de caché) mientras BM25 ya está en curso
+    futuro_bm25 = _executor_busquedas.submit(
+        elastic.client.search, index=index_name, body=cuerpo_bm25, size=candidatos
+    )
+    cuerpo_knn = {
+        "knn": construir_knn_anla(texto, pln, candidatos, candidatos * 2, filtros),
+        "_source": fuente
+    }
+    futuro_knn = _executor_busquedas.submit(
+        elastic.client.search, index=index_name, body=cuerpo_knn, size=candidatos
+    )
+
+    listas = [futuro_bm25.result()["hits"]["hits"], futuro_knn.result()["hits"]["hits"]]
+    fusionados = fusionar_rrf(listas, k_rrf)
+
+    if colapsar_duplicados:
+        vistos = set()
+        unicos = []
+        for hit in fusionados:
+            grupo = hit.get("_source", {}).get("grupo_duplicados") or hit["_id"]
+            if grupo not in vistos:
+                vistos.add(grupo)
+                unicos.append(hit)
+        fusionados = unicos
+
+    return {
+        "hits": {
+            "total": {"value": len(fusionados), "relation": "eq"},
+            "hits": fusionados[:size]
+        }
+    }
+
+
+# ====================================
+# ÍNDICE DE PASAJES ANLA
+# ====================================
+
+def crear_indice_pasajes_anla_si_no_existe(index_name: str = None):
+    """
+    Crea el índice de pasajes (fragmentos de página/párrafo de cada resolución)
+    con los metadatos de la resolución padre para filtrar y colapsar.
+    """
+    index_name = index_name or ELASTIC_INDEX_PASAJES
+
+    if elastic.client.indices.exists(index=index_name):
+        return
+
+    body = {
+        "mappings": {
+            "properties": {
+                # Metadatos de la resolución padre
+                "pdf_id":            { "type": "keyword" },
+                "file_name":         { "type": "keyword" },
+                "numero_resolución": { "type": "text" },
+                "fecha_resolución":  { "type": "date", "format": "yyyy-MM-dd" },
+                "anio_resolucion":   { "type": "keyword" },
+                "nombre_proyecto":   { "type": "text" },
+                "empresa": {
+                    "type": "text",
+                    "fields": {
+                        "keyword": { "type": "keyword" }
+                    }
+                },
+                "empresa_normalizada": { "type": "keyword" },
+                "numero_expediente": { "type": "keyword" },
+                "descripcion":       { "type": "text", "index": False },
+                "tipos_infraccion":  { "type": "keyword" },
+                "tipos_infraccion_normalizados": { "type": "keyword" },
+                "grupo_duplicados":  { "type": "keyword" },
+                "tema_cluster":      { "type": "keyword" },
+                "tema_etiqueta":     { "type": "keyword" },
+
+                # Datos del pasaje
+                "pagina":            { "type": "integer" },
+                "numero_pasaje":     { "type": "integer" },
+                "inicio":            { "type": "integer" },
+
+                # offsets en el índice invertido: el resaltado no re-analiza el texto
+                "texto":             { "type": "text", "index_options": "offsets" }
+            }
+        }
+    }
+
+    elastic.client.indices.create(index=index_name, body=body)
+
+
+def dividir_en_pasajes(doc: Dict, max_caracteres: int = 2000) -> List[Dict]:
+    """
+    Divide el texto_completo de una resolución en pasajes de página/párrafo
+    con los metadatos del documento padre.
+
+    Si el texto conserva los saltos de página (\\f), cada pasaje lleva su número
+    de página. Si no (texto_completo de la Gaceta une las páginas con \\n), los
+    saltos se reconstruyen con los encabezados "Hoja No. N de M" de cada página.
+    """
+    texto = Funciones.marcar_saltos_pagina(doc.get("texto_completo") or "")
+    padre = {campo: doc.get(campo) for campo in CAMPOS_PADRE_PASAJE if doc.get(campo) is not None}
+    con_paginas = "\f" in texto
+
+    pasajes = []
+    pagina = 1
+    ultimo = 0
+    for numero, (inicio, fragmento) in enumerate(Funciones.dividir_en_fragmentos(texto, max_caracteres)):
+        if con_paginas:
+            pagina += texto.count("\f", ultimo, inicio)
+            ultimo = inicio
+        fragmento = fragmento.strip()
+        if not fragmento:
+            continue
+        pasaje = dict(padre)
+        pasaje.update({
+            "numero_pasaje": numero,
+            "inicio": inicio,
+            "texto": fragmento
+        })
+        if con_paginas:
+            pasaje["pagina"] = pagina
+        pasajes.append(pasaje)
+
+    return pasajes
+
+
+def _eliminar_pasajes_sobrantes(index_name: str, vigentes: Dict[str, List[str]]) -> int:
+    """
+    Borra los pasajes de cada documento que ya no están entre sus ids vigentes
+    (p.ej. el texto se acortó y ahora tiene menos pasajes que en la carga anterior)
+
+    Args:
+        index_name: Índice de pasajes
+        vigentes: pdf_id -> ids de los pasajes recién indexados
+
+    Returns:
+        Número de pasajes eliminados
+    """
+    consulta = {"bool": {"should": [
+        {"bool": {
+            "filter": [{"term": {"pdf_id": doc_id}}],
+            "must_not": [{"ids": {"values": ids}}] if ids else []
+        }}
+        for doc_id, ids in vigentes.items()
+    ], "minimum_should_match": 1}}
+    try:
+        resp = elastic.client.delete_by_query(index=index_name, query=consulta,
+                                              conflicts="proceed", refresh=False)
+        return resp.get("deleted", 0)
+    except Exception as e:
+        print(f"Error al eliminar pasajes sobrantes en {index_name}: {e}")
+        return 0
+
+
+def indexar_pasajes_anla(json_dir: str, index_name: str = None,
+                         max_caracteres: int = 2000, grupos_duplicados: Dict = None,
+                         temas: Dict = None) -> Dict:
+    """
+    Lee los JSON ANLA de una carpeta y indexa sus pasajes en el índice de pasajes.
+    Los documentos se leen y se envían en streaming (sin cargar todo el corpus).
+    Los pasajes de una carga anterior que el documento ya no tiene se eliminan.
+
+    Args:
+        json_dir: Carpeta con los JSON ANLA o carpeta de un corpus empaquetado
+        index_name: Índice de pasajes (por defecto ELASTIC_INDEX_PASAJES)
+        max_caracteres: Tamaño máximo de cada pasaje
+        grupos_duplicados: pdf_id -> grupo_duplicados (opcional) para copiarlo en los pasajes
+        temas: pdf_id -> {tema_cluster, tema_etiqueta} (opcional), igual que grupos_duplicados
+    """
+    index_name = index_name or ELASTIC_INDEX_PASAJES
+    crear_indice_pasajes_anla_si_no_existe(index_name)
+
+    # pdf_id -> ids de sus pasajes; por lotes se borran los demás pasajes de esos documentos
+    vigentes: Dict[str, List[str]] = {}
+    eliminados = 0
+
+    def _acciones():
+        nonlocal eliminados
+        for doc_id, doc in Funciones.iterar_documentos_json(json_dir):
+            doc.setdefault("pdf_id", doc_id)
+            if grupos_duplicados and doc_id in grupos_duplicados:
+                doc["grupo_duplicados"] = grupos_duplicados[doc_id]
+            if temas and doc_id in temas:
+                doc.update(temas[doc_id])
+
+            pdf_id = str(doc["pdf_id"])
+            vigentes[pdf_id] = []
+            for pasaje in dividir_en_pasajes(doc, max_caracteres):
+                vigentes[pdf_id].append(f"{doc_id}_{pasaje['numero_pasaje']}")
+                yield {
+                    "_index": index_name,
+                    "_id": vigentes[pdf_id][-1],
+                    "_source": pasaje
+                }
+
+            if len(vigentes) >= 200:
+                eliminados += _eliminar_pasajes_sobrantes(index_name, vigentes)
+                vigentes.clear()
+
+    indexados = 0
+    errores = []
+    for ok, item in streaming_bulk(elastic.client, _acciones(), chunk_size=500,
+                                   raise_on_error=False):
+        if ok:
+            indexados += 1
+        else:
+            errores.append(item)
+    if vigentes:
+        eliminados += _eliminar_pasajes_sobrantes(index_name, vigentes)
+
+    return {
+        "success": True,
+        "indexados": indexados,
+        "eliminados": eliminados,
+        "fallidos": len(errores),
+        "errores": errores
+    }
+
+
+def buscar_pasajes_anla(texto: str, size: int = 10, filtros: List[Dict] = None,
+                        index_name: str = None) -> Dict:
+    """
+    Busca en el índice de pasajes y colapsa por resolución (pdf_id):
+    cada hit es una resolución con sus mejores pasajes resaltados y su página.
+    """
+    index_name = index_name or ELASTIC_INDEX_PASAJES
+
+    body = {
+        "query": {
+            "bool": {
+                "must": [{"match": {"texto": texto}}],
+                "filter": filtros or []
+            }
+        },
+        "_source": {"excludes": ["texto"]},
+        "collapse": COLAPSO_PASAJES_ANLA,
+        "highlight": RESALTADO_PASAJES_ANLA
+    }
+
+    resp = elastic.client.search(index=index_name, body=body, size=size)
+    return resp
@@ -0,0 +1,478 @@
+import os
+import json
+import time
+import uuid
+import queue
+import threading
+import multiprocessing
+from typing import Callable, Dict, List, Optional, Tuple
+
+from elasticsearch import Elasticsearch
+from elasticsearch.helpers import bulk
+
+from .servidorPLN import obtener_pln
+
+# Estado de los trabajos de enriquecimiento (un JSON por trabajo, compartido entre workers)
+ENRIQUECIMIENTO_DIR = os.getenv('ENRIQUECIMIENTO_DIR', os.path.join('Data', 'enriquecimiento'))
+
+
+def _agrupador_vigente(estado: Dict):
+    """AgrupadorTemas vigente; si viene de un archivo, se recarga cuando el archivo cambia"""
+    ruta = estado['ruta']
+    if not ruta:
+        return estado['agrupador']
+    try:
+        mtime = os.path.getmtime(ruta)
+    except OSError:
+        return estado['agrupador']
+    if mtime != estado['mtime']:
+        from .temas import AgrupadorTemas
+        agrupador = AgrupadorTemas.cargar(ruta)
+        if agrupador is not None:
+            estado['agrupador'] = agrupador
+        estado['mtime'] = mtime
+    return estado['agrupador']
+
+
+def _ejecutar_etapas(conexion, pln_factory: Callable, motor_resumen,
+                     agrupador_temas, ruta_agrupador_temas: Optional[str]):
+    """
+    Proceso hijo de un hilo de trabajo: carga los modelos, avisa 'listo' y
+    ejecuta las etapas que le piden. Responde (exito, resultado, segundos).
+    """
+    pln = pln_factory()
+    estado_agrupador = {'agrupador': agrupador_temas, 'ruta': ruta_agrupador_temas, 'mtime': None}
+    conexion.send('listo')
+
+    while True:
+        try:
+            campo, texto = conexion.recv()
+        except (EOFError, OSError):
+            return
+        inicio = time.monotonic()
+        try:
+            if campo == 'resumen':
+                resultado = (motor_resumen.resumir(texto) if motor_resumen
+                             else pln.generar_resumen(texto))
+            elif campo == 'entidades':
+                resultado = pln.extraer_entidades(texto)
+            elif campo == 'temas':
+                resultado = [{'palabra': palabra, 'relevancia': relevancia}
+                             for palabra, relevancia in pln.extraer_temas(texto)]
+            elif campo == 'tema':
+                agrupador = _agrupador_vigente(estado_agrupador)
+                resultado = agrupador.asignar([texto])[0] if agrupador is not None else None
+            else:
+                raise ValueError(f"Etapa desconocida: {campo}")
+            respuesta = (True, resultado, time.monotonic() - inicio)
+        except Exception as e:
+            respuesta = (False, str(e), time.monotonic() - inicio)
+        conexion.send(respuesta)
+
+
+class _ProcesoEtapas:
+    """Proceso hijo (spawn) donde un hilo de trabajo ejecuta sus etapas; se puede cancelar"""
+
+    def __init__(self, objetivo_args: Tuple, espera_carga: float):
+        contexto = multiprocessing.get_context('spawn')
+        self._conexion, conexion_hijo = contexto.Pipe()
+        self._proceso = contexto.Process(target=_ejecutar_etapas,
+                                         args=(conexion_hijo,) + objetivo_args, daemon=True)
+        self._proceso.start()
+        conexion_hijo.close()
+        # La carga de modelos no cuenta en el presupuesto de ningún documento
+        if not self._conexion.poll(espera_carga) or self._recibir() != 'listo':
+            self.terminar()
+            raise RuntimeError("El proceso de etapas PLN no arrancó")
+
+    def _recibir(self):
+        try:
+            return self._conexion.recv()
+        except (EOFError, OSError):
+            return None
+
+    def ejecutar(self, campo: str, texto: str, timeout: float) -> Optional[Tuple]:
+        """
+        Ejecuta una etapa en el proceso hijo
+
+        Returns:
+            (exito, resultado, segundos), o None si no terminó dentro del timeout
+        """
+        self._conexion.send((campo, texto))
+        if not self._conexion.poll(timeout):
+            return None
+        respuesta = self._recibir()
+        if respuesta is None:
+            raise RuntimeError(f"El proceso de etapas PLN terminó durante {campo}")
+        return respuesta
+
+    def vivo(self) -> bool:
+        return self._proceso.is_alive()
+
+    def terminar(self):
+        """Detiene el proceso (y con él la etapa que estuviera corriendo)"""
+        self._proceso.terminate()
+        self._proceso.join(timeout=5)
+        self._conexion.close()
+
+
+class EnriquecedorPLN:
+    """
+    Etapa de enriquecimiento en segundo plano: procesa con PLN los textos ya
+    indexados (entidades, temas y resumen) y actualiza los documentos en Elastic.
+
+    - La cola es acotada: si los workers van atrasados, encolar() espera
+      (backpressure) en lugar de acumular textos sin límite en memoria.
+    - Cada documento tiene un presupuesto de tiempo. Cada etapa analiza solo
+      el texto que alcanza a procesar en el tiempo restante (según la
+      velocidad medida en documentos anteriores) y corre con un timeout; al
+      agotarse se omiten las etapas restantes y el documento queda 'parcial'.
+    - Las etapas corren en un proceso hijo por hilo de trabajo (fuera del GIL
+      del worker web). Una etapa que excede el presupuesto se cancela matando
+      ese proceso, que se vuelve a crear para el siguiente documento; el
+      trabajo cuenta las etapas abandonadas en 'etapas_abandonadas'.
+    - El estado de cada trabajo se guarda en disco (ENRIQUECIMIENTO_DIR), así
+      cualquier worker de gunicorn puede responder por su avance.
+    - Los modelos se obtienen con pln_factory dentro del proceso hijo, así
+      la petición HTTP nunca espera a que carguen.
+    """
+
+    def __init__(self, client: Elasticsearch, pln_factory: Callable = obtener_pln,
+                 num_workers: int = 2, tam_cola: int = 64, tam_lote: int = 8,
+                 presupuesto_segundos: float = 60.0, max_caracteres: int = 300000,
+                 motor_resumen=None, agrupador_temas=None, ruta_agrupador_temas: str = None,
+                 directorio: str = None,
+                 max_edad_trabajos: float = 7 * 24 * 3600,
+                 espera_carga: float = 600.0):
+        """
+        Inicializa el enriquecedor (los hilos arrancan con el primer documento)
+
+        Args:
+            client: Cliente de Elasticsearch
+            pln_factory: Función sin argumentos que devuelve un PLN o ClientePLN; se
+                llama en el proceso hijo, así que debe ser una función de módulo
+            num_workers: Hilos de trabajo
+            tam_cola: Máximo de documentos en espera
+            tam_lote: Documentos que un hilo procesa antes de escribir en Elastic
+            presupuesto_segundos: Tiempo máximo de PLN por documento
+            max_caracteres: Caracteres del texto que se analizan como máximo
+            motor_resumen: MotorResumen entrenado (opcional) para los resúmenes
+            agrupador_temas: AgrupadorTemas (opcional) que asigna tema_cluster; no
+                se modifica (los temas se reentrenan fuera de línea)
+            ruta_agrupador_temas: Archivo del AgrupadorTemas; se carga al primer
+                uso y se vuelve a cargar cuando cambia (p.ej. tras reentrenar)
+            directorio: Carpeta del estado de los trabajos (por defecto ENRIQUECIMIENTO_DIR)
+            max_edad_trabajos: Segundos tras los que se elimina el estado de un trabajo
+            espera_carga: Segundos máximos para que un proceso de etapas cargue los modelos
+        """
+        self.client = client
+        self.pln_factory = pln_factory
+        self.num_workers = num_workers
+        self.tam_lote = tam_lote
+        self.presupuesto_segundos = presupuesto_segundos
+        self.max_caracteres = max_caracteres
+        self.motor_resumen = motor_resumen
+        self.agrupador_temas = agrupador_temas
+        self.ruta_agrupador_temas = ruta_agrupador_temas
+        self.espera_carga = espera_carga
+        self.directorio = directorio or ENRIQUECIMIENTO_DIR
+        self.max_edad_trabajos = max_edad_trabajos
+
+        # Segundos por carácter de cada etapa (media móvil), para recortar el texto al presupuesto
+        self._seg_por_caracter: Dict[str, float] = {}
+        # Proceso de etapas de cada hilo de trabajo
+        self._local = threading.local()
+
+        self._cola: "queue.Queue[Dict]" = queue.Queue(maxsize=tam_cola)
+        self._trabajos: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._hilos: List[threading.Thread] = []
+
+    def _iniciar_hilos(self):
+        with self._lock:
+            self._hilos = [h for h in self._hilos if h.is_alive()]
+            for _ in range(self.num_workers - len(self._hilos)):
+                hilo = threading.Thread(target=self._trabajar, daemon=True)
+                hilo.start()
+                self._hilos.append(hilo)
+
+    def _proceso_etapas(self) -> _ProcesoEtapas:
+        """Proceso de etapas del hilo actual; se crea (o se vuelve a crear) si no está vivo"""
+        proceso = getattr(self._local, 'proceso', None)
+        if proceso is None or not proceso.vivo():
+            proceso = _ProcesoEtapas((self.pln_factory, self.motor_resumen, self.agrupador_temas,
+                                      self.ruta_agrupador_temas), self.espera_carga)
+            self._local.proceso = proceso
+        return proceso
+
+    def _descartar_proceso(self):
+        proceso = getattr(self._local, 'proceso', None)
+        if proceso is not None:
+            proceso.terminar()
+            self._local.proceso = None
+
+    def crear_trabajo(self, total: int) -> str:
+        """
+        Registra un trabajo de enriquecimiento
+
+        Args:
+            total: Número de documentos que se van a encolar
+
+        Returns:
+            Id del trabajo
+        """
+        self._limpiar_trabajos()
+        trabajo_id = uuid.uuid4().hex
+        with self._lock:
+            self._trabajos[trabajo_id] = {
+                'total': total,
+                'procesados': 0,
+                'parciales': 0,
+                'errores': 0,
+                'etapas_abandonadas': {},
+                'inicio': time.time(),
+                'fin': None
+            }
+            self._guardar_trabajo(trabajo_id)
+        return trabajo_id
+
+    def _ruta_trabajo(self, trabajo_id: str) -> Optional[str]:
+        # El id viene de la URL: solo se aceptan ids generados por crear_trabajo()
+        if not trabajo_id or not all(c in '0123456789abcdef' for c in trabajo_id):
+            return None
+        return os.path.join(self.directorio, f"{trabajo_id}.json")
+
+    def _guardar_trabajo(self, trabajo_id: str):
+        """Escribe el estado de un trabajo (llamar con self._lock tomado; escritura atómica)"""
+        try:
+            os.makedirs(self.directorio, exist_ok=True)
+            ruta = self._ruta_trabajo(trabajo_id)
+            temporal = f"{ruta}.{os.getpid()}.tmp"
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump(self._trabajos[trabajo_id], f)
+            os.replace(temporal, ruta)
+        except Exception as e:
+            print(f"Error al guardar estado del trabajo {trabajo_id}: {e}")
+
+    def _limpiar_trabajos(self):
+        """Elimina el estado de los trabajos más antiguos que max_edad_trabajos"""
+        if not os.path.isdir(self.directorio):
+            return
+        limite = time.time() - self.max_edad_trabajos
+        for archivo in os.listdir(self.directorio):
+            ruta = os.path.join(self.directorio, archivo)
+            try:
+                if os.path.getmtime(ruta) < limite:
+                    os.remove(ruta)
+            except OSError:
+                pass
+        with self._lock:
+            for trabajo_id in [t for t, e in self._trabajos.items() if e['inicio'] < limite]:
+                del self._trabajos[trabajo_id]
+
+    def encolar(self, trabajo_id: str, index: str, doc_id: str, texto: str,
+                timeout: Optional[float] = None) -> bool:
+        """
+        Encola un documento ya indexado para enriquecerlo
+
+        Args:
+            trabajo_id: Id devuelto por crear_trabajo()
+            index: Índice donde está el documento
+            doc_id: _id del documento
+            texto: Texto a analizar
+            timeout: Segundos máximos de espera si la cola está llena (None = sin límite)
+
+        Returns:
+            True si se encoló, False si la cola siguió llena tras el timeout
+        """
+        self._iniciar_hilos()
+        try:
+            self._cola.put({
+                'trabajo_id': trabajo_id,
+                'index': index,
+                'doc_id': doc_id,
+                'texto': texto
+            }, timeout=timeout)
+            return True
+        except queue.Full:
+            self._registrar(trabajo_id, 'errores')
+            return False
+
+    def encolar_en_segundo_plano(self, trabajo_id: str, index: str, documentos: List[Dict]):
+        """
+        Encola una lista de documentos desde un hilo aparte, para que la
+        espera por backpressure no bloquee al llamador.
+
+        Args:
+            trabajo_id: Id devuelto por crear_trabajo()
+            index: Índice de los documentos
+            documentos: Lista de dicts con 'doc_id' y 'texto'
+        """
+        def _encolar_todos():
+            for doc in documentos:
+                self.encolar(trabajo_id, index, doc['doc_id'], doc['texto'])
+
+        threading.Thread(target=_encolar_todos, daemon=True).start()
+
+    def estado(self, trabajo_id: str) -> Optional[Dict]:
+        """Estado de un trabajo (None si no existe); sirve para trabajos de otros workers"""
+        with self._lock:
+            trabajo = self._trabajos.get(trabajo_id)
+            estado = dict(trabajo) if trabajo is not None else None
+        if estado is None:
+            ruta = self._ruta_trabajo(trabajo_id)
+            try:
+                with open(ruta, 'r', encoding='utf-8') as f:
+                    estado = json.load(f)
+            except (OSError, ValueError, TypeError):
+                return None
+        terminados = estado['procesados'] + estado['errores']
+        estado['pendientes'] = max(estado['total'] - terminados, 0)
+        estado['terminado'] = terminados >= estado['total']
+        return estado
+
+    def _registrar(self, trabajo_id: str, campo: str):
+        with self._lock:
+            trabajo = self._trabajos.get(trabajo_id)
+            if trabajo is None:
+                return
+            trabajo[campo] += 1
+            if trabajo['procesados'] + trabajo['errores'] >= trabajo['total']:
+                trabajo['fin'] = time.time()
+            self._guardar_trabajo(trabajo_id)
+
+    def _registrar_abandonadas(self, trabajo_id: str, etapas: List[str]):
+        """Suma al trabajo las etapas que se cancelaron u omitieron por el presupuesto"""
+        if not etapas:
+            return
+        with self._lock:
+            trabajo = self._trabajos.get(trabajo_id)
+            if trabajo is None:
+                return
+            abandonadas = trabajo.setdefault('etapas_abandonadas', {})
+            for campo in etapas:
+                abandonadas[campo] = abandonadas.get(campo, 0) + 1
+            self._guardar_trabajo(trabajo_id)
+
+    def enriquecer(self, texto: str) -> Dict:
+        """
+        Ejecuta las etapas de PLN sobre un texto respetando el presupuesto de tiempo
+
+        Args:
+            texto: Texto a analizar
+
+        Returns:
+            Campos a actualizar: entidades, temas, resumen, tema_cluster y estado del enriquecimiento
+        """
+        return self._enriquecer(texto)[0]
+
+    def _enriquecer(self, texto: str) -> Tuple[Dict, List[str]]:
+        """enriquecer() que además devuelve las etapas abandonadas"""
+        proceso = self._proceso_etapas()
+        texto = texto[:self.max_caracteres]
+        limite = time.monotonic() + self.presupuesto_segundos
+        campos = {}
+
+        etapas = ['resumen', 'entidades', 'temas']
+        if self.agrupador_temas is not None or self.ruta_agrupador_temas:
+            etapas.append('tema')
+
+        completo = True
+        abandonadas = []
+        for posicion, campo in enumerate(etapas):
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                completo = False
+                abandonadas.extend(etapas[posicion:])
+                break
+
+            # Texto que la etapa alcanza a procesar en el tiempo restante
+            fragmento = texto
+            velocidad = self._seg_por_caracter.get(campo)
+            if velocidad:
+                fragmento = texto[:int(restante / velocidad)]
+                if len(fragmento) < len(texto):
+                    completo = False
+            if not fragmento:
+                abandonadas.extend(etapas[posicion:])
+                break
+
+            try:
+                respuesta = proceso.ejecutar(campo, fragmento, restante)
+            except (RuntimeError, OSError):
+                self._descartar_proceso()
+                raise
+            if respuesta is None:
+                # La etapa se cancela con su proceso; el próximo documento le da
+                # a esta etapa la mitad del texto
+                print(f"Etapa {campo} excedió el presupuesto de tiempo")
+                self._descartar_proceso()
+                self._seg_por_caracter[campo] = 2 * max(self._seg_por_caracter.get(campo, 0.0),
+                                                        restante / len(fragmento))
+                completo = False
+                abandonadas.extend(etapas[posicion:])
+                break
+
+            exito, resultado, segundos = respuesta
+            self._medir_velocidad(campo, segundos, len(fragmento))
+            if not exito:
+                raise ValueError(resultado)
+            campos[campo] = resultado
+
+        # tema_cluster y tema_etiqueta van como campos propios del documento
+        tema = campos.pop('tema', None)
+        if tema:
+            campos.update(tema)
+
+        campos['enriquecimiento'] = 'completo' if completo else 'parcial'
+        return campos, abandonadas
+
+    def _medir_velocidad(self, campo: str, segundos: float, caracteres: int):
+        """Actualiza la velocidad de una etapa (segundos por carácter, media móvil)"""
+        medida = segundos / max(caracteres, 1)
+        anterior = self._seg_por_caracter.get(campo)
+        self._seg_por_caracter[campo] = medida if anterior is None else 0.7 * anterior + 0.3 * medida
+
+    def _trabajar(self):
+        """Bucle de cada hilo: toma documentos de la cola y escribe por lotes en Elastic"""
+        while True:
+            lote = [self._cola.get()]
+            while len(lote) < self.tam_lote:
+                try:
+                    lote.append(self._cola.get_nowait())
+                except queue.Empty:
+                    break
+
+            acciones = []
+            for item in lote:
+                try:
+                    campos, abandonadas = self._enriquecer(item['texto'])
+                    self._registrar_abandonadas(item['trabajo_id'], abandonadas)
+                    acciones.append((item, {
+                        '_op_type': 'update',
+                        '_index': item['index'],
+                        '_id': item['doc_id'],
+                        'doc': campos
+                    }))
+                except Exception as e:
+                    print(f"Error al enriquecer {item['doc_id']}: {e}")
+                    self._registrar(item['trabajo_id'], 'errores')
+
+            if acciones:
+                try:
+                    _, errores = bulk(self.client, [a for _, a in acciones], raise_on_error=False)
+                    fallidos = {e.get('update', {}).get('_id') for e in errores or []}
+                except Exception as e:
+                    print(f"Error al actualizar documentos enriquecidos: {e}")
+                    fallidos = {item['doc_id'] for item, _ in acciones}
+
+                for item, accion in acciones:
+                    if item['doc_id'] in fallidos:
+                        self._registrar(item['trabajo_id'], 'errores')
+                        continue
+                    if accion['doc']['enriquecimiento'] == 'parcial':
+                        self._registrar(item['trabajo_id'], 'parciales')
+                    self._registrar(item['trabajo_id'], 'procesados')
+
+            for _ in lote:
+                self._cola.task_done()
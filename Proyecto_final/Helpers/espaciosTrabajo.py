@@ -0,0 +1,197 @@
+import os
+import time
+import uuid
+import shutil
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+# Carpeta raíz de los espacios de trabajo de carga (uno por trabajo)
+UPLOADS_DIR = os.getenv('UPLOADS_DIR', os.path.join('static', 'uploads'))
+
+# Archivo que marca una carpeta como espacio de trabajo; su mtime es el último uso
+_MARCA = '.trabajo'
+
+
+class EspaciosTrabajo:
+    """
+    Carpetas aisladas por trabajo de ingesta dentro de static/uploads.
+
+    Cada trabajo (web scraping, ZIP) escribe en static/uploads/<trabajo_id>/,
+    así dos cargas simultáneas no se borran los archivos entre sí. Un
+    recolector en segundo plano elimina los espacios sin uso por más de
+    max_edad_horas y, si la carpeta supera max_mb, los más antiguos primero.
+    Los espacios de trabajos en curso (en_uso) no se eliminan.
+    """
+
+    def __init__(self, raiz: str = None, max_edad_horas: float = None, max_mb: float = None,
+                 edad_minima_minutos: float = 10, intervalo_segundos: float = 600):
+        """
+        Inicializa los espacios de trabajo
+
+        Args:
+            raiz: Carpeta raíz (por defecto UPLOADS_DIR)
+            max_edad_horas: Horas sin uso tras las que se elimina un espacio
+            max_mb: Tamaño máximo total de los espacios
+            edad_minima_minutos: Un espacio usado hace menos que esto nunca se elimina
+            intervalo_segundos: Cada cuánto se ejecuta el recolector
+        """
+        self.raiz = raiz or UPLOADS_DIR
+        self.max_edad = (max_edad_horas if max_edad_horas is not None
+                         else float(os.getenv('WORKSPACE_MAX_HORAS', '24'))) * 3600
+        self.max_bytes = (max_mb if max_mb is not None
+                          else float(os.getenv('WORKSPACE_MAX_MB', '5120'))) * 1024 * 1024
+        self.edad_minima = edad_minima_minutos * 60
+        self.intervalo = intervalo_segundos
+        self._hilo: Optional[threading.Thread] = None
+        # Espacios en uso por trabajos de este proceso (trabajo_id -> trabajos activos)
+        self._activos: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        os.makedirs(self.raiz, exist_ok=True)
+
+    def crear(self) -> Tuple[str, str]:
+        """
+        Crea un espacio de trabajo nuevo
+
+        Returns:
+            Tupla (trabajo_id, ruta de la carpeta)
+        """
+        trabajo_id = uuid.uuid4().hex
+        ruta = os.path.join(self.raiz, trabajo_id)
+        os.makedirs(ruta)
+        open(os.path.join(ruta, _MARCA), 'w').close()
+        return trabajo_id, ruta
+
+    def ruta(self, trabajo_id: str) -> Optional[str]:
+        """Carpeta de un trabajo existente (None si el id no es válido o ya se eliminó)"""
+        if not trabajo_id or not all(c in '0123456789abcdef' for c in trabajo_id):
+            return None
+        ruta = os.path.join(self.raiz, trabajo_id)
+        return ruta if os.path.exists(os.path.join(ruta, _MARCA)) else None
+
+    def contiene(self, ruta_archivo: str) -> bool:
+        """Indica si una ruta (p.ej. recibida del navegador) está dentro de algún espacio de trabajo"""
+        raiz = os.path.realpath(self.raiz)
+        ruta = os.path.realpath(ruta_archivo)
+        return os.path.commonpath([raiz, ruta]) == raiz and ruta != raiz
+
+    def tocar(self, trabajo_id: str):
+        """Registra el uso de un espacio (retrasa su eliminación)"""
+        ruta = self.ruta(trabajo_id)
+        if ruta:
+            os.utime(os.path.join(ruta, _MARCA))
+
+    @contextmanager
+    def en_uso(self, trabajo_id: str):
+        """
+        Marca un espacio como en uso mientras dura un trabajo largo (scraping,
+        extracción de PDFs). El recolector de este proceso no lo elimina y la
+        marca se renueva cada edad_minima / 2, así tampoco lo eliminan los
+        recolectores de otros procesos (workers de gunicorn)
+
+        Args:
+            trabajo_id: Id devuelto por crear()
+        """
+        with self._lock:
+            self._activos[trabajo_id] = self._activos.get(trabajo_id, 0) + 1
+        detener = threading.Event()
+
+        def _renovar():
+            while not detener.wait(max(self.edad_minima / 2, 1)):
+                try:
+                    self.tocar(trabajo_id)
+                except OSError:
+                    pass
+
+        self.tocar(trabajo_id)
+        threading.Thread(target=_renovar, daemon=True).start()
+        try:
+            yield
+        finally:
+            detener.set()
+            with self._lock:
+                self._activos[trabajo_id] -= 1
+                if not self._activos[trabajo_id]:
+                    del self._activos[trabajo_id]
+            self.tocar(trabajo_id)
+
+    def liberar(self, trabajo_id: str) -> bool:
+        """Elimina un espacio de trabajo y su contenido"""
+        ruta = self.ruta(trabajo_id)
+        if not ruta:
+            return False
+        shutil.rmtree(ruta, ignore_errors=True)
+        return True
+
+    @staticmethod
+    def _tamano(ruta: str) -> int:
+        total = 0
+        for carpeta, _, archivos in os.walk(ruta):
+            for archivo in archivos:
+                try:
+                    total += os.path.getsize(os.path.join(carpeta, archivo))
+                except OSError:
+                    pass
+        return total
+
+    def _listar(self) -> List[Dict]:
+        espacios = []
+        for nombre in os.listdir(self.raiz):
+            marca = os.path.join(self.raiz, nombre, _MARCA)
+            try:
+                ultimo_uso = os.path.getmtime(marca)
+            except OSError:
+                continue
+            ruta = os.path.join(self.raiz, nombre)
+            espacios.append({'trabajo_id': nombre, 'ruta': ruta,
+                             'ultimo_uso': ultimo_uso, 'bytes': self._tamano(ruta)})
+        return espacios
+
+    def recolectar(self) -> Dict:
+        """
+        Elimina los espacios vencidos y, si se supera la cuota, los más antiguos
+
+        Returns:
+            Diccionario con los espacios eliminados y los bytes liberados
+        """
+        ahora = time.time()
+        eliminados = []
+        liberados = 0
+
+        espacios = sorted(self._listar(), key=lambda e: e['ultimo_uso'])
+        total = sum(e['bytes'] for e in espacios)
+
+        with self._lock:
+            activos = set(self._activos)
+
+        for espacio in espacios:
+            edad = ahora - espacio['ultimo_uso']
+            if edad < self.edad_minima or espacio['trabajo_id'] in activos:
+                continue
+            if edad > self.max_edad or total > self.max_bytes:
+                shutil.rmtree(espacio['ruta'], ignore_errors=True)
+                total -= espacio['bytes']
+                liberados += espacio['bytes']
+                eliminados.append(espacio['trabajo_id'])
+
+        if eliminados:
+            print(f"Espacios de trabajo eliminados: {len(eliminados)} ({liberados / 1024 / 1024:.1f} MB)")
+
+        return {'eliminados': eliminados, 'bytes_liberados': liberados}
+
+    def iniciar_recolector(self):
+        """Arranca (una sola vez) el hilo que ejecuta recolectar() periódicamente"""
+        if self._hilo and self._hilo.is_alive():
+            return
+
+        def _bucle():
+            while True:
+                try:
+                    self.recolectar()
+                except Exception as e:
+                    print(f"Error en el recolector de espacios de trabajo: {e}")
+                time.sleep(self.intervalo)
+
+        self._hilo = threading.Thread(target=_bucle, daemon=True)
+        self._hilo.start()
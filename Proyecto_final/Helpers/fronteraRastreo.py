@@ -0,0 +1,155 @@
+import os
+import re
+import json
+from collections import deque
+from functools import lru_cache
+from typing import Dict, Iterable, Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Puertos por defecto que se eliminan de la URL canónica
+_PUERTOS_DEFECTO = {'http': 80, 'https': 443}
+
+# Escapes %xx: se normalizan a mayúsculas (%2f y %2F son la misma URL)
+_ESCAPE = re.compile(r'%[0-9a-fA-F]{2}')
+
+
+@lru_cache(maxsize=65536)
+def canonicalizar_url(url: str) -> str:
+    """
+    Forma canónica de una URL para detectar duplicados
+
+    Esquema y dominio en minúsculas, sin puerto por defecto, sin fragmento (#...),
+    parámetros de la query ordenados y escapes %xx en mayúsculas. La ruta
+    conserva mayúsculas/minúsculas (en general los servidores las distinguen).
+
+    El resultado se guarda en una caché LRU: extract_links y el rastreo
+    canonicalizan las mismas URLs y la segunda vez no se vuelve a calcular.
+
+    Args:
+        url: URL absoluta
+
+    Returns:
+        URL canónica
+    """
+    partes = urlsplit(url.strip())
+    esquema = partes.scheme.lower()
+    dominio = (partes.hostname or '').lower()
+    if partes.port and partes.port != _PUERTOS_DEFECTO.get(esquema):
+        dominio = f"{dominio}:{partes.port}"
+    if partes.username:
+        credenciales = partes.username + (f":{partes.password}" if partes.password else '')
+        dominio = f"{credenciales}@{dominio}"
+
+    ruta = _ESCAPE.sub(lambda m: m.group(0).upper(), partes.path) or '/'
+    query = urlencode(sorted(parse_qsl(partes.query, keep_blank_values=True)), doseq=True)
+    return urlunsplit((esquema, dominio, ruta, query, ''))
+
+
+class FronteraRastreo:
+    """
+    Frontera de un rastreo en anchura: cola (deque) de URLs por visitar y un
+    conjunto con las URLs canónicas ya vistas.
+
+    Agregar y sacar una URL cuesta O(1), así el rastreo de un portal grande
+    crece linealmente con el número de enlaces. El estado (pendientes y vistas)
+    se puede guardar en disco para reanudar un rastreo interrumpido.
+    """
+
+    def __init__(self, pendientes: Iterable[str] = None, vistas: Iterable[str] = None):
+        """
+        Inicializa la frontera
+
+        Args:
+            pendientes: URLs por visitar (en orden)
+            vistas: URLs canónicas ya vistas (visitadas o en cola)
+        """
+        self.pendientes = deque()
+        self.vistas = set(vistas or [])
+        for url in pendientes or []:
+            self.pendientes.append(url)
+            self.vistas.add(canonicalizar_url(url))
+
+    def __len__(self) -> int:
+        return len(self.pendientes)
+
+    def __contains__(self, url: str) -> bool:
+        return canonicalizar_url(url) in self.vistas
+
+    def marcar_vista(self, url: str) -> bool:
+        """
+        Registra una URL como vista sin encolarla
+
+        Returns:
+            True si la URL no se había visto antes
+        """
+        canonica = canonicalizar_url(url)
+        if canonica in self.vistas:
+            return False
+        self.vistas.add(canonica)
+        return True
+
+    def agregar(self, url: str) -> bool:
+        """
+        Encola una URL si no se ha visto antes
+
+        Returns:
+            True si se encoló
+        """
+        if not self.marcar_vista(url):
+            return False
+        self.pendientes.append(url)
+        return True
+
+    def siguiente(self) -> Optional[str]:
+        """Saca la próxima URL por visitar (None si la frontera está vacía)"""
+        return self.pendientes.popleft() if self.pendientes else None
+
+    def guardar(self, ruta: str, en_curso: Iterable[str] = None) -> bool:
+        """
+        Guarda el estado de la frontera (escritura atómica)
+
+        Args:
+            ruta: Ruta del archivo JSON de estado
+            en_curso: URLs sacadas de la cola que aún se están visitando; se
+                guardan al inicio de los pendientes para no perderlas al reanudar
+
+        Returns:
+            True si se guardó correctamente
+        """
+        try:
+            directorio = os.path.dirname(ruta)
+            if directorio:
+                os.makedirs(directorio, exist_ok=True)
+            temporal = ruta + '.tmp'
+            estado = {'pendientes': list(en_curso or []) + list(self.pendientes),
+                      'vistas': sorted(self.vistas)}
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump(estado, f, ensure_ascii=False)
+            os.replace(temporal, ruta)
+            return True
+        except Exception as e:
+            print(f"Error al guardar frontera de rastreo: {e}")
+            return False
+
+    @staticmethod
+    def cargar(ruta: str) -> Optional['FronteraRastreo']:
+        """
+        Carga una frontera guardada con guardar()
+
+        Args:
+            ruta: Ruta del archivo JSON de estado
+
+        Returns:
+            La frontera, o None si no existe o no se pudo leer
+        """
+        if not os.path.exists(ruta):
+            return None
+        try:
+            with open(ruta, 'r', encoding='utf-8') as f:
+                estado: Dict = json.load(f)
+            frontera = FronteraRastreo(vistas=estado.get('vistas', []))
+            frontera.pendientes.extend(estado.get('pendientes', []))
+            return frontera
+        except Exception as e:
+            print(f"Error al cargar frontera de rastreo {ruta}: {e}")
+            return None
@@ -1,14 +1,316 @@
 import os
+import re
+import time
 import zipfile
+import threading
+import multiprocessing
+import tempfile
+import subprocess
 import requests
 import json
 import PyPDF2
 from PIL import Image
 import pytesseract
-from typing import Dict, List
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
 from werkzeug.utils import secure_filename
 from datetime import datetime
 from pdf2image import convert_from_path
+from .cacheExtraccion import CacheExtraccion, CACHE_EXTRACCION_DIR
+from .corpusEmpaquetado import CorpusEmpaquetado, SEPARADOR_PAQUETE, ARCHIVO_INDICE
+
+# PyMuPDF es bastante más rápido que PyPDF2 para extraer texto (opcional)
+try:
+    import fitz
+except ImportError:
+    fitz = None
+
+# Límites naturales para dividir textos largos, del más grueso al más fino:
+# salto de página, párrafo, línea y espacio
+_SEPARADORES_FRAGMENTOS = [
+    re.compile(r'\f'),
+    re.compile(r'\n[ \t]*\n'),
+    re.compile(r'\n'),
+    re.compile(r'\s'),
+]
+
+# Encabezado de página de las resoluciones ANLA: "Resolución No. 00852 Del ... Hoja No. 2 de 16"
+_ENCABEZADO_HOJA = re.compile(r'Hoja\s+(?:No|N[°º])?\.?\s*:?\s*(\d{1,4})\s+de\s+(\d{1,4})', re.IGNORECASE)
+
+
+def _backend_pdf(backend: Optional[str] = None) -> str:
+    """Backend de extracción: el indicado, o PyMuPDF si está instalado y si no PyPDF2"""
+    if backend is None:
+        return 'pymupdf' if fitz is not None else 'pypdf2'
+    if backend == 'pymupdf' and fitz is None:
+        raise ValueError("PyMuPDF (fitz) no está instalado")
+    if backend not in ('pymupdf', 'pypdf2'):
+        raise ValueError(f"Backend de PDF no soportado: {backend}")
+    return backend
+
+
+def _contar_paginas(ruta_pdf: str, backend: str) -> int:
+    if backend == 'pymupdf':
+        with fitz.open(ruta_pdf) as pdf:
+            return pdf.page_count
+    return len(PyPDF2.PdfReader(ruta_pdf).pages)
+
+
+def _extraer_rango_paginas(ruta_pdf: str, inicio: int, fin: int, backend: str) -> List[str]:
+    """
+    Texto de las páginas [inicio, fin) (base 0). Es una función de módulo para
+    poder ejecutarla en otro proceso: cada proceso abre su propia copia del PDF.
+    """
+    if backend == 'pymupdf':
+        with fitz.open(ruta_pdf) as pdf:
+            return [pdf.load_page(i).get_text() or '' for i in range(inicio, fin)]
+
+    with open(ruta_pdf, 'rb') as file:
+        paginas = PyPDF2.PdfReader(file).pages
+        return [paginas[i].extract_text() or '' for i in range(inicio, fin)]
+
+
+def _iterar_paginas_secuencial(ruta_pdf: str, backend: str) -> Iterator[Tuple[int, str]]:
+    """Texto de todas las páginas en este proceso, abriendo y parseando el PDF una sola vez"""
+    if backend == 'pymupdf':
+        with fitz.open(ruta_pdf) as pdf:
+            for i, pagina in enumerate(pdf, 1):
+                yield i, pagina.get_text() or ''
+        return
+
+    with open(ruta_pdf, 'rb') as file:
+        for i, pagina in enumerate(PyPDF2.PdfReader(file).pages, 1):
+            yield i, pagina.extract_text() or ''
+
+
+# Pool de procesos compartido por todas las extracciones de este proceso (peticiones
+# de Flask, hilos de enriquecimiento...): el número de procesos no crece con las
+# cargas simultáneas y el costo de crearlos se paga una sola vez.
+# Los procesos se crean con 'spawn': un fork dentro de un worker con hilos
+# copiaría locks tomados por otros hilos y podría colgar al hijo
+PDF_PROCESOS = int(os.getenv('PDF_PROCESOS', str(os.cpu_count() or 1)))
+_pool_pdf: Optional[ProcessPoolExecutor] = None
+_lock_pool_pdf = threading.Lock()
+
+
+def _obtener_pool_pdf() -> ProcessPoolExecutor:
+    global _pool_pdf
+    with _lock_pool_pdf:
+        if _pool_pdf is None:
+            _pool_pdf = ProcessPoolExecutor(max_workers=PDF_PROCESOS,
+                                            mp_context=multiprocessing.get_context('spawn'))
+        return _pool_pdf
+
+
+
+def _ocr_pagina(imagen: Image.Image, lang: str = 'spa', timeout: float = 120,
+                un_hilo: bool = False) -> Optional[str]:
+    """
+    Ejecuta tesseract sobre una imagen de página
+
+    Con un_hilo=True el subproceso de tesseract corre con OMP_THREAD_LIMIT=1
+    (sin tocar el entorno del proceso web): así varias páginas en paralelo no
+    saturan los núcleos con hilos de OpenMP.
+
+    Returns:
+        Texto reconocido, o None si tesseract excedió el timeout o falló
+    """
+    with tempfile.TemporaryDirectory() as temporal:
+        ruta_imagen = os.path.join(temporal, 'pagina.png')
+        imagen.save(ruta_imagen)
+        entorno = dict(os.environ, OMP_THREAD_LIMIT='1') if un_hilo else None
+        comando = [pytesseract.pytesseract.tesseract_cmd, ruta_imagen, 'stdout', '-l', lang]
+        try:
+            proceso = subprocess.run(comando, capture_output=True, env=entorno,
+                                     timeout=timeout or None)
+        except subprocess.TimeoutExpired:
+            print(f"OCR de página cancelado: tesseract excedió {timeout} s")
+            return None
+        except OSError as e:
+            print(f"Error al ejecutar tesseract: {e}")
+            return None
+
+    if proceso.returncode != 0:
+        error = proceso.stderr.decode('utf-8', 'replace').strip()
+        print(f"Error de tesseract en OCR de página ({proceso.returncode}): {error}")
+        return None
+    return proceso.stdout.decode('utf-8', 'replace')
+
+
+# Paquetes abiertos por leer_json (los índices y mmap se reutilizan entre lecturas),
+# con la fecha de modificación del índice con que se abrió cada uno
+_paquetes_abiertos: Dict[str, Tuple[int, CorpusEmpaquetado]] = {}
+
+
+def _abrir_paquete(ruta: str) -> CorpusEmpaquetado:
+    # Si se reempaquetó, se abre la generación nueva; la anterior se libera
+    # cuando nadie la esté leyendo
+    mtime = os.stat(os.path.join(ruta, ARCHIVO_INDICE)).st_mtime_ns
+    abierto = _paquetes_abiertos.get(ruta)
+    if abierto is None or abierto[0] != mtime:
+        abierto = (mtime, CorpusEmpaquetado(ruta))
+        _paquetes_abiertos[ruta] = abierto
+    return abierto[1]
+
+
+def _abrir_cache(ruta_pdf: str, usar_cache: bool) -> Tuple[Optional[CacheExtraccion], Optional[str], Dict]:
+    """Devuelve (cache, sha256, entrada); sin caché la entrada es un dict vacío solo en memoria"""
+    if not usar_cache or not CACHE_EXTRACCION_DIR:
+        return None, None, {}
+    cache = CacheExtraccion()
+    sha = CacheExtraccion.sha256_archivo(ruta_pdf)
+    return cache, sha, cache.obtener(sha) or {'sha256': sha, 'tiempos': {}}
+
+
+def _cerrar_cache(cache: Optional[CacheExtraccion], sha: Optional[str], entrada: Dict):
+    """Guarda la entrada solo si esta extracción agregó algo"""
+    if entrada.pop('_modificada', False) and cache is not None:
+        cache.guardar(sha, entrada)
+
+
+def _iterar_paginas_texto(ruta_pdf: str, backend: str, n_procesos: Optional[int],
+                          paginas_por_tarea: int) -> Iterator[Tuple[int, str]]:
+    """Capa de texto página por página (sin caché); ver Funciones.iterar_paginas_pdf"""
+    total = _contar_paginas(ruta_pdf, backend)
+    rangos = [(inicio, min(inicio + paginas_por_tarea, total))
+              for inicio in range(0, total, paginas_por_tarea)]
+    procesos = PDF_PROCESOS if n_procesos is None else n_procesos
+    
+    if procesos <= 1 or len(rangos) <= 1:
+        yield from _iterar_paginas_secuencial(ruta_pdf, backend)
+        return
+    
+    def _entregar(executor):
+        resultados = executor.map(
+            _extraer_rango_paginas,
+            [ruta_pdf] * len(rangos),
+            [inicio for inicio, _ in rangos],
+            [fin for _, fin in rangos],
+            [backend] * len(rangos)
+        )
+        for (inicio, _), textos in zip(rangos, resultados):
+            for i, texto in enumerate(textos, inicio + 1):
+                yield i, texto
+    
+    if n_procesos is None:
+        yield from _entregar(_obtener_pool_pdf())
+        return
+    
+    with ProcessPoolExecutor(max_workers=min(procesos, len(rangos)),
+                             mp_context=multiprocessing.get_context('spawn')) as executor:
+        yield from _entregar(executor)
+
+
+def _iterar_paginas_ocr(ruta_pdf: str, paginas: List[int], dpi: int = 200, escala_grises: bool = True,
+                        n_hilos: int = None, tam_ventana: int = None, timeout_pagina: float = 120,
+                        lang: str = 'spa') -> Iterator[Tuple[int, Optional[str]]]:
+    """OCR por ventanas de páginas (sin caché); None en las páginas en que tesseract falló"""
+    n_hilos = n_hilos or os.cpu_count() or 1
+    tam_ventana = tam_ventana or n_hilos
+    
+    # Tesseract usa OpenMP internamente; con varias páginas en paralelo
+    # un hilo por subproceso de tesseract evita saturar los núcleos
+    un_hilo = n_hilos > 1
+    
+    # Ventanas de páginas consecutivas (convert_from_path trabaja por rangos)
+    ventanas = []
+    for pagina in sorted(set(paginas)):
+        if ventanas and pagina == ventanas[-1][-1] + 1 and len(ventanas[-1]) < tam_ventana:
+            ventanas[-1].append(pagina)
+        else:
+            ventanas.append([pagina])
+    
+    with ThreadPoolExecutor(max_workers=n_hilos) as executor:
+        for ventana in ventanas:
+            imagenes = convert_from_path(
+                ruta_pdf, dpi=dpi, grayscale=escala_grises,
+                first_page=ventana[0], last_page=ventana[-1]
+            )
+            textos = executor.map(
+                lambda imagen: _ocr_pagina(imagen, lang, timeout_pagina, un_hilo), imagenes
+            )
+            yield from zip(ventana, textos)
+            del imagenes
+
+
+def _paginas_texto(ruta_pdf: str, entrada: Dict, backend: str = None, n_procesos: int = None,
+                   paginas_por_tarea: int = 16) -> List[str]:
+    """Capa de texto de todas las páginas, desde la entrada de caché si se extrajo con el mismo backend"""
+    backend = _backend_pdf(backend)
+    if 'paginas_texto' not in entrada or entrada.get('backend') != backend:
+        inicio = time.perf_counter()
+        entrada['paginas_texto'] = [
+            texto for _, texto in _iterar_paginas_texto(ruta_pdf, backend, n_procesos, paginas_por_tarea)
+        ]
+        entrada['num_paginas'] = len(entrada['paginas_texto'])
+        entrada['backend'] = backend
+        entrada.setdefault('tiempos', {})['texto'] = round(time.perf_counter() - inicio, 3)
+        entrada['_modificada'] = True
+    return entrada['paginas_texto']
+
+
+def _clave_ocr(dpi: int, escala_grises: bool, lang: str) -> str:
+    """Parámetros que cambian el resultado del OCR (el timeout y los hilos no)"""
+    return f"{lang}|{dpi}|{'gris' if escala_grises else 'color'}"
+
+
+def _paginas_ocr(ruta_pdf: str, entrada: Dict, paginas: List[int], dpi: int = 200,
+                 escala_grises: bool = True, lang: str = 'spa',
+                 **kwargs_ocr) -> Iterator[Tuple[int, Optional[str]]]:
+    """
+    OCR de las páginas indicadas, en orden; solo se procesan las que no estén en
+    la entrada con los mismos parámetros. Las páginas en que tesseract falló
+    (timeout o error) se entregan como None y no se guardan, así la próxima
+    extracción las vuelve a intentar.
+    """
+    # Formato anterior: sin parámetros en la clave y con los fallos guardados como ""
+    if entrada.pop('paginas_ocr', None) is not None:
+        entrada['_modificada'] = True
+    cacheadas = entrada.setdefault('ocr', {}).setdefault(_clave_ocr(dpi, escala_grises, lang), {})
+    paginas = sorted(set(paginas))
+    faltantes = [p for p in paginas if str(p) not in cacheadas]
+    ocr = _iterar_paginas_ocr(ruta_pdf, faltantes, dpi, escala_grises, lang=lang, **kwargs_ocr)
+    
+    tiempos = entrada.setdefault('tiempos', {})
+    for numero in paginas:
+        if str(numero) in cacheadas:
+            yield numero, cacheadas[str(numero)]
+            continue
+        # Se mide cada página: el consumidor puede no agotar el generador
+        # y su propio tiempo entre páginas no cuenta como OCR
+        inicio = time.perf_counter()
+        _, texto = next(ocr)
+        tiempos['ocr'] = round(tiempos.get('ocr', 0) + time.perf_counter() - inicio, 3)
+        entrada['_modificada'] = True
+        if texto is not None:
+            cacheadas[str(numero)] = texto
+        yield numero, texto
+
+
+def _paginas_hibrido(ruta_pdf: str, entrada: Dict, min_caracteres_pagina: int = 50,
+                     backend: str = None, **kwargs_ocr) -> Iterator[Tuple[int, str, str]]:
+    """Páginas con su capa de texto u OCR donde hace falta; ver Funciones.iterar_paginas_pdf_hibrido"""
+    paginas = _paginas_texto(ruta_pdf, entrada, backend)
+    por_ocr = [numero for numero, texto in enumerate(paginas, 1)
+               if Funciones.pagina_requiere_ocr(texto, min_caracteres_pagina)]
+    
+    # El OCR también entrega las páginas en orden: se intercalan sin ordenar de nuevo
+    ocr = _paginas_ocr(ruta_pdf, entrada, por_ocr, **kwargs_ocr)
+    pendientes = set(por_ocr)
+    metodos = []
+    for numero, texto in enumerate(paginas, 1):
+        if numero in pendientes:
+            _, texto_ocr = next(ocr)
+            # Si el OCR falla o no reconoce nada se conserva lo que tuviera la capa de texto
+            if texto_ocr and texto_ocr.strip():
+                metodos.append('ocr')
+                yield numero, texto_ocr, 'ocr'
+                continue
+        metodos.append('texto')
+        yield numero, texto, 'texto'
+    if entrada.get('metodo_paginas') != metodos:
+        entrada['metodo_paginas'] = metodos
+        entrada['_modificada'] = True
 
 class Funciones:
     @staticmethod
@@ -49,6 +351,43 @@ class Funciones:
             print(f"Error al descomprimir ZIP: {e}")
             return []
     
+    @staticmethod
+    def iterar_json_zip(archivo_zip, errores: List[Dict] = None) -> Iterator[Tuple[str, Dict]]:
+        """
+        Lee los JSON de un ZIP directamente desde el archivo comprimido,
+        sin extraerlos a disco; cada miembro se descomprime y se parsea en memoria.
+        
+        Args:
+            archivo_zip: Ruta del ZIP u objeto tipo archivo con seek (p.ej. request.files['file'].stream)
+            errores: Lista opcional donde se agregan los miembros que no se pudieron leer
+            
+        Returns:
+            Generador de tuplas (nombre_miembro, documento). Un JSON con una lista
+            entrega cada elemento como un documento
+        """
+        with zipfile.ZipFile(archivo_zip, 'r') as zip_ref:
+            for info in zip_ref.infolist():
+                if info.is_dir() or not info.filename.lower().endswith('.json'):
+                    continue
+                # Metadatos de macOS (__MACOSX/._archivo.json)
+                if os.path.basename(info.filename).startswith('._'):
+                    continue
+                try:
+                    # utf-8-sig: algunos exportadores agregan BOM al inicio
+                    datos = json.loads(zip_ref.read(info).decode('utf-8-sig'))
+                except Exception as e:
+                    print(f"Error al leer {info.filename} del ZIP: {e}")
+                    if errores is not None:
+                        errores.append({'archivo': info.filename, 'error': str(e)})
+                    continue
+                
+                if isinstance(datos, list):
+                    for doc in datos:
+                        if isinstance(doc, dict):
+                            yield info.filename, doc
+                elif isinstance(datos, dict):
+                    yield info.filename, datos
+    
     @staticmethod
     def descargar_y_descomprimir_zip(url: str, carpeta_destino: str, tipoArchivo: str = '') -> List[Dict]:
         """Descarga y descomprime un ZIP desde URL"""
@@ -118,51 +457,215 @@ class Funciones:
             return False
 
     @staticmethod
-    def extraer_texto_pdf(ruta_pdf: str) -> str:
+    def iterar_paginas_pdf(ruta_pdf: str, backend: str = None, n_procesos: int = None,
+                           paginas_por_tarea: int = 16, usar_cache: bool = True) -> Iterator[Tuple[int, str]]:
+        """
+        Recorre el texto de un PDF página por página
+        
+        Los PDF largos se reparten en rangos de páginas entre varios procesos;
+        las páginas se entregan siempre en orden. Con la caché activa se
+        reutiliza la extracción anterior del mismo PDF y backend; sin caché las
+        páginas se entregan a medida que se extraen, sin armar el texto completo.
+        
+        Args:
+            ruta_pdf: Ruta del archivo PDF
+            backend: 'pymupdf' o 'pypdf2' (por defecto PyMuPDF si está instalado)
+            n_procesos: Procesos para extraer (None = pool compartido de PDF_PROCESOS
+                procesos, 1 = en este proceso, N = pool propio de N procesos)
+            paginas_por_tarea: Páginas que extrae cada tarea del pool
+            usar_cache: Consultar y actualizar la caché de extracción (SHA-256 del PDF)
+            
+        Returns:
+            Generador de tuplas (numero_pagina, texto), con páginas desde 1
+        """
+        cache, sha, entrada = _abrir_cache(ruta_pdf, usar_cache)
+        if cache is None:
+            yield from _iterar_paginas_texto(ruta_pdf, _backend_pdf(backend), n_procesos, paginas_por_tarea)
+            return
+        paginas = _paginas_texto(ruta_pdf, entrada, backend, n_procesos, paginas_por_tarea)
+        _cerrar_cache(cache, sha, entrada)
+        yield from enumerate(paginas, 1)
+    
+    @staticmethod
+    def extraer_texto_pdf(ruta_pdf: str, backend: str = None, n_procesos: int = None,
+                          separador: str = "\n", usar_cache: bool = True) -> str:
         """
         Extrae texto de un archivo PDF
         
         Args:
             ruta_pdf: Ruta del archivo PDF
+            backend: 'pymupdf' o 'pypdf2' (por defecto PyMuPDF si está instalado)
+            n_procesos: Procesos para extraer (ver iterar_paginas_pdf)
+            separador: Texto entre páginas ("\f" conserva los saltos de página)
+            usar_cache: Consultar y actualizar la caché de extracción (SHA-256 del PDF)
             
         Returns:
             Texto extraído del PDF
         """
         try:
-            texto = ""
-            with open(ruta_pdf, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                for page in pdf_reader.pages:
-                    texto += page.extract_text() + "\n"
-            return texto.strip()
+            paginas = Funciones.iterar_paginas_pdf(ruta_pdf, backend, n_procesos, usar_cache=usar_cache)
+            return separador.join(texto for _, texto in paginas).strip()
         except Exception as e:
             print(f"Error al extraer texto del PDF {ruta_pdf}: {e}")
             return ""
     
     @staticmethod
-    def extraer_texto_pdf_ocr(ruta_pdf: str) -> str:
+    def ocr_imagen(imagen: Image.Image, lang: str = 'spa', timeout: float = 120) -> str:
+        """
+        Aplica OCR a una imagen de página; si tesseract excede el timeout o
+        falla, registra el error y devuelve ""
+        
+        Args:
+            imagen: Imagen de la página
+            lang: Idioma de tesseract
+            timeout: Segundos máximos para la página (0 = sin límite)
+            
+        Returns:
+            Texto reconocido
+        """
+        return _ocr_pagina(imagen, lang, timeout) or ""
+    
+    @staticmethod
+    def iterar_paginas_pdf_ocr(ruta_pdf: str, paginas: List[int] = None, dpi: int = 200,
+                               escala_grises: bool = True, n_hilos: int = None,
+                               tam_ventana: int = None, timeout_pagina: float = 120,
+                               lang: str = 'spa', usar_cache: bool = True) -> Iterator[Tuple[int, str]]:
+        """
+        OCR de un PDF página por página con memoria acotada
+        
+        Las páginas se rasterizan por ventanas (first_page/last_page de pdf2image),
+        así solo hay tam_ventana imágenes en memoria a la vez, y cada ventana se
+        reparte entre hilos que ejecutan tesseract (un subproceso por página).
+        Con la caché activa solo se procesan las páginas sin OCR previo con los
+        mismos dpi, escala_grises y lang; las páginas fallidas se entregan como ""
+        y se reintentan en la próxima llamada.
+        
+        Args:
+            ruta_pdf: Ruta del archivo PDF
+            paginas: Páginas a procesar, desde 1 (por defecto todas)
+            dpi: Resolución de rasterizado (200 suele bastar para texto impreso)
+            escala_grises: Rasterizar en escala de grises (3 veces menos memoria)
+            n_hilos: Páginas en OCR simultáneo (por defecto, núcleos disponibles)
+            tam_ventana: Páginas rasterizadas a la vez (por defecto, n_hilos)
+            timeout_pagina: Segundos máximos de tesseract por página
+            lang: Idioma de tesseract
+            usar_cache: Consultar y actualizar la caché de extracción (SHA-256 del PDF)
+            
+        Returns:
+            Generador de tuplas (numero_pagina, texto) en orden
+        """
+        cache, sha, entrada = _abrir_cache(ruta_pdf, usar_cache)
+        if paginas is None:
+            num_paginas = entrada.get('num_paginas') or _contar_paginas(ruta_pdf, _backend_pdf())
+            paginas = range(1, num_paginas + 1)
+        try:
+            for numero, texto in _paginas_ocr(ruta_pdf, entrada, paginas, dpi=dpi,
+                                              escala_grises=escala_grises, lang=lang, n_hilos=n_hilos,
+                                              tam_ventana=tam_ventana, timeout_pagina=timeout_pagina):
+                yield numero, texto or ""
+        finally:
+            _cerrar_cache(cache, sha, entrada)
+    
+    @staticmethod
+    def extraer_texto_pdf_ocr(ruta_pdf: str, dpi: int = 200, escala_grises: bool = True,
+                              n_hilos: int = None, timeout_pagina: float = 120,
+                              separador: str = "\n", usar_cache: bool = True) -> str:
         """
         Extrae texto de un PDF usando OCR (útil para PDFs escaneados)
         
         Args:
             ruta_pdf: Ruta del archivo PDF
+            dpi: Resolución de rasterizado
+            escala_grises: Rasterizar en escala de grises
+            n_hilos: Páginas en OCR simultáneo (por defecto, núcleos disponibles)
+            timeout_pagina: Segundos máximos de tesseract por página
+            separador: Texto entre páginas ("\f" conserva los saltos de página)
+            usar_cache: Consultar y actualizar la caché de extracción (SHA-256 del PDF)
             
         Returns:
             Texto extraído usando OCR
         """
         try:
-     
-            # Convertir PDF a imágenes
-            images = convert_from_path(ruta_pdf)
+            paginas = Funciones.iterar_paginas_pdf_ocr(
+                ruta_pdf, dpi=dpi, escala_grises=escala_grises, n_hilos=n_hilos,
+                timeout_pagina=timeout_pagina, usar_cache=usar_cache
+            )
+            return separador.join(texto for _, texto in paginas).strip()
+        except Exception as e:
+            print(f"Error al extraer texto con OCR del PDF {ruta_pdf}: {e}")
+            return ""
+    
+    @staticmethod
+    def pagina_requiere_ocr(texto: str, min_caracteres: int = 50, min_proporcion_letras: float = 0.5) -> bool:
+        """
+        Indica si la capa de texto de una página está vacía o es basura
+        (p.ej. un anexo escaneado o una fuente sin mapa de caracteres)
+        
+        Args:
+            texto: Texto extraído de la página
+            min_caracteres: Caracteres visibles mínimos para considerar que hay texto
+            min_proporcion_letras: Proporción mínima de letras y dígitos entre los caracteres visibles
             
-            texto = ""
-            for i, image in enumerate(images):
-                # Aplicar OCR a cada página
-                texto += pytesseract.image_to_string(image, lang='spa') + "\n"
+        Returns:
+            True si conviene aplicar OCR a la página
+        """
+        visibles = [c for c in texto or '' if not c.isspace()]
+        if len(visibles) < min_caracteres:
+            return True
+        if '(cid:' in texto or texto.count('\ufffd') > len(visibles) * 0.05:
+            return True
+        letras = sum(1 for c in visibles if c.isalnum())
+        return letras / len(visibles) < min_proporcion_letras
+    
+    @staticmethod
+    def iterar_paginas_pdf_hibrido(ruta_pdf: str, min_caracteres_pagina: int = 50,
+                                   backend: str = None, usar_cache: bool = True,
+                                   **kwargs_ocr) -> Iterator[Tuple[int, str, str]]:
+        """
+        Extrae cada página de su capa de texto y aplica OCR solo a las páginas
+        sin texto útil (PDF mixtos: páginas digitadas con anexos escaneados)
+        
+        Args:
+            ruta_pdf: Ruta del archivo PDF
+            min_caracteres_pagina: Mínimo de caracteres visibles para no hacer OCR
+            backend: Backend de la capa de texto (ver iterar_paginas_pdf)
+            usar_cache: Consultar y actualizar la caché de extracción (SHA-256 del PDF)
+            kwargs_ocr: Argumentos para iterar_paginas_pdf_ocr (dpi, n_hilos, timeout_pagina...)
+            
+        Returns:
+            Generador de tuplas (numero_pagina, texto, metodo) en orden, con metodo 'texto' u 'ocr'
+        """
+        cache, sha, entrada = _abrir_cache(ruta_pdf, usar_cache)
+        try:
+            yield from _paginas_hibrido(ruta_pdf, entrada, min_caracteres_pagina, backend, **kwargs_ocr)
+        finally:
+            _cerrar_cache(cache, sha, entrada)
+    
+    @staticmethod
+    def extraer_texto_pdf_hibrido(ruta_pdf: str, min_caracteres_pagina: int = 50,
+                                  separador: str = "\n", usar_cache: bool = True,
+                                  **kwargs_ocr) -> str:
+        """
+        Extrae texto de un PDF con OCR por página solo donde hace falta
+        (ver iterar_paginas_pdf_hibrido)
+        
+        Args:
+            ruta_pdf: Ruta del archivo PDF
+            min_caracteres_pagina: Mínimo de caracteres visibles para no hacer OCR
+            separador: Texto entre páginas ("\f" conserva los saltos de página)
+            usar_cache: Consultar y actualizar la caché de extracción (SHA-256 del PDF)
+            kwargs_ocr: Argumentos para iterar_paginas_pdf_ocr
             
-            return texto.strip()
+        Returns:
+            Texto del PDF con las páginas en orden
+        """
+        try:
+            paginas = Funciones.iterar_paginas_pdf_hibrido(
+                ruta_pdf, min_caracteres_pagina, usar_cache=usar_cache, **kwargs_ocr
+            )
+            return separador.join(texto for _, texto, _ in paginas).strip()
         except Exception as e:
-            print(f"Error al extraer texto con OCR del PDF {ruta_pdf}: {e}")
+            print(f"Error al extraer texto del PDF {ruta_pdf}: {e}")
             return ""
     
     @staticmethod
@@ -236,18 +739,49 @@ class Funciones:
         Lee un archivo JSON y retorna su contenido
         
         Args:
-            ruta_json: Ruta del archivo JSON
+            ruta_json: Ruta del archivo JSON, o "carpeta_paquete::pdf_id" para
+                leer un documento de un corpus empaquetado
             
         Returns:
             Diccionario con el contenido del JSON
         """
         try:
+            if SEPARADOR_PAQUETE in ruta_json:
+                ruta_paquete, doc_id = ruta_json.rsplit(SEPARADOR_PAQUETE, 1)
+                doc = _abrir_paquete(ruta_paquete).leer(doc_id)
+                if doc is None:
+                    raise KeyError(f"{doc_id} no está en el paquete")
+                return doc
+            
             with open(ruta_json, 'r', encoding='utf-8') as f:
                 return json.load(f)
         except Exception as e:
             print(f"Error al leer JSON {ruta_json}: {e}")
             return {}
     
+    @staticmethod
+    def iterar_documentos_json(ruta: str) -> Iterator[Tuple[str, Dict]]:
+        """
+        Recorre los documentos de una carpeta de JSON o de un corpus empaquetado
+        
+        Args:
+            ruta: Carpeta con un JSON por documento, o carpeta de un paquete
+            
+        Returns:
+            Generador de tuplas (doc_id, documento); doc_id es pdf_id o, si no
+            existe, el nombre del archivo sin extensión
+        """
+        if CorpusEmpaquetado.es_paquete(ruta):
+            yield from _abrir_paquete(ruta).iterar()
+            return
+        
+        for fname in os.listdir(ruta):
+            if not fname.lower().endswith(".json"):
+                continue
+            with open(os.path.join(ruta, fname), "r", encoding="utf-8") as f:
+                doc = json.load(f)
+            yield str(doc.get("pdf_id", os.path.splitext(fname)[0])), doc
+    
     @staticmethod
     def guardar_json(ruta_json: str, datos: Dict) -> bool:
         """
@@ -271,4 +805,108 @@ class Funciones:
             return True
         except Exception as e:
             print(f"Error al guardar JSON: {e}")
-            return False
\ No newline at end of file
+            return False
+    
+    @staticmethod
+    def marcar_saltos_pagina(texto: str) -> str:
+        """
+        Reconstruye los saltos de página (\\f) de un texto extraído sin ellos,
+        a partir de los encabezados "Hoja No. N de M" de las resoluciones ANLA
+        
+        El salto reemplaza al \\n que precede a la línea del encabezado, así
+        el texto conserva su longitud y los offsets siguen siendo válidos. Solo
+        se aceptan encabezados consecutivos (2, 3, 4...) con el mismo total; si
+        no se reconocen al menos la mitad de las páginas el texto no se modifica.
+        
+        Args:
+            texto: Texto completo (páginas unidas con \\n)
+            
+        Returns:
+            Texto con \\f al inicio de cada página desde la 2
+        """
+        if not texto or '\f' in texto:
+            return texto
+        
+        saltos = []
+        ultima = 1
+        total = None
+        for m in _ENCABEZADO_HOJA.finditer(texto):
+            numero, de = int(m.group(1)), int(m.group(2))
+            if numero != ultima + 1 or numero > de or (total is not None and de != total):
+                continue
+            inicio_linea = texto.rfind('\n', 0, m.start())
+            if inicio_linea < 0:
+                continue
+            saltos.append(inicio_linea)
+            ultima, total = numero, de
+        
+        if not total or ultima * 2 < total:
+            return texto
+        
+        partes = []
+        anterior = 0
+        for salto in saltos:
+            partes.append(texto[anterior:salto])
+            partes.append('\f')
+            anterior = salto + 1
+        partes.append(texto[anterior:])
+        return ''.join(partes)
+    
+    @staticmethod
+    def dividir_en_fragmentos(texto: str, max_caracteres: int = 100000) -> List[Tuple[int, str]]:
+        """
+        Divide un texto largo en fragmentos de como máximo max_caracteres,
+        cortando preferiblemente en saltos de página, luego en párrafos,
+        luego en líneas y, en último caso, en espacios.
+        
+        Los fragmentos son subcadenas exactas del texto, así que el offset de
+        cualquier posición dentro de un fragmento es offset_fragmento + posición.
+        
+        Args:
+            texto: Texto a dividir
+            max_caracteres: Tamaño máximo de cada fragmento
+            
+        Returns:
+            Lista de tuplas (offset, fragmento) en orden
+        """
+        if not texto:
+            return []
+        
+        rangos = Funciones._dividir_rango(texto, 0, len(texto), max_caracteres, 0)
+        return [(inicio, texto[inicio:fin]) for inicio, fin in rangos]
+    
+    @staticmethod
+    def _dividir_rango(texto: str, inicio: int, fin: int, max_caracteres: int,
+                       nivel: int) -> List[Tuple[int, int]]:
+        """Divide texto[inicio:fin] en rangos usando el separador del nivel indicado"""
+        if fin - inicio <= max_caracteres:
+            return [(inicio, fin)]
+        
+        if nivel >= len(_SEPARADORES_FRAGMENTOS):
+            # Sin separadores útiles: corte duro
+            return [(i, min(i + max_caracteres, fin)) for i in range(inicio, fin, max_caracteres)]
+        
+        # Fin de cada unidad = fin de cada separador (el separador queda en la unidad anterior)
+        finales = [m.end() for m in _SEPARADORES_FRAGMENTOS[nivel].finditer(texto, inicio, fin)]
+        finales.append(fin)
+        
+        # Empaquetar unidades consecutivas mientras quepan
+        rangos = []
+        actual = inicio
+        anterior = inicio
+        for final in finales:
+            if final - actual > max_caracteres and anterior > actual:
+                rangos.append((actual, anterior))
+                actual = anterior
+            anterior = final
+        if anterior > actual:
+            rangos.append((actual, anterior))
+        
+        # Las unidades que aún exceden el máximo se dividen con el siguiente separador
+        resultado = []
+        for r_inicio, r_fin in rangos:
+            if r_fin - r_inicio > max_caracteres:
+                resultado.extend(Funciones._dividir_rango(texto, r_inicio, r_fin, max_caracteres, nivel + 1))
+            else:
+                resultado.append((r_inicio, r_fin))
+        return resultado
@@ -0,0 +1,466 @@
+import os
+import re
+import json
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from bs4 import BeautifulSoup
+
+from Helpers.webScraping import WebScraping
+from Helpers.gestorDescargas import GestorDescargas
+
+# Endpoint que devuelve las tarjetas de resoluciones (confirmado por inspección)
+GACETA_ENDPOINT = "https://gaceta.anla.gov.co:8443/Consultar-gaceta/consultar"
+# Endpoint real de descarga de PDFs: ?q=<pdf_id>
+GACETA_DESCARGA = "https://gaceta.anla.gov.co:8443/Consultar-gaceta/descargar"
+
+# Catálogo de resoluciones y carpeta de PDFs
+GACETA_CATALOGO = os.getenv('GACETA_CATALOGO', os.path.join('Data', 'ANLA_enlaces.json'))
+GACETA_PDF_DIR = os.getenv('GACETA_PDF_DIR', os.path.join('static', 'pdfs_anla'))
+
+# PALABRAS CLAVE PARA FILTRAR EN GACETA (METADATOS)
+EMPRESAS_HIDRO = [
+    "PAREX", "ECOPETROL", "FRONTERA", "GRAN TIERRA",
+    "HOCOL", "GEOPARK", "CANACOL", "OCCIDENTAL", "OXY",
+    "PERENCO", "PETRÓLEOS SUDAMERICANOS", "PETROLEOS SUDAMERICANOS",
+    "EMERALD ENERGY", "NEXEN"
+]
+
+PALABRAS_HIDRO = [
+    "HIDROCARBUROS", "PETRÓLEO", "PETROLEO",
+    "GAS NATURAL", "OLEODUCTO", "POZO", "CAMPO", "BLOQUE"
+]
+
+PALABRAS_REPOSICION = [
+    "RECURSO DE REPOSICIÓN",
+    "RECURSO DE REPOSICION",
+    "RESUELVE EL RECURSO DE REPOSICIÓN",
+    "RESUELVE EL RECURSO DE REPOSICION",
+    "REPÓNASE", "REPONASE"
+]
+
+_DESCARGAR = re.compile(r"descargar\((\d+)\)")
+
+
+def es_hidrocarburos_texto(texto: str) -> bool:
+    if not texto:
+        return False
+    t = texto.upper()
+    return (
+        any(emp in t for emp in EMPRESAS_HIDRO) or
+        any(pal in t for pal in PALABRAS_HIDRO)
+    )
+
+
+def es_reposicion_texto(texto: str) -> bool:
+    if not texto:
+        return False
+    t = texto.upper()
+    return any(pal in t for pal in PALABRAS_REPOSICION)
+
+
+def es_reposicion_hidrocarburos(tarjeta: Dict) -> bool:
+    """Filtro del corpus: recursos de reposición del sector hidrocarburos (en metadatos)"""
+    texto = tarjeta["texto_busqueda"]
+    return es_hidrocarburos_texto(texto) and es_reposicion_texto(texto)
+
+
+def es_pdf(ruta: str) -> bool:
+    """
+    Valida que un archivo descargado sea un PDF real (la Gaceta a veces
+    responde una página HTML de error con código 200)
+
+    Args:
+        ruta: Ruta del archivo
+
+    Returns:
+        True si la cabecera empieza por %PDF (ignorando un BOM UTF-8 inicial)
+    """
+    with open(ruta, 'rb') as f:
+        primeros = f.read(16)
+    return primeros.lstrip(b"\xef\xbb\xbf").startswith(b"%PDF")
+
+
+class GacetaANLA:
+    """
+    Catálogo y descarga de resoluciones de la Gaceta ANLA.
+
+    Las páginas de resultados se piden en paralelo (una ventana de
+    concurrencia páginas por delante de la que se procesa) y se procesan en
+    orden. La Gaceta lista primero lo más reciente: al llegar a una página con
+    pdf_id ya conocidos la paginación se detiene, así una actualización diaria
+    solo recorre las primeras páginas.
+
+    Esa parada solo es válida si el catálogo ya tiene todo lo anterior: junto
+    al catálogo se guarda un cursor (<catalogo>_estado.json) con la página a
+    la que llegó el recorrido completo y si ya terminó. Mientras no termine
+    (p.ej. una ejecución cortada por max_docs) cada actualización continúa
+    desde el cursor sin detenerse en los conocidos.
+
+    Usa la sesión de WebScraping (pool de conexiones, límites por dominio,
+    reintentos y caché HTTP) y GestorDescargas para los PDFs.
+    """
+
+    def __init__(self, palabra: str = "reposición", concurrencia: int = 4,
+                 filtro: Callable[[Dict], bool] = es_reposicion_hidrocarburos,
+                 scraper: WebScraping = None):
+        """
+        Inicializa el cliente de la Gaceta
+
+        Args:
+            palabra: Texto libre de la búsqueda (buscar_documento)
+            concurrencia: Páginas de resultados pedidas en paralelo (y descargas simultáneas)
+            filtro: Función (tarjeta) -> bool que decide qué resoluciones entran al catálogo
+                (None = todas)
+            scraper: WebScraping cuya sesión se reutiliza (se crea una si no se pasa)
+        """
+        self.palabra = palabra
+        self.concurrencia = max(1, concurrencia)
+        self.filtro = filtro
+        self.scraper = scraper or WebScraping(dominio_base=GACETA_ENDPOINT.rsplit('/', 2)[0] + '/',
+                                              concurrencia=self.concurrencia)
+
+    def obtener_soup(self, pagina: int = 1) -> BeautifulSoup:
+        """
+        Hace la solicitud GET al endpoint real que devuelve
+        las tarjetas de resoluciones.
+        """
+        params = {
+            "pagina": pagina,
+            "buscar_numero_documento": "",
+            "buscar_desde_fecha_documento": "",
+            "buscar_hasta_fecha_documento": "",
+            "buscar_tipo_documento": "",
+            "buscar_expediente": "",
+            "buscar_fecha": "",
+            "buscar_ubicacion": "",
+            "buscar_documento": self.palabra  # texto libre
+        }
+        r = self.scraper._obtener(GACETA_ENDPOINT, params=params, timeout=60)
+        r.raise_for_status()
+        return BeautifulSoup(r.text, "lxml")
+
+    @staticmethod
+    def extraer_tarjetas(soup: BeautifulSoup) -> List[Dict]:
+        """
+        Extrae información estructurada de cada tarjeta de resolución
+        en la página de resultados de la Gaceta ANLA.
+        Devuelve una lista de diccionarios.
+        """
+        resultados = []
+
+        # Cada resultado completo está en un <div class="member">
+        for card in soup.find_all("div", class_="member"):
+            # Titulo
+            heading = card.find("div", class_="item-box-blog-heading")
+            h5 = heading.find("h5") if heading else None
+            titulo = h5.get_text(strip=True) if h5 else "(sin título)"
+
+            # Metadatos
+            fecha_pub = None
+            proyecto = None
+            ubicacion = None
+            descripcion = None
+
+            for p in card.find_all("p"):
+                texto_p = p.get_text(" ", strip=True)
+
+                if "Publicado el" in texto_p:
+                    fecha_pub = texto_p.replace("Publicado el", "").replace(":", "").strip()
+                elif "Nombre de proyecto" in texto_p:
+                    proyecto = texto_p.replace("Nombre de proyecto:", "").strip()
+                elif "Ubicación" in texto_p:
+                    ubicacion = texto_p.replace("Ubicación:", "").strip()
+                elif "Descripción" in texto_p:
+                    descripcion = texto_p.replace("Descripción:", "").strip()
+
+            # PDF (id y URL)
+            pdf_id = None
+            for a in card.find_all("a", onclick=True):
+                m = _DESCARGAR.search(a.get("onclick", ""))
+                if m:
+                    pdf_id = m.group(1)
+                    break
+
+            # Texto combinado para filtros posteriores
+            texto_busqueda = " ".join(t for t in [titulo, proyecto or "", descripcion or ""] if t)
+
+            resultados.append({
+                "titulo": titulo,
+                "fecha_publicacion": fecha_pub,
+                "proyecto": proyecto,
+                "ubicacion": ubicacion,
+                "descripcion": descripcion,
+                "pdf_id": pdf_id,
+                "pdf_url": f"{GACETA_DESCARGA}?q={pdf_id}" if pdf_id else None,
+                "texto_busqueda": texto_busqueda
+            })
+
+        return resultados
+
+    def obtener_tarjetas(self, pagina: int) -> List[Dict]:
+        """Tarjetas de una página de resultados"""
+        return self.extraer_tarjetas(self.obtener_soup(pagina))
+
+    def buscar_nuevas(self, conocidos: Set[str] = None, max_docs: int = None,
+                      max_paginas: int = 1000, paginas_margen: int = 1,
+                      desde_pagina: int = 1, parada_temprana: bool = True) -> Dict:
+        """
+        Recorre las páginas de resultados hasta llegar a resoluciones conocidas
+
+        Args:
+            conocidos: pdf_id ya catalogados (vacío = recorrer todo)
+            max_docs: Máximo de resoluciones nuevas (que pasan el filtro)
+            max_paginas: Límite de seguridad de páginas
+            paginas_margen: Páginas que se siguen revisando después de la primera
+                con un pdf_id conocido (tolera publicaciones fuera de orden)
+            desde_pagina: Primera página a recorrer
+            parada_temprana: Detenerse al llegar a pdf_id conocidos (False = recorrer
+                hasta el final, solo omitiendo los conocidos)
+
+        Returns:
+            Diccionario con 'success', las tarjetas nuevas en orden, la última página
+            procesada ('paginas') y 'completo' (True si el recorrido llegó al final de
+            los resultados o a los conocidos, sin cortarse por max_docs ni max_paginas)
+        """
+        conocidos = conocidos or set()
+        nuevas: List[Dict] = []
+        vistos: Set[str] = set()
+        parar_en: Optional[int] = None
+        pagina = desde_pagina
+        siguiente = desde_pagina
+        en_curso = {}
+        completo = False
+
+        executor = ThreadPoolExecutor(max_workers=self.concurrencia)
+        try:
+            while pagina <= max_paginas:
+                # Mantiene 'concurrencia' páginas pedidas por delante de la actual
+                limite = min(max_paginas, parar_en or max_paginas)
+                while siguiente <= limite and len(en_curso) < self.concurrencia:
+                    en_curso[siguiente] = executor.submit(self.obtener_tarjetas, siguiente)
+                    siguiente += 1
+                if pagina not in en_curso:
+                    break
+
+                tarjetas = en_curso.pop(pagina).result()
+                print(f"Página {pagina}: {len(tarjetas)} tarjetas")
+
+                # Si ya no hay tarjetas se detiene
+                if not tarjetas:
+                    completo = True
+                    break
+
+                for t in tarjetas:
+                    pdf_id = t["pdf_id"]
+                    if not pdf_id or pdf_id in vistos:
+                        continue
+                    vistos.add(pdf_id)
+
+                    if pdf_id in conocidos:
+                        if parada_temprana and parar_en is None:
+                            parar_en = pagina + paginas_margen
+                            print(f"  pdf_id {pdf_id} ya está en el catálogo: se revisa hasta la página {parar_en}")
+                        continue
+
+                    if self.filtro and not self.filtro(t):
+                        continue
+
+                    nuevas.append(t)
+                    print(f"  [+] Agregada: {t['titulo']}")
+                    if max_docs and len(nuevas) >= max_docs:
+                        break
+
+                if max_docs and len(nuevas) >= max_docs:
+                    print("Se alcanzó el máximo de resoluciones configurado.")
+                    break
+                if parar_en is not None and pagina >= parar_en:
+                    completo = True
+                    break
+                pagina += 1
+
+        except Exception as e:
+            # Sin guardar nada: si faltara una página, la próxima actualización
+            # se detendría antes de llegar a sus resoluciones
+            print(f"Error al recorrer la Gaceta (página {pagina}): {e}")
+            return {'success': False, 'error': str(e), 'paginas': pagina}
+        finally:
+            for futuro in en_curso.values():
+                futuro.cancel()
+            executor.shutdown(wait=False)
+
+        return {'success': True, 'nuevas': nuevas, 'paginas': pagina, 'completo': completo}
+
+    @staticmethod
+    def cargar_catalogo(ruta: str) -> List[Dict]:
+        """Catálogo guardado (lista de resoluciones), o lista vacía si no existe"""
+        if not os.path.exists(ruta):
+            return []
+        with open(ruta, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    @staticmethod
+    def ruta_estado(ruta_catalogo: str) -> str:
+        """Archivo del cursor del recorrido completo, junto al catálogo"""
+        return os.path.splitext(ruta_catalogo)[0] + '_estado.json'
+
+    @classmethod
+    def cargar_estado(cls, ruta_catalogo: str) -> Dict:
+        """
+        Cursor del recorrido completo del catálogo
+
+        Returns:
+            Diccionario con 'completo' (ya se recorrieron todas las páginas una vez) y
+            'pagina' (página a la que llegó el recorrido pendiente). Sin archivo de
+            estado el catálogo se considera incompleto
+        """
+        try:
+            with open(cls.ruta_estado(ruta_catalogo), 'r', encoding='utf-8') as f:
+                estado = json.load(f)
+            return {'completo': bool(estado.get('completo')), 'pagina': int(estado.get('pagina') or 1)}
+        except (OSError, ValueError):
+            return {'completo': False, 'pagina': 1}
+
+    @staticmethod
+    def _escribir_json(ruta: str, datos, **kwargs):
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        temporal = ruta + '.tmp'
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(datos, f, ensure_ascii=False, **kwargs)
+        os.replace(temporal, ruta)
+
+    def actualizar_catalogo(self, ruta_catalogo: str = None, max_docs: int = None,
+                            ids_conocidos: Iterable[str] = None, paginas_margen: int = 1) -> Dict:
+        """
+        Agrega al catálogo las resoluciones publicadas desde la última actualización
+
+        Con el catálogo completo se recorren solo las páginas nuevas (parada en
+        los conocidos). Si no, se continúa el recorrido desde el cursor guardado
+        hasta el final; una ejecución cortada por max_docs deja el cursor en la
+        página donde se detuvo y la siguiente sigue desde ahí.
+
+        Args:
+            ruta_catalogo: Archivo JSON del catálogo (por defecto GACETA_CATALOGO)
+            max_docs: Máximo de resoluciones nuevas
+            ids_conocidos: pdf_id adicionales a considerar conocidos (p.ej. los ya indexados)
+            paginas_margen: Páginas de margen de la parada en conocidos y al retomar el
+                cursor (las páginas se corren cuando se publican resoluciones nuevas)
+
+        Returns:
+            Diccionario con 'success', el número de nuevas, el total del catálogo
+            y si el catálogo ya está completo
+        """
+        ruta_catalogo = ruta_catalogo or GACETA_CATALOGO
+        catalogo = self.cargar_catalogo(ruta_catalogo)
+        estado = self.cargar_estado(ruta_catalogo)
+        conocidos = {str(d["pdf_id"]) for d in catalogo if d.get("pdf_id")}
+        conocidos.update(str(i) for i in ids_conocidos or [])
+
+        if estado['completo']:
+            resultado = self.buscar_nuevas(conocidos, max_docs=max_docs, paginas_margen=paginas_margen)
+        else:
+            desde = max(1, estado['pagina'] - paginas_margen)
+            print(f"Catálogo incompleto: se continúa el recorrido desde la página {desde}")
+            resultado = self.buscar_nuevas(conocidos, max_docs=max_docs, desde_pagina=desde,
+                                           parada_temprana=False)
+        if not resultado['success']:
+            return resultado
+
+        # Si max_docs cortó el recorrido, entre lo nuevo y lo conocido quedan
+        # resoluciones sin revisar: la siguiente ejecución retoma desde aquí
+        estado = {'completo': resultado['completo'],
+                  'pagina': 1 if resultado['completo'] else resultado['paginas']}
+
+        nuevas = [{
+            "tipo": "pdf",
+            "titulo": t["titulo"],
+            "fecha_publicacion": t["fecha_publicacion"],
+            "proyecto": t["proyecto"],
+            "ubicacion": t["ubicacion"],
+            "descripcion": t["descripcion"],
+            "pdf_id": t["pdf_id"],
+            "url": t["pdf_url"],
+            "categoria": "ANLA_GACETA"
+        } for t in resultado['nuevas']]
+
+        # Lo más reciente primero, como en la Gaceta
+        catalogo = nuevas + catalogo
+
+        # El catálogo se escribe antes que el cursor: si el proceso se corta
+        # entre ambos, la siguiente ejecución repite páginas pero no salta ninguna
+        self._escribir_json(ruta_catalogo, catalogo, indent=2)
+        self._escribir_json(self.ruta_estado(ruta_catalogo), estado)
+
+        print(f"Catálogo ANLA: {len(nuevas)} nuevas, {len(catalogo)} en total ({ruta_catalogo})"
+              + ("" if estado['completo'] else f"; recorrido pendiente desde la página {estado['pagina']}"))
+        return {
+            'success': True,
+            'nuevas': len(nuevas),
+            'total': len(catalogo),
+            'paginas': resultado['paginas'],
+            'completo': estado['completo'],
+            'pdf_ids_nuevos': [d["pdf_id"] for d in nuevas]
+        }
+
+    def descargar_pdfs(self, catalogo: List[Dict], carpeta_destino: str = None,
+                       omitir_existentes: bool = True) -> Dict:
+        """
+        Descarga los PDFs del catálogo como ANLA_<pdf_id>.pdf
+
+        Args:
+            catalogo: Lista de resoluciones (formato de actualizar_catalogo)
+            carpeta_destino: Carpeta de los PDFs (por defecto GACETA_PDF_DIR)
+            omitir_existentes: No pedir los PDFs que ya están en la carpeta
+                (una resolución publicada no cambia)
+
+        Returns:
+            Diccionario con el resultado de GestorDescargas
+        """
+        carpeta_destino = carpeta_destino or GACETA_PDF_DIR
+        os.makedirs(carpeta_destino, exist_ok=True)
+
+        archivos = []
+        for doc in catalogo:
+            pdf_id = doc.get("pdf_id")
+            if not pdf_id:
+                continue
+            nombre = f"ANLA_{pdf_id}.pdf"
+            if omitir_existentes and os.path.exists(os.path.join(carpeta_destino, nombre)):
+                continue
+            archivos.append((f"{GACETA_DESCARGA}?q={pdf_id}", nombre))
+
+        print(f"PDFs por descargar: {len(archivos)} de {len(catalogo)}")
+        gestor = GestorDescargas(self.scraper.session, n_hilos=self.concurrencia,
+                                 obtener=self.scraper._obtener, validador=es_pdf)
+        resultado = gestor.descargar_todos(archivos, carpeta_destino)
+        resultado['success'] = True
+        resultado['omitidos'] = len(catalogo) - len(archivos)
+        return resultado
+
+    def close(self):
+        """Cierra la sesión de requests"""
+        self.scraper.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Actualiza el catálogo de la Gaceta ANLA y descarga los PDFs nuevos')
+    parser.add_argument('--catalogo', default=GACETA_CATALOGO)
+    parser.add_argument('--pdfs', default=GACETA_PDF_DIR)
+    parser.add_argument('--palabra', default='reposición')
+    parser.add_argument('--max-docs', type=int, default=None)
+    parser.add_argument('--concurrencia', type=int, default=4)
+    parser.add_argument('--sin-descarga', action='store_true')
+    argumentos = parser.parse_args()
+
+    gaceta = GacetaANLA(palabra=argumentos.palabra, concurrencia=argumentos.concurrencia)
+    resultado = gaceta.actualizar_catalogo(argumentos.catalogo, max_docs=argumentos.max_docs)
+    print({k: v for k, v in resultado.items() if k != 'pdf_ids_nuevos'})
+
+    if resultado['success'] and not argumentos.sin_descarga:
+        catalogo = GacetaANLA.cargar_catalogo(argumentos.catalogo)
+        descarga = gaceta.descargar_pdfs(catalogo, argumentos.pdfs)
+        print({k: v for k, v in descarga.items() if k != 'archivos_con_error'})
+    gaceta.close()
@@ -0,0 +1,340 @@
+import os
+import json
+import time
+import uuid
+import fcntl
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import BinaryIO, Callable, Dict, Optional, Tuple
+
+# Carpeta de las cargas por partes (fuera de static/ para que no se sirvan públicamente)
+CARGAS_DIR = os.getenv('CARGAS_DIR', os.path.join('Data', 'cargas'))
+
+
+class GestorCargas:
+    """
+    Cargas por partes (chunked) y reanudables de archivos grandes.
+
+    Protocolo:
+        1. iniciar(nombre, tamano) -> carga_id
+        2. escribir_parte(carga_id, offset, stream) por cada parte, en orden.
+           Si la conexión se corta, estado(carga_id)['offset'] indica desde
+           dónde continuar.
+        3. Al recibir el último byte se verifica el SHA-256 (si el cliente lo
+           envió) y el archivo se entrega a al_completar en un hilo aparte, en
+           el mismo lugar donde se escribió (sin copias).
+
+    El estado de cada carga se guarda en <carga_id>.json junto al archivo
+    <carga_id>.part, así una carga se puede reanudar aunque el servidor se reinicie.
+    Las cargas abandonadas (sin partes nuevas ni avance del procesamiento
+    durante max_edad_inactiva) se eliminan al iniciar cargas nuevas.
+
+    Varios workers de gunicorn pueden atender la misma carga: los cambios de
+    estado se hacen con flock sobre <carga_id>.lock (el .json se reemplaza
+    en cada escritura, así que no sirve como lock), y mientras una carga se
+    procesa su worker mantiene flock sobre <carga_id>.proceso, con lo que
+    ningún proceso la expira.
+    """
+
+    def __init__(self, directorio: str = None, al_completar: Callable[[Dict, str], Dict] = None,
+                 tam_parte_max: int = 16 * 1024 * 1024, tam_bloque: int = 1024 * 1024,
+                 max_edad_inactiva: float = 24 * 3600, max_edad_terminadas: float = 7 * 24 * 3600):
+        """
+        Inicializa el gestor
+
+        Args:
+            directorio: Carpeta de trabajo (por defecto CARGAS_DIR)
+            al_completar: Función (carga, ruta_archivo) -> resultado que procesa el archivo completo
+            tam_parte_max: Tamaño máximo aceptado por parte
+            tam_bloque: Bytes leídos del stream de la petición en cada lectura
+            max_edad_inactiva: Segundos sin actividad tras los que se elimina una carga
+                en estado 'recibiendo' o 'procesando' (archivo parcial y estado)
+            max_edad_terminadas: Segundos tras los que se elimina el estado de una carga terminada
+        """
+        self.directorio = directorio or CARGAS_DIR
+        self.al_completar = al_completar
+        self.tam_parte_max = tam_parte_max
+        self.tam_bloque = tam_bloque
+        self.max_edad_inactiva = max_edad_inactiva
+        self.max_edad_terminadas = max_edad_terminadas
+
+        # SHA-256 incremental de cada carga activa junto al offset que cubre.
+        # Se reconstruye leyendo el archivo si el proceso se reinició o si otra
+        # parte la recibió otro worker de gunicorn
+        self._hashes: Dict[str, Tuple[int, "hashlib._Hash"]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+        os.makedirs(self.directorio, exist_ok=True)
+
+    def _ruta_archivo(self, carga_id: str) -> str:
+        return os.path.join(self.directorio, f"{carga_id}.part")
+
+    def _ruta_estado(self, carga_id: str) -> str:
+        return os.path.join(self.directorio, f"{carga_id}.json")
+
+    def _ruta_proceso(self, carga_id: str) -> str:
+        return os.path.join(self.directorio, f"{carga_id}.proceso")
+
+    @contextmanager
+    def _lock_carga(self, carga_id: str):
+        """Exclusión entre hilos (threading.Lock) y entre workers (flock sobre <carga_id>.lock)"""
+        with self._lock:
+            lock = self._locks.setdefault(carga_id, threading.Lock())
+        with lock, open(os.path.join(self.directorio, f"{carga_id}.lock"), 'a') as archivo:
+            fcntl.flock(archivo, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(archivo, fcntl.LOCK_UN)
+
+    def _en_proceso(self, carga_id: str) -> bool:
+        """Indica si algún worker (este u otro) está procesando la carga"""
+        try:
+            with open(self._ruta_proceso(carga_id), 'rb') as archivo:
+                fcntl.flock(archivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                fcntl.flock(archivo, fcntl.LOCK_UN)
+            return False
+        except FileNotFoundError:
+            return False
+        except BlockingIOError:
+            return True
+
+    def _guardar_estado(self, carga: Dict):
+        temporal = self._ruta_estado(carga['carga_id']) + '.tmp'
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(carga, f, ensure_ascii=False)
+        os.replace(temporal, self._ruta_estado(carga['carga_id']))
+
+    def _leer_estado(self, carga_id: str) -> Optional[Dict]:
+        # El id viene de la URL: solo se aceptan ids generados por iniciar()
+        if not carga_id or not all(c in '0123456789abcdef' for c in carga_id):
+            return None
+        try:
+            with open(self._ruta_estado(carga_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def iniciar(self, nombre: str, tamano: int, sha256: str = None, datos: Dict = None) -> Dict:
+        """
+        Registra una carga nueva
+
+        Args:
+            nombre: Nombre original del archivo
+            tamano: Tamaño total en bytes
+            sha256: Hash esperado del archivo completo (opcional)
+            datos: Datos para al_completar (p.ej. índice destino)
+
+        Returns:
+            Estado de la carga (incluye carga_id, offset y tam_parte_max)
+        """
+        if tamano <= 0:
+            raise ValueError("El tamaño del archivo debe ser mayor que cero")
+        self._expirar_cargas()
+
+        carga = {
+            'carga_id': uuid.uuid4().hex,
+            'nombre': nombre,
+            'tamano': int(tamano),
+            'sha256_esperado': (sha256 or '').lower() or None,
+            'datos': datos or {},
+            'offset': 0,
+            'estado': 'recibiendo',
+            'creada': time.time(),
+            'actualizada': time.time(),
+            'resultado': None
+        }
+        open(self._ruta_archivo(carga['carga_id']), 'wb').close()
+        self._hashes[carga['carga_id']] = (0, hashlib.sha256())
+        self._guardar_estado(carga)
+        return self._publico(carga)
+
+    def estado(self, carga_id: str) -> Optional[Dict]:
+        """Estado de una carga (None si no existe)"""
+        carga = self._leer_estado(carga_id)
+        return self._publico(carga) if carga else None
+
+    def _publico(self, carga: Dict) -> Dict:
+        estado = {k: v for k, v in carga.items() if k != 'datos'}
+        estado['tam_parte_max'] = self.tam_parte_max
+        return estado
+
+    def _hash_actual(self, carga_id: str, offset: int):
+        """SHA-256 de los primeros offset bytes (de memoria o releyendo el archivo)"""
+        offset_hash, sha = self._hashes.get(carga_id, (None, None))
+        if offset_hash != offset:
+            sha = hashlib.sha256()
+            with open(self._ruta_archivo(carga_id), 'rb') as f:
+                restante = offset
+                while restante > 0:
+                    bloque = f.read(min(self.tam_bloque, restante))
+                    if not bloque:
+                        break
+                    sha.update(bloque)
+                    restante -= len(bloque)
+        return sha
+
+    def escribir_parte(self, carga_id: str, offset: int, stream: BinaryIO,
+                       sha256_parte: str = None) -> Dict:
+        """
+        Agrega una parte al archivo
+
+        Args:
+            carga_id: Id devuelto por iniciar()
+            offset: Posición del primer byte de la parte (debe ser el offset actual)
+            stream: Stream con los bytes de la parte (p.ej. request.stream)
+            sha256_parte: Hash de la parte (opcional); si no coincide la parte se descarta
+
+        Returns:
+            Diccionario con 'success' y el estado de la carga; si el offset no
+            coincide, 'offset' indica desde dónde debe reenviar el cliente
+        """
+        with self._lock_carga(carga_id):
+            carga = self._leer_estado(carga_id)
+            if carga is None:
+                return {'success': False, 'error': 'Carga no encontrada'}
+            if carga['estado'] != 'recibiendo':
+                return {'success': False, 'error': f"La carga está en estado {carga['estado']}",
+                        'carga': self._publico(carga)}
+            if offset != carga['offset']:
+                return {'success': False, 'error': 'Offset fuera de orden',
+                        'offset': carga['offset']}
+
+            # La parte se lee completa antes de escribirla: así una parte
+            # cortada o con hash incorrecto no deja bytes a medias en el archivo
+            maximo = min(self.tam_parte_max, carga['tamano'] - offset)
+            partes = []
+            leidos = 0
+            while True:
+                bloque = stream.read(self.tam_bloque)
+                if not bloque:
+                    break
+                leidos += len(bloque)
+                if leidos > maximo:
+                    return {'success': False, 'error': 'La parte excede el tamaño permitido',
+                            'offset': carga['offset']}
+                partes.append(bloque)
+            contenido = b''.join(partes)
+
+            if not contenido:
+                return {'success': False, 'error': 'Parte vacía', 'offset': carga['offset']}
+            if sha256_parte and hashlib.sha256(contenido).hexdigest() != sha256_parte.lower():
+                return {'success': False, 'error': 'Checksum de la parte no coincide',
+                        'offset': carga['offset']}
+
+            sha = self._hash_actual(carga_id, offset)
+            with open(self._ruta_archivo(carga_id), 'r+b') as f:
+                # Si una escritura anterior quedó a medias, se sobrescribe desde el offset confirmado
+                f.seek(offset)
+                f.write(contenido)
+                f.truncate()
+            sha.update(contenido)
+
+            carga['offset'] = offset + len(contenido)
+            self._hashes[carga_id] = (carga['offset'], sha)
+            carga['actualizada'] = time.time()
+
+            if carga['offset'] >= carga['tamano']:
+                self._finalizar(carga, sha.hexdigest())
+            else:
+                self._guardar_estado(carga)
+
+            return {'success': True, 'carga': self._publico(carga)}
+
+    def _finalizar(self, carga: Dict, sha256: str):
+        """Verifica el checksum y entrega el archivo al procesamiento en segundo plano"""
+        carga_id = carga['carga_id']
+        self._hashes.pop(carga_id, None)
+        carga['sha256'] = sha256
+
+        if carga['sha256_esperado'] and carga['sha256_esperado'] != sha256:
+            carga['estado'] = 'error_checksum'
+            self._guardar_estado(carga)
+            os.remove(self._ruta_archivo(carga_id))
+            return
+
+        carga['estado'] = 'procesando' if self.al_completar else 'completada'
+        self._guardar_estado(carga)
+
+        if self.al_completar:
+            threading.Thread(target=self._procesar, args=(carga_id,), daemon=True).start()
+
+    def _procesar(self, carga_id: str):
+        ruta = self._ruta_archivo(carga_id)
+        ruta_proceso = self._ruta_proceso(carga_id)
+        # La marca queda tomada hasta el final: ningún worker expira la carga aunque tarde
+        with open(ruta_proceso, 'a') as marca:
+            fcntl.flock(marca, fcntl.LOCK_EX)
+            try:
+                carga = self._leer_estado(carga_id)
+                if carga is None:
+                    # Se canceló o expiró entre la última parte y el inicio del procesamiento
+                    print(f"La carga {carga_id} ya no existe; no se procesa")
+                    return
+                try:
+                    carga['resultado'] = self.al_completar(carga, ruta)
+                    carga['estado'] = 'completada'
+                except Exception as e:
+                    print(f"Error al procesar la carga {carga_id}: {e}")
+                    carga['resultado'] = {'success': False, 'error': str(e)}
+                    carga['estado'] = 'error'
+
+                with self._lock_carga(carga_id):
+                    # Si se canceló mientras se procesaba no se vuelve a crear su estado
+                    if self._leer_estado(carga_id) is not None:
+                        carga['actualizada'] = time.time()
+                        self._guardar_estado(carga)
+            finally:
+                # El archivo ya fue consumido por el pipeline de ingesta
+                for archivo in (ruta, ruta_proceso):
+                    if os.path.exists(archivo):
+                        os.remove(archivo)
+
+    def cancelar(self, carga_id: str) -> bool:
+        """Elimina una carga y su archivo parcial"""
+        with self._lock_carga(carga_id):
+            carga = self._leer_estado(carga_id)
+            if carga is None:
+                return False
+            self._eliminar(carga_id)
+            return True
+
+    def _eliminar(self, carga_id: str):
+        self._hashes.pop(carga_id, None)
+        for ruta in (self._ruta_archivo(carga_id), self._ruta_estado(carga_id),
+                     os.path.join(self.directorio, f"{carga_id}.lock")):
+            if os.path.exists(ruta):
+                os.remove(ruta)
+        with self._lock:
+            self._locks.pop(carga_id, None)
+
+    def _expirar_cargas(self):
+        """
+        Elimina las cargas abandonadas: las que siguen en 'recibiendo' o
+        'procesando' sin actividad desde hace max_edad_inactiva (el cliente no
+        volvió o el proceso que las procesaba se detuvo) y el estado de las
+        terminadas hace más de max_edad_terminadas
+        """
+        ahora = time.time()
+        for archivo in os.listdir(self.directorio):
+            carga_id, extension = os.path.splitext(archivo)
+            ruta = os.path.join(self.directorio, archivo)
+            try:
+                if extension != '.json':
+                    # Archivos parciales, temporales o locks sin estado (escritura interrumpida)
+                    if (not os.path.exists(self._ruta_estado(carga_id.split('.')[0]))
+                            and os.path.getmtime(ruta) < ahora - self.max_edad_inactiva):
+                        os.remove(ruta)
+                    continue
+                carga = self._leer_estado(carga_id)
+                if carga is None or self._en_proceso(carga_id):
+                    continue
+                activa = carga['estado'] in ('recibiendo', 'procesando')
+                max_edad = self.max_edad_inactiva if activa else self.max_edad_terminadas
+                if carga.get('actualizada', 0) < ahora - max_edad:
+                    with self._lock_carga(carga_id):
+                        self._eliminar(carga_id)
+            except OSError as e:
+                print(f"Error al expirar la carga {archivo}: {e}")
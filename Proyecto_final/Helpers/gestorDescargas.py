@@ -0,0 +1,268 @@
+import os
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Tuple
+
+import requests
+
+# Manifiesto de descargas dentro de la carpeta destino (ETag/Last-Modified/tamaño por URL)
+ARCHIVO_MANIFIESTO = '.descargas.json'
+
+# Sufijo de los archivos a medio descargar (se reanudan con Range)
+SUFIJO_PARCIAL = '.part'
+
+
+class GestorDescargas:
+    """
+    Descargas en paralelo, incrementales y reanudables.
+
+    - Un archivo ya descargado se pide con GET condicional (If-None-Match /
+      If-Modified-Since): si el servidor responde 304 no se vuelve a bajar.
+    - Una descarga cortada queda en <archivo>.part y se continúa con una
+      petición Range (con If-Range, así si el archivo cambió se baja entero).
+    - El archivo final aparece con un rename atómico: nunca queda un PDF a
+      medias con el nombre definitivo.
+    - Un validador opcional revisa el archivo antes de publicarlo.
+    """
+
+    def __init__(self, session: requests.Session = None, n_hilos: int = 4,
+                 tam_bloque: int = 64 * 1024, reintentos: int = 3, timeout: int = 60,
+                 obtener: Callable[..., requests.Response] = None,
+                 validador: Callable[[str], bool] = None):
+        """
+        Inicializa el gestor
+
+        Args:
+            session: Sesión HTTP compartida por los hilos (pool de conexiones)
+            n_hilos: Descargas simultáneas
+            tam_bloque: Bytes por lectura del cuerpo (lo que se pierde como máximo si la conexión se corta)
+            reintentos: Reanudaciones por archivo si la conexión se corta a mitad
+            timeout: Timeout de cada petición en segundos
+            obtener: Función (url, **kwargs) -> Response que reemplaza a session.get
+                (p.ej. WebScraping._obtener, con límites por dominio y reintentos)
+            validador: Función (ruta) -> bool; si devuelve False el archivo se descarta
+        """
+        self.session = session or requests.Session()
+        self.n_hilos = max(1, n_hilos)
+        self.tam_bloque = tam_bloque
+        self.reintentos = reintentos
+        self.timeout = timeout
+        self.obtener = obtener or self.session.get
+        self.validador = validador
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _cargar_manifiesto(carpeta: str) -> Dict[str, Dict]:
+        try:
+            with open(os.path.join(carpeta, ARCHIVO_MANIFIESTO), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _guardar_manifiesto(self, carpeta: str, manifiesto: Dict[str, Dict]):
+        ruta = os.path.join(carpeta, ARCHIVO_MANIFIESTO)
+        with self._lock:
+            contenido = json.dumps(manifiesto, ensure_ascii=False)
+        temporal = ruta + '.tmp'
+        with open(temporal, 'w', encoding='utf-8') as f:
+            f.write(contenido)
+        os.replace(temporal, ruta)
+
+    @staticmethod
+    def _validadores(respuesta: requests.Response) -> Dict:
+        return {
+            'etag': respuesta.headers.get('ETag'),
+            'last_modified': respuesta.headers.get('Last-Modified')
+        }
+
+    def descargar(self, url: str, ruta: str, anterior: Dict = None) -> Dict:
+        """
+        Descarga un archivo (o confirma que no cambió)
+
+        Args:
+            url: URL del archivo
+            ruta: Ruta final del archivo
+            anterior: Entrada del manifiesto de una descarga previa (etag, last_modified, tamano)
+
+        Returns:
+            Diccionario con 'estado' ('descargado', 'reanudado', 'sin_cambios' o 'error'),
+            los bytes transferidos y la entrada actualizada del manifiesto
+        """
+        anterior = anterior or {}
+        parcial = ruta + SUFIJO_PARCIAL
+        transferidos = 0
+        reanudado = False
+
+        for intento in range(self.reintentos + 1):
+            cabeceras = {}
+            existe = os.path.exists(ruta)
+            offset = os.path.getsize(parcial) if os.path.exists(parcial) else 0
+            esperado = None
+
+            if existe and anterior.get('tamano') == os.path.getsize(ruta):
+                # Ya descargado: GET condicional
+                if anterior.get('etag'):
+                    cabeceras['If-None-Match'] = anterior['etag']
+                if anterior.get('last_modified'):
+                    cabeceras['If-Modified-Since'] = anterior['last_modified']
+            elif offset and (anterior.get('etag_parcial') or anterior.get('last_modified_parcial')):
+                # Descarga cortada: se pide solo lo que falta, si el archivo no cambió
+                cabeceras['Range'] = f"bytes={offset}-"
+                cabeceras['If-Range'] = anterior.get('etag_parcial') or anterior['last_modified_parcial']
+
+            try:
+                respuesta = self.obtener(url, stream=True, timeout=self.timeout, headers=cabeceras)
+                with respuesta:
+                    if respuesta.status_code == 304 and existe:
+                        return {'estado': 'sin_cambios', 'bytes': 0, 'manifiesto': anterior}
+                    if respuesta.status_code == 416 and 'Range' in cabeceras:
+                        return self._rango_no_satisfacible(url, ruta, anterior, respuesta, offset)
+                    respuesta.raise_for_status()
+
+                    validadores = self._validadores(respuesta)
+                    longitud = respuesta.headers.get('Content-Length')
+
+                    if existe and not anterior and longitud and int(longitud) == os.path.getsize(ruta):
+                        # Archivo de una ejecución sin manifiesto: mismo tamaño, se da por igual
+                        return {'estado': 'sin_cambios', 'bytes': 0,
+                                'manifiesto': {**validadores, 'tamano': int(longitud)}}
+
+                    if respuesta.status_code == 206:
+                        modo = 'ab'
+                        reanudado = True
+                        # Content-Range: bytes inicio-fin/total
+                        total = respuesta.headers.get('Content-Range', '').rsplit('/', 1)[-1]
+                        esperado = int(total) if total.isdigit() else None
+                    else:
+                        modo = 'wb'
+                        esperado = int(longitud) if longitud and longitud.isdigit() else None
+
+                    # Los validadores del .part permiten reanudar con If-Range en otra ejecución
+                    anterior = {**anterior, 'etag_parcial': validadores['etag'],
+                                'last_modified_parcial': validadores['last_modified']}
+
+                    with open(parcial, modo) as f:
+                        for bloque in respuesta.iter_content(chunk_size=self.tam_bloque):
+                            if bloque:
+                                f.write(bloque)
+                                transferidos += len(bloque)
+
+                tamano = os.path.getsize(parcial)
+                if esperado is not None and tamano != esperado:
+                    raise IOError(f"Descarga incompleta ({tamano} de {esperado} bytes)")
+
+                return self._publicar(parcial, ruta, 'reanudado' if reanudado else 'descargado',
+                                      transferidos, validadores)
+
+            except requests.exceptions.HTTPError as e:
+                # 404, 403...: reintentar no cambia la respuesta
+                return {'estado': 'error', 'bytes': transferidos, 'error': str(e),
+                        'manifiesto': anterior}
+            except (requests.exceptions.RequestException, OSError) as e:
+                if intento >= self.reintentos:
+                    # El .part se conserva: la próxima ejecución continúa desde ahí
+                    return {'estado': 'error', 'bytes': transferidos, 'error': str(e),
+                            'manifiesto': anterior}
+                print(f"Descarga interrumpida {url}: {e}. Reanudando...")
+            except Exception as e:
+                return {'estado': 'error', 'bytes': transferidos, 'error': str(e),
+                        'manifiesto': anterior}
+
+    def _publicar(self, parcial: str, ruta: str, estado: str, transferidos: int,
+                  validadores: Dict) -> Dict:
+        """Valida el .part completo y lo publica con un rename atómico"""
+        if self.validador and not self.validador(parcial):
+            os.remove(parcial)
+            return {'estado': 'error', 'bytes': transferidos,
+                    'error': 'El archivo no pasó la validación', 'manifiesto': {}}
+
+        tamano = os.path.getsize(parcial)
+        os.replace(parcial, ruta)
+        return {'estado': estado, 'bytes': transferidos,
+                'manifiesto': {**validadores, 'tamano': tamano}}
+
+    def _rango_no_satisfacible(self, url: str, ruta: str, anterior: Dict,
+                               respuesta: requests.Response, offset: int) -> Dict:
+        """
+        Respuesta 416 a una petición Range: el .part ya tiene offset bytes o más.
+        Si Content-Range (bytes */total) confirma que está completo (la ejecución
+        anterior se cortó antes del rename) se publica; si no, se descarta y el
+        archivo se baja entero
+        """
+        parcial = ruta + SUFIJO_PARCIAL
+        total = respuesta.headers.get('Content-Range', '').rsplit('/', 1)[-1]
+        validadores = {'etag': anterior.get('etag_parcial'),
+                       'last_modified': anterior.get('last_modified_parcial')}
+
+        if total.isdigit() and int(total) == offset:
+            return self._publicar(parcial, ruta, 'reanudado', 0, validadores)
+
+        os.remove(parcial)
+        anterior = {k: v for k, v in anterior.items()
+                    if k not in ('etag_parcial', 'last_modified_parcial')}
+        # Sin .part la nueva petición ya no lleva Range
+        return self.descargar(url, ruta, anterior)
+
+    def descargar_todos(self, archivos: List[Tuple[str, str]], carpeta_destino: str,
+                        guardar_cada: int = 20) -> Dict:
+        """
+        Descarga una lista de archivos en paralelo
+
+        Args:
+            archivos: Lista de tuplas (url, nombre_archivo)
+            carpeta_destino: Carpeta destino (guarda ahí el manifiesto)
+            guardar_cada: Cada cuántos archivos terminados se guarda el manifiesto
+
+        Returns:
+            Diccionario con conteos por estado, errores, bytes y throughput
+        """
+        os.makedirs(carpeta_destino, exist_ok=True)
+        manifiesto = self._cargar_manifiesto(carpeta_destino)
+        conteo = {'descargado': 0, 'reanudado': 0, 'sin_cambios': 0, 'error': 0}
+        errores: List[Dict] = []
+        total_bytes = 0
+        inicio = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=self.n_hilos) as executor:
+            futuros = {
+                executor.submit(self.descargar, url, os.path.join(carpeta_destino, nombre),
+                                manifiesto.get(url)): (url, nombre)
+                for url, nombre in archivos
+            }
+            for i, futuro in enumerate(as_completed(futuros), 1):
+                url, nombre = futuros[futuro]
+                resultado = futuro.result()
+                conteo[resultado['estado']] += 1
+                total_bytes += resultado['bytes']
+
+                with self._lock:
+                    if resultado['manifiesto']:
+                        manifiesto[url] = {**resultado['manifiesto'], 'archivo': nombre}
+                    else:
+                        manifiesto.pop(url, None)
+
+                if resultado['estado'] == 'error':
+                    errores.append({'url': url, 'error': resultado.get('error')})
+                    print(f"Error al descargar {url}: {resultado.get('error')}")
+                else:
+                    print(f"[{i}/{len(futuros)}] {nombre}: {resultado['estado']}")
+
+                if i % guardar_cada == 0:
+                    self._guardar_manifiesto(carpeta_destino, manifiesto)
+
+        self._guardar_manifiesto(carpeta_destino, manifiesto)
+        segundos = time.monotonic() - inicio
+
+        return {
+            'total': len(archivos),
+            'descargados': conteo['descargado'] + conteo['reanudado'],
+            'reanudados': conteo['reanudado'],
+            'sin_cambios': conteo['sin_cambios'],
+            'errores': conteo['error'],
+            'archivos_con_error': errores,
+            'bytes': total_bytes,
+            'segundos': round(segundos, 2),
+            'mb_por_segundo': round(total_bytes / 1024 / 1024 / segundos, 2) if segundos > 0 else 0.0
+        }
@@ -0,0 +1,127 @@
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict
+from urllib.parse import urlsplit
+
+
+class LimitadorHosts:
+    """
+    Límites de cortesía por dominio para rastreos concurrentes.
+
+    Cada dominio tiene un semáforo (máximo de peticiones simultáneas) y un
+    token bucket (peticiones por segundo con ráfagas acotadas). La tasa se
+    adapta a la latencia observada (AIMD): si el servidor responde lento o con
+    429/503 la tasa se reduce a la mitad; mientras responde bien sube de a poco
+    hasta la tasa configurada.
+    """
+
+    def __init__(self, concurrencia_por_host: int = 4, tasa_por_host: float = 4.0,
+                 rafaga: int = 4, latencia_objetivo: float = 2.0, tasa_minima: float = 0.25,
+                 incremento: float = 0.25, suavizado: float = 0.3):
+        """
+        Inicializa el limitador
+
+        Args:
+            concurrencia_por_host: Peticiones simultáneas máximas a un mismo dominio
+            tasa_por_host: Peticiones por segundo máximas a un mismo dominio
+            rafaga: Capacidad del token bucket (peticiones seguidas sin espera)
+            latencia_objetivo: Segundos de latencia media a partir de los que se frena
+            tasa_minima: Tasa mínima a la que puede bajar un dominio
+            incremento: Aumento de la tasa (peticiones/s) por cada respuesta rápida
+            suavizado: Peso de la última latencia en la media móvil exponencial
+        """
+        self.concurrencia_por_host = concurrencia_por_host
+        self.tasa_maxima = tasa_por_host
+        self.rafaga = rafaga
+        self.latencia_objetivo = latencia_objetivo
+        self.tasa_minima = tasa_minima
+        self.incremento = incremento
+        self.suavizado = suavizado
+
+        self._hosts: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def _estado(self, url: str) -> Dict:
+        host = (urlsplit(url).hostname or '').lower()
+        with self._lock:
+            estado = self._hosts.get(host)
+            if estado is None:
+                estado = {
+                    'semaforo': threading.BoundedSemaphore(self.concurrencia_por_host),
+                    'lock': threading.Lock(),
+                    'tokens': float(self.rafaga),
+                    'ultimo': time.monotonic(),
+                    'tasa': self.tasa_maxima,
+                    'latencia': None,
+                    'ultimo_freno': 0.0
+                }
+                self._hosts[host] = estado
+            return estado
+
+    def _tomar_token(self, estado: Dict):
+        """Espera hasta que el bucket del dominio tenga un token y lo consume"""
+        while True:
+            with estado['lock']:
+                ahora = time.monotonic()
+                estado['tokens'] = min(self.rafaga,
+                                       estado['tokens'] + (ahora - estado['ultimo']) * estado['tasa'])
+                estado['ultimo'] = ahora
+                if estado['tokens'] >= 1:
+                    estado['tokens'] -= 1
+                    return
+                espera = (1 - estado['tokens']) / estado['tasa']
+            time.sleep(espera)
+
+    @contextmanager
+    def turno(self, url: str):
+        """
+        Bloquea hasta que se pueda hacer una petición a la URL respetando los límites
+
+        Uso:
+            with limitador.turno(url):
+                respuesta = session.get(url)
+        """
+        estado = self._estado(url)
+        with estado['semaforo']:
+            self._tomar_token(estado)
+            yield
+
+    def registrar(self, url: str, latencia: float, estado_http: int = None):
+        """
+        Ajusta la tasa del dominio con el resultado de una petición
+
+        Args:
+            url: URL pedida
+            latencia: Segundos que tardó la respuesta
+            estado_http: Código HTTP (None si la petición falló sin respuesta)
+        """
+        estado = self._estado(url)
+        with estado['lock']:
+            if estado['latencia'] is None:
+                estado['latencia'] = latencia
+            else:
+                estado['latencia'] = (self.suavizado * latencia
+                                      + (1 - self.suavizado) * estado['latencia'])
+
+            sobrecargado = estado_http in (429, 503) or estado_http is None
+            if sobrecargado or estado['latencia'] > self.latencia_objetivo:
+                # Las respuestas que ya estaban en curso no vuelven a frenar:
+                # a lo sumo una reducción por ventana de latencia_objetivo
+                ahora = time.monotonic()
+                if ahora - estado['ultimo_freno'] >= self.latencia_objetivo:
+                    estado['ultimo_freno'] = ahora
+                    estado['tasa'] = max(self.tasa_minima, estado['tasa'] / 2)
+                    # Sin ráfaga acumulada tras un frenazo
+                    estado['tokens'] = min(estado['tokens'], 0.0)
+            else:
+                estado['tasa'] = min(self.tasa_maxima, estado['tasa'] + self.incremento)
+
+    def tasas(self) -> Dict[str, Dict]:
+        """Tasa actual y latencia media de cada dominio (para diagnóstico)"""
+        with self._lock:
+            return {
+                host: {'tasa': round(e['tasa'], 3),
+                       'latencia': round(e['latencia'], 3) if e['latencia'] is not None else None}
+                for host, e in self._hosts.items()
+            }
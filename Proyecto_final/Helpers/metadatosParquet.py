@@ -0,0 +1,341 @@
+import os
+import time
+import queue
+import shutil
+import argparse
+import threading
+from datetime import date
+from typing import Dict, Iterable, Iterator, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    ds = None
+    pq = None
+
+from .funciones import Funciones
+
+# Carpeta del dataset Parquet de metadatos (una subcarpeta anio_resolucion=AAAA por año).
+# Es un enlace simbólico a la versión vigente (<carpeta>.v<marca>)
+METADATOS_DIR = os.getenv('METADATOS_DIR', os.path.join('Data', 'ANLA_metadatos'))
+
+# Campos de metadatos de una resolución (todo menos texto_completo, resumen y embedding)
+CAMPOS_METADATOS = [
+    'pdf_id', 'file_name', 'fuente', 'numero_resolución', 'fecha_resolución', 'anio_resolucion',
+    'nombre_proyecto', 'nombre_proyecto_normalizado', 'ubicación', 'empresa', 'empresa_normalizada',
+    'numero_expediente', 'radicados', 'descripcion', 'tipos_infraccion',
+    'tipos_infraccion_normalizados', 'grupo_duplicados', 'tema_cluster', 'tema_etiqueta'
+]
+
+# Campos que en los JSON son listas de textos
+_CAMPOS_LISTA = {'radicados', 'tipos_infraccion', 'tipos_infraccion_normalizados'}
+
+
+def _esquema():
+    campos = []
+    for campo in CAMPOS_METADATOS:
+        if campo in _CAMPOS_LISTA:
+            tipo = pa.list_(pa.string())
+        elif campo == 'fecha_resolución':
+            tipo = pa.date32()
+        else:
+            tipo = pa.string()
+        campos.append(pa.field(campo, tipo))
+    return pa.schema(campos)
+
+
+def _fila(doc_id: str, doc: Dict) -> Dict:
+    """Normaliza los metadatos de un documento a los tipos del esquema"""
+    fila = {}
+    for campo in CAMPOS_METADATOS:
+        valor = doc.get(campo)
+        if campo in _CAMPOS_LISTA:
+            if valor is None:
+                valor = []
+            elif not isinstance(valor, list):
+                valor = [valor]
+            valor = [str(v) for v in valor if v is not None]
+        elif campo == 'fecha_resolución':
+            try:
+                valor = date.fromisoformat(str(valor)[:10]) if valor else None
+            except ValueError:
+                valor = None
+        elif valor is not None:
+            valor = str(valor)
+        fila[campo] = valor
+    fila['pdf_id'] = fila['pdf_id'] or str(doc_id)
+    return fila
+
+
+class AlmacenMetadatos:
+    """
+    Metadatos del corpus ANLA en un dataset Parquet columnar, particionado
+    por anio_resolucion.
+
+    Los conteos por empresa, año o tipo de infracción leen solo las columnas
+    que necesitan (y solo las particiones de los años filtrados), sin cargar
+    texto_completo. El dataset se construye desde la carpeta de JSON (o un
+    corpus empaquetado) o desde el índice de Elasticsearch con búsquedas
+    paralelas por slices sobre un point in time.
+
+    Cada construcción escribe una versión nueva y cambia el enlace ruta de
+    forma atómica: quien lee siempre encuentra un dataset completo. Se
+    conserva la versión anterior (lecturas en curso) y se borran las demás.
+    """
+
+    def __init__(self, ruta: str = None, tam_lote: int = 5000):
+        """
+        Inicializa el almacén
+
+        Args:
+            ruta: Carpeta del dataset (por defecto METADATOS_DIR)
+            tam_lote: Filas por lote de escritura (memoria acotada durante la construcción)
+        """
+        if pa is None:
+            raise ImportError("pyarrow no está instalado. Ejecuta: pip install pyarrow")
+        self.ruta = ruta or METADATOS_DIR
+        self.tam_lote = tam_lote
+        self.esquema = _esquema()
+
+    def _lotes(self, documentos: Iterable) -> Iterator:
+        filas = []
+        for doc_id, doc in documentos:
+            filas.append(_fila(doc_id, doc))
+            if len(filas) >= self.tam_lote:
+                yield pa.RecordBatch.from_pylist(filas, schema=self.esquema)
+                filas = []
+        if filas:
+            yield pa.RecordBatch.from_pylist(filas, schema=self.esquema)
+
+    def _versiones(self) -> List[str]:
+        """Carpetas de versión del dataset, de la más antigua a la más reciente"""
+        carpeta, base = os.path.split(os.path.abspath(self.ruta))
+        prefijo = base + '.v'
+        return sorted(os.path.join(carpeta, nombre) for nombre in os.listdir(carpeta)
+                      if nombre.startswith(prefijo) and not nombre.endswith('.tmp'))
+
+    def _publicar(self, version: str):
+        """Apunta el enlace ruta a una versión (os.replace de un enlace nuevo: atómico)"""
+        ruta = self.ruta.rstrip(os.sep)
+        if os.path.isdir(ruta) and not os.path.islink(ruta):
+            # Formato anterior (carpeta real): se convierte en versión una sola vez
+            os.rename(ruta, f"{ruta}.v{0:016x}")
+        enlace = ruta + '.lnk.tmp'
+        if os.path.lexists(enlace):
+            os.remove(enlace)
+        os.symlink(os.path.basename(version), enlace)
+        os.replace(enlace, ruta)
+
+    def _escribir(self, documentos: Iterable) -> Dict:
+        """Escribe el dataset completo en una versión nueva y la publica al final"""
+        ruta = self.ruta.rstrip(os.sep)
+        carpeta = os.path.dirname(os.path.abspath(ruta))
+        os.makedirs(carpeta, exist_ok=True)
+        version = f"{ruta}.v{time.time_ns():016x}"
+        temporal = version + '.tmp'
+
+        contador = {'documentos': 0}
+
+        def _contar(lotes):
+            for lote in lotes:
+                contador['documentos'] += lote.num_rows
+                yield lote
+
+        try:
+            ds.write_dataset(
+                _contar(self._lotes(documentos)),
+                temporal,
+                schema=self.esquema,
+                format='parquet',
+                partitioning=ds.partitioning(pa.schema([('anio_resolucion', pa.string())]),
+                                             flavor='hive'),
+                existing_data_behavior='overwrite_or_ignore'
+            )
+            os.rename(temporal, version)
+            self._publicar(version)
+        except Exception as e:
+            shutil.rmtree(temporal, ignore_errors=True)
+            print(f"Error al escribir metadatos Parquet: {e}")
+            return {'success': False, 'error': str(e)}
+
+        # Se conservan la versión publicada y la anterior (puede tener lecturas en curso)
+        for anterior in self._versiones()[:-2]:
+            shutil.rmtree(anterior, ignore_errors=True)
+        return {'success': True, 'documentos': contador['documentos'], 'ruta': self.ruta}
+
+    def construir_desde_json(self, json_dir: str) -> Dict:
+        """
+        Construye el dataset desde una carpeta de JSON o un corpus empaquetado
+
+        Args:
+            json_dir: Carpeta con un JSON por resolución (p.ej. Data/ANLA_json)
+
+        Returns:
+            Diccionario con 'success' y el número de documentos escritos
+        """
+        return self._escribir(Funciones.iterar_documentos_json(json_dir))
+
+    def construir_desde_elastic(self, es=None, index_name: str = None, num_slices: int = 4,
+                                tam_pagina: int = 1000, keep_alive: str = '2m') -> Dict:
+        """
+        Construye el dataset desde el índice de Elasticsearch
+
+        Cada slice del point in time se recorre en su propio hilo con
+        search_after; solo se piden los campos de metadatos (_source filtrado).
+        Incluye los campos calculados en la ingesta (grupo_duplicados, temas).
+
+        Args:
+            es: Instancia de ElasticSearch (por defecto la global de Helpers.elastic)
+            index_name: Índice origen (por defecto ELASTIC_INDEX_DEFAULT)
+            num_slices: Búsquedas paralelas
+            tam_pagina: Documentos por página de cada slice
+            keep_alive: Vigencia del point in time entre páginas
+
+        Returns:
+            Diccionario con 'success' y el número de documentos escritos
+        """
+        if es is None or index_name is None:
+            from .elastic import elastic, ELASTIC_INDEX_DEFAULT
+            es = es or elastic
+            index_name = index_name or ELASTIC_INDEX_DEFAULT
+
+        try:
+            pit_id = es.client.open_point_in_time(index=index_name, keep_alive=keep_alive)['id']
+        except Exception as e:
+            print(f"Error al abrir point in time en {index_name}: {e}")
+            return {'success': False, 'error': str(e)}
+
+        # Los hilos dejan páginas en una cola acotada; el escritor las consume
+        # a medida que llegan (no se junta el índice completo en memoria)
+        cola = queue.Queue(maxsize=num_slices * 2)
+        fin = object()
+        errores: List[str] = []
+        cancelado = threading.Event()
+
+        def _recorrer_slice(numero: int):
+            try:
+                search_after = None
+                while not cancelado.is_set():
+                    body = {
+                        'pit': {'id': pit_id, 'keep_alive': keep_alive},
+                        'sort': ['_shard_doc'],
+                        '_source': CAMPOS_METADATOS,
+                        'size': tam_pagina
+                    }
+                    if num_slices > 1:
+                        body['slice'] = {'id': numero, 'max': num_slices}
+                    if search_after is not None:
+                        body['search_after'] = search_after
+                    hits = es.client.search(body=body)['hits']['hits']
+                    if not hits:
+                        break
+                    cola.put([(hit['_id'], hit['_source']) for hit in hits])
+                    search_after = hits[-1]['sort']
+            except Exception as e:
+                errores.append(f"slice {numero}: {e}")
+            finally:
+                cola.put(fin)
+
+        def _documentos():
+            pendientes = num_slices
+            while pendientes:
+                pagina = cola.get()
+                if pagina is fin:
+                    pendientes -= 1
+                    continue
+                yield from pagina
+            if errores:
+                # Un slice incompleto dejaría el dataset sin parte del índice:
+                # se aborta la escritura y se conserva el dataset anterior
+                raise RuntimeError('; '.join(errores))
+
+        hilos = [threading.Thread(target=_recorrer_slice, args=(i,), daemon=True)
+                 for i in range(num_slices)]
+        for hilo in hilos:
+            hilo.start()
+
+        try:
+            resultado = self._escribir(_documentos())
+        finally:
+            cancelado.set()
+            # Vacía la cola por si el escritor falló y algún hilo quedó bloqueado en put()
+            while any(hilo.is_alive() for hilo in hilos):
+                try:
+                    cola.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            try:
+                es.client.close_point_in_time(id=pit_id)
+            except Exception as e:
+                print(f"Error al cerrar point in time: {e}")
+
+        return resultado
+
+    def leer(self, columnas: List[str] = None, anios: List[str] = None, filtros=None):
+        """
+        Lee el dataset como DataFrame de pandas
+
+        Args:
+            columnas: Columnas a leer (None = todas); el resto no se lee del disco
+            anios: Años de resolución a leer (solo se abren esas particiones)
+            filtros: Filtros adicionales en formato de pyarrow (p.ej. [('empresa_normalizada', '=', 'X')])
+
+        Returns:
+            DataFrame con las columnas pedidas
+        """
+        condiciones = list(filtros or [])
+        if anios:
+            condiciones.append(('anio_resolucion', 'in', [str(a) for a in anios]))
+        tabla = pq.read_table(self.ruta, columns=columnas, filters=condiciones or None,
+                              partitioning='hive')
+        return tabla.to_pandas()
+
+    def contar_por(self, campo: str, anios: List[str] = None, top: Optional[int] = None):
+        """
+        Cuenta resoluciones por un campo (las listas como tipos_infraccion se expanden)
+
+        Args:
+            campo: Campo de metadatos (p.ej. 'empresa_normalizada', 'anio_resolucion')
+            anios: Restringe el conteo a esos años
+            top: Devuelve solo los top valores más frecuentes
+
+        Returns:
+            Serie de pandas valor -> número de resoluciones
+        """
+        datos = self.leer(columnas=[campo], anios=anios)[campo]
+        if campo in _CAMPOS_LISTA:
+            datos = datos.explode()
+        conteo = datos.dropna().value_counts()
+        return conteo.head(top) if top else conteo
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Metadatos ANLA en Parquet (columnar)')
+    parser.add_argument('--ruta', default=None, help='Carpeta del dataset (por defecto METADATOS_DIR)')
+    subcomandos = parser.add_subparsers(dest='accion', required=True)
+
+    construir = subcomandos.add_parser('construir', help='Construye el dataset')
+    construir.add_argument('--origen', choices=['json', 'elastic'], default='json')
+    construir.add_argument('--json-dir', default=os.path.join('Data', 'ANLA_json'))
+    construir.add_argument('--indice', default=None)
+    construir.add_argument('--slices', type=int, default=4)
+
+    contar = subcomandos.add_parser('contar', help='Conteo de resoluciones por un campo')
+    contar.add_argument('campo')
+    contar.add_argument('--anio', action='append')
+    contar.add_argument('--top', type=int, default=20)
+
+    argumentos = parser.parse_args()
+
+    almacen = AlmacenMetadatos(argumentos.ruta)
+    if argumentos.accion == 'construir':
+        if argumentos.origen == 'json':
+            print(almacen.construir_desde_json(argumentos.json_dir))
+        else:
+            print(almacen.construir_desde_elastic(index_name=argumentos.indice,
+                                                  num_slices=argumentos.slices))
+    else:
+        print(almacen.contar_por(argumentos.campo, anios=argumentos.anio, top=argumentos.top).to_string())
@@ -0,0 +1,187 @@
+import os
+import re
+import pickle
+from typing import Iterable, List, Optional
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+
+class MotorResumen:
+    """
+    Resúmenes extractivos con un TF-IDF ajustado una sola vez sobre todo el corpus.
+
+    A diferencia de PLN.generar_resumen (que ajusta un vectorizador nuevo con
+    las oraciones de cada documento), aquí los pesos IDF reflejan el corpus
+    completo y las oraciones se puntúan con operaciones dispersas vectorizadas.
+    """
+
+    # Fin de oración seguido de espacio, o salto de párrafo
+    _SEPARADOR_ORACIONES = re.compile(r'(?<=[.;:!?])\s+|\n\s*\n')
+
+    def __init__(self, stopwords: Optional[List[str]] = None,
+                 min_caracteres_oracion: int = 20,
+                 max_caracteres_oracion: int = 600,
+                 max_features: Optional[int] = 200000):
+        """
+        Inicializa el motor (sin entrenar)
+
+        Args:
+            stopwords: Palabras vacías. Por defecto, las de NLTK en español si están disponibles
+            min_caracteres_oracion: Longitud mínima para considerar una oración
+            max_caracteres_oracion: Longitud máxima (descarta tablas y bloques sin puntuación)
+            max_features: Tamaño máximo del vocabulario
+        """
+        if stopwords is None:
+            try:
+                from nltk.corpus import stopwords as nltk_stopwords
+                stopwords = nltk_stopwords.words('spanish')
+            except Exception:
+                stopwords = None
+
+        self.min_caracteres_oracion = min_caracteres_oracion
+        self.max_caracteres_oracion = max_caracteres_oracion
+        self.vectorizer = TfidfVectorizer(
+            stop_words=list(stopwords) if stopwords else None,
+            max_features=max_features,
+            sublinear_tf=True,
+            dtype=np.float32
+        )
+        self.entrenado = False
+
+    def dividir_oraciones(self, texto: str) -> List[str]:
+        """
+        Divide un texto en oraciones con una expresión regular (sin spaCy)
+
+        Args:
+            texto: Texto a dividir
+
+        Returns:
+            Lista de oraciones con longitud entre min y max_caracteres_oracion
+        """
+        if not texto:
+            return []
+        oraciones = (' '.join(o.split()) for o in self._SEPARADOR_ORACIONES.split(texto))
+        return [o for o in oraciones
+                if self.min_caracteres_oracion < len(o) <= self.max_caracteres_oracion]
+
+    def entrenar(self, textos: Iterable[str]) -> 'MotorResumen':
+        """
+        Ajusta el vectorizador TF-IDF sobre los documentos del corpus
+
+        Args:
+            textos: Textos completos del corpus (uno por documento)
+
+        Returns:
+            El mismo motor, ya entrenado
+        """
+        self.vectorizer.fit(t or '' for t in textos)
+        self.entrenado = True
+        return self
+
+    def puntuar_oraciones(self, oraciones: List[str]) -> np.ndarray:
+        """
+        Puntúa oraciones sumando sus pesos TF-IDF (una sola transformación dispersa)
+
+        Args:
+            oraciones: Lista de oraciones
+
+        Returns:
+            Arreglo con la puntuación de cada oración
+        """
+        if not self.entrenado:
+            raise ValueError("El motor de resumen no está entrenado. Llama a entrenar() o cargar() primero.")
+        if not oraciones:
+            return np.zeros(0, dtype=np.float32)
+        matriz = self.vectorizer.transform(oraciones)
+        return np.asarray(matriz.sum(axis=1)).ravel()
+
+    @staticmethod
+    def _seleccionar(oraciones: List[str], puntuaciones: np.ndarray, num_oraciones: int) -> str:
+        """Toma las num_oraciones mejor puntuadas y las une en su orden original"""
+        if len(oraciones) <= num_oraciones:
+            return ' '.join(oraciones)
+        mejores = np.argpartition(-puntuaciones, num_oraciones - 1)[:num_oraciones]
+        return ' '.join(oraciones[i] for i in sorted(mejores))
+
+    def resumir(self, texto: str, num_oraciones: int = 3) -> str:
+        """
+        Genera el resumen extractivo de un texto
+
+        Args:
+            texto: Texto a resumir
+            num_oraciones: Número de oraciones en el resumen
+
+        Returns:
+            Resumen del texto
+        """
+        return self.resumir_lote([texto], num_oraciones)[0]
+
+    def resumir_lote(self, textos: List[str], num_oraciones: int = 3) -> List[str]:
+        """
+        Resume varios textos con una única transformación TF-IDF para todas sus oraciones
+
+        Args:
+            textos: Lista de textos a resumir
+            num_oraciones: Número de oraciones por resumen
+
+        Returns:
+            Lista de resúmenes, en el mismo orden que textos
+        """
+        oraciones_por_texto = [self.dividir_oraciones(t) for t in textos]
+        todas = [o for oraciones in oraciones_por_texto for o in oraciones]
+        puntuaciones = self.puntuar_oraciones(todas)
+
+        resumenes = []
+        inicio = 0
+        for texto, oraciones in zip(textos, oraciones_por_texto):
+            fin = inicio + len(oraciones)
+            if not oraciones:
+                texto = texto or ''
+                resumenes.append(texto[:200] + "..." if len(texto) > 200 else texto)
+            else:
+                resumenes.append(self._seleccionar(oraciones, puntuaciones[inicio:fin], num_oraciones))
+            inicio = fin
+
+        return resumenes
+
+    def guardar(self, ruta: str) -> bool:
+        """
+        Guarda el motor entrenado en disco
+
+        Args:
+            ruta: Ruta del archivo (p.ej. Data/modelos/motor_resumen.pkl)
+
+        Returns:
+            True si se guardó correctamente
+        """
+        try:
+            directorio = os.path.dirname(ruta)
+            if directorio:
+                os.makedirs(directorio, exist_ok=True)
+            with open(ruta, 'wb') as f:
+                pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+            return True
+        except Exception as e:
+            print(f"Error al guardar motor de resumen: {e}")
+            return False
+
+    @staticmethod
+    def cargar(ruta: str) -> Optional['MotorResumen']:
+        """
+        Carga un motor previamente guardado con guardar()
+
+        Args:
+            ruta: Ruta del archivo
+
+        Returns:
+            El motor cargado, o None si no existe o no se pudo leer
+        """
+        if not os.path.exists(ruta):
+            return None
+        try:
+            with open(ruta, 'rb') as f:
+                return pickle.load(f)
+        except Exception as e:
+            print(f"Error al cargar motor de resumen {ruta}: {e}")
+            return None
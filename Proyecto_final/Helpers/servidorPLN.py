@@ -0,0 +1,414 @@
+import os
+import time
+import queue
+import secrets
+import argparse
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.connection import Listener, Client, Connection
+from typing import Any, Dict, List, Optional, Tuple
+
+PLN_SOCKET = os.getenv('PLN_SOCKET')
+# Clave compartida servidor/clientes. Si no se define, el servidor genera una
+# aleatoria al arrancar y la deja en <socket>.key (permisos 0600)
+PLN_AUTHKEY = os.getenv('PLN_AUTHKEY', '').encode('utf-8') or None
+# Segundos máximos que un cliente espera la respuesta de una llamada
+PLN_TIMEOUT = float(os.getenv('PLN_TIMEOUT', '120'))
+
+# Sufijo del archivo con la clave generada por el servidor
+SUFIJO_CLAVE = '.key'
+
+
+def ruta_clave(ruta_socket: str) -> str:
+    """Archivo donde el servidor deja la clave generada para un socket"""
+    return ruta_socket + SUFIJO_CLAVE
+
+
+def leer_clave(ruta_socket: str) -> bytes:
+    """
+    Clave para conectarse a un servidor: PLN_AUTHKEY o la generada por el servidor
+
+    Raises:
+        ValueError: si no hay PLN_AUTHKEY ni archivo de clave legible
+    """
+    if PLN_AUTHKEY:
+        return PLN_AUTHKEY
+    try:
+        with open(ruta_clave(ruta_socket), 'rb') as f:
+            return f.read()
+    except OSError as e:
+        raise ValueError(f"No se pudo leer la clave del servidor PLN ({e}); defina PLN_AUTHKEY")
+
+# Métodos de PLN que se pueden invocar remotamente
+METODOS_PERMITIDOS = {
+    'analizar_documento',
+    'extraer_entidades',
+    'extraer_temas',
+    'generar_resumen',
+    'calcular_similitud_semantica',
+    'calcular_embeddings',
+    'indexar_corpus_semantico',
+    'vecinos_semanticos',
+    'preprocesar_texto',
+    'analizar_sentimiento',
+    'extraer_nombres_propios',
+    'contar_palabras',
+}
+
+
+class ServidorPLN:
+    """
+    Servidor local de modelos de PLN compartido entre workers de gunicorn.
+
+    Un único proceso carga PLN (spaCy, SentenceTransformer, pipelines de
+    transformers) y atiende a los workers por un socket Unix, así la memoria no
+    crece con el número de workers. Las peticiones que llegan casi al mismo
+    tiempo se agrupan: varios calcular_embeddings se resuelven con una sola
+    llamada al modelo. Los embeddings (consultas del buscador) tienen su propio
+    hilo; el resto de métodos (resúmenes, spaCy) corren en otro grupo de hilos,
+    así una llamada larga no retrasa a las búsquedas.
+
+    El transporte (multiprocessing.connection) usa pickle, así que quien se
+    conecte puede ejecutar código: el socket y el archivo de clave se crean
+    con permisos 0600 y, sin PLN_AUTHKEY, la clave es aleatoria en cada arranque.
+
+    Uso:
+        python -m Helpers.servidorPLN --socket /tmp/pln.sock
+    y en los workers (con PLN_SOCKET=/tmp/pln.sock):
+        pln = obtener_pln()
+    """
+
+    def __init__(self, ruta_socket: str, authkey: bytes = None,
+                 tam_lote_max: int = 32, espera_lote_ms: float = 5.0,
+                 hilos_otros: int = 2, **kwargs_pln):
+        """
+        Inicializa el servidor (los modelos se cargan en iniciar())
+
+        Args:
+            ruta_socket: Ruta del socket Unix
+            authkey: Clave compartida con los clientes (por defecto PLN_AUTHKEY,
+                o una aleatoria que se guarda en <socket>.key)
+            tam_lote_max: Máximo de peticiones agrupadas en un lote
+            espera_lote_ms: Tiempo máximo de espera para completar un lote
+            hilos_otros: Hilos para los métodos distintos de calcular_embeddings
+            kwargs_pln: Argumentos para el constructor de PLN
+        """
+        self.ruta_socket = ruta_socket
+        self.authkey = authkey or PLN_AUTHKEY
+        self.tam_lote_max = tam_lote_max
+        self.espera_lote = espera_lote_ms / 1000.0
+        self.kwargs_pln = kwargs_pln
+        self.pln = None
+        self.hilos_otros = max(1, hilos_otros)
+        # Cola de embeddings (se agrupan en lotes) y grupo de hilos para el resto
+        self._pendientes: "queue.Queue[Tuple]" = queue.Queue()
+        self._executor_otros: Optional[ThreadPoolExecutor] = None
+
+    def iniciar(self):
+        """Carga los modelos y atiende conexiones hasta que el proceso termine"""
+        from .PLN import PLN
+
+        self.pln = PLN(**self.kwargs_pln)
+
+        if os.path.exists(self.ruta_socket):
+            os.unlink(self.ruta_socket)
+
+        if not self.authkey:
+            self.authkey = secrets.token_bytes(32)
+            self._guardar_clave()
+
+        self._executor_otros = ThreadPoolExecutor(max_workers=self.hilos_otros,
+                                                  thread_name_prefix='pln-otros')
+        threading.Thread(target=self._bucle_lotes, daemon=True).start()
+
+        # Socket solo accesible por el usuario del servidor (umask durante el bind)
+        umask_anterior = os.umask(0o077)
+        try:
+            listener = Listener(self.ruta_socket, family='AF_UNIX', authkey=self.authkey)
+        finally:
+            os.umask(umask_anterior)
+
+        with listener:
+            print(f"Servidor PLN escuchando en {self.ruta_socket}")
+            while True:
+                try:
+                    conexion = listener.accept()
+                except Exception as e:
+                    print(f"Error al aceptar conexión: {e}")
+                    continue
+                threading.Thread(target=self._atender, args=(conexion,), daemon=True).start()
+
+    def _guardar_clave(self):
+        """Escribe la clave generada en <socket>.key con permisos 0600 (escritura atómica)"""
+        ruta = ruta_clave(self.ruta_socket)
+        temporal = ruta + '.tmp'
+        if os.path.exists(temporal):
+            os.unlink(temporal)
+        descriptor = os.open(temporal, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(descriptor, 'wb') as f:
+            f.write(self.authkey)
+        os.replace(temporal, ruta)
+
+    def _atender(self, conexion: Connection):
+        """Lee peticiones de un cliente: los embeddings van al bucle de lotes y el resto a su grupo de hilos"""
+        lock_envio = threading.Lock()
+        try:
+            while True:
+                id_peticion, metodo, args, kwargs = conexion.recv()
+                peticion = (conexion, lock_envio, id_peticion, metodo, args, kwargs)
+                if metodo == 'calcular_embeddings' and len(args) == 1:
+                    self._pendientes.put(peticion)
+                else:
+                    self._executor_otros.submit(self._ejecutar, peticion)
+        except (EOFError, OSError):
+            pass
+        finally:
+            conexion.close()
+
+    def _bucle_lotes(self):
+        """Agrupa las peticiones que llegan dentro de la ventana de espera y las procesa juntas"""
+        while True:
+            lote = [self._pendientes.get()]
+            limite = time.monotonic() + self.espera_lote
+            while len(lote) < self.tam_lote_max:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    lote.append(self._pendientes.get(timeout=restante))
+                except queue.Empty:
+                    break
+            self._procesar_lote(lote)
+
+    @staticmethod
+    def _clave_kwargs(kwargs: Dict) -> str:
+        """Solo se agrupan las peticiones de embeddings con los mismos argumentos"""
+        return repr(sorted(kwargs.items()))
+
+    def _procesar_lote(self, lote: List[Tuple]):
+        """Ejecuta un lote de embeddings con una sola llamada al modelo por cada kwargs distinto"""
+        embeddings: Dict[str, List[Tuple]] = {}
+        for peticion in lote:
+            embeddings.setdefault(self._clave_kwargs(peticion[5]), []).append(peticion)
+
+        for grupo in embeddings.values():
+            textos = [t for p in grupo for t in p[4][0]]
+            try:
+                resultado = self.pln.calcular_embeddings(textos, **grupo[0][5])
+                inicio = 0
+                for peticion in grupo:
+                    fin = inicio + len(peticion[4][0])
+                    self._responder(peticion, True, resultado[inicio:fin])
+                    inicio = fin
+            except Exception as e:
+                for peticion in grupo:
+                    self._responder(peticion, False, str(e))
+
+    def _ejecutar(self, peticion: Tuple):
+        """Ejecuta una petición que no es de embeddings"""
+        metodo, args, kwargs = peticion[3], peticion[4], peticion[5]
+        if metodo not in METODOS_PERMITIDOS:
+            self._responder(peticion, False, f'Método no permitido: {metodo}')
+            return
+        try:
+            self._responder(peticion, True, getattr(self.pln, metodo)(*args, **kwargs))
+        except Exception as e:
+            self._responder(peticion, False, str(e))
+
+    @staticmethod
+    def _responder(peticion: Tuple, exito: bool, resultado: Any):
+        conexion, lock_envio, id_peticion = peticion[0], peticion[1], peticion[2]
+        try:
+            with lock_envio:
+                conexion.send((id_peticion, exito, resultado))
+        except (EOFError, OSError) as e:
+            print(f"Error al responder petición {id_peticion}: {e}")
+
+
+class ClientePLN:
+    """
+    Cliente con la misma interfaz que PLN; cada llamada se ejecuta en el ServidorPLN.
+
+    Es seguro usarlo desde varios hilos del mismo worker: las llamadas comparten
+    una conexión y un hilo lector entrega cada respuesta a quien la pidió (por id
+    de petición), así una llamada larga no bloquea a las demás. Si el servidor
+    se reinicia, la siguiente llamada se reconecta.
+    """
+
+    def __init__(self, ruta_socket: str = None, authkey: bytes = None, timeout: float = None):
+        """
+        Conecta con el servidor
+
+        Args:
+            ruta_socket: Ruta del socket Unix (por defecto, variable de entorno PLN_SOCKET)
+            authkey: Clave compartida con el servidor (por defecto PLN_AUTHKEY o <socket>.key)
+            timeout: Segundos máximos de espera por respuesta (por defecto PLN_TIMEOUT)
+        """
+        self.ruta_socket = ruta_socket or PLN_SOCKET
+        if not self.ruta_socket:
+            raise ValueError("No se indicó el socket del servidor PLN (PLN_SOCKET)")
+        self.authkey = authkey
+        self.timeout = PLN_TIMEOUT if timeout is None else timeout
+
+        self._conexion: Optional[Connection] = None
+        # id de petición -> {'evento', 'conexion', 'respuesta'}
+        self._pendientes: Dict[int, Dict] = {}
+        self._contador = 0
+        self._lock = threading.Lock()
+        self._lock_envio = threading.Lock()
+        with self._lock:
+            self._conectar()
+
+    def _conectar(self) -> Connection:
+        """Abre la conexión y su hilo lector (llamar con self._lock tomado)"""
+        # La clave se vuelve a leer: un servidor reiniciado genera otra
+        conexion = Client(self.ruta_socket, family='AF_UNIX',
+                          authkey=self.authkey or leer_clave(self.ruta_socket))
+        self._conexion = conexion
+        threading.Thread(target=self._leer_respuestas, args=(conexion,), daemon=True).start()
+        return conexion
+
+    def _leer_respuestas(self, conexion: Connection):
+        """Entrega cada respuesta a la llamada que la espera; al cortarse la conexión, falla las pendientes"""
+        try:
+            while True:
+                id_respuesta, exito, resultado = conexion.recv()
+                with self._lock:
+                    pendiente = self._pendientes.pop(id_respuesta, None)
+                # Sin pendiente: la llamada ya se abandonó por timeout
+                if pendiente is not None:
+                    pendiente['respuesta'] = (exito, resultado)
+                    pendiente['evento'].set()
+        except (EOFError, OSError):
+            pass
+        self._descartar(conexion)
+
+    def _descartar(self, conexion: Connection):
+        """Cierra una conexión rota y falla las llamadas que esperaban por ella"""
+        with self._lock:
+            if self._conexion is conexion:
+                self._conexion = None
+            perdidas = [i for i, p in self._pendientes.items() if p['conexion'] is conexion]
+            for id_peticion in perdidas:
+                pendiente = self._pendientes.pop(id_peticion)
+                pendiente['respuesta'] = (False, ConnectionError("Se perdió la conexión con el servidor PLN"))
+                pendiente['evento'].set()
+        try:
+            conexion.close()
+        except OSError:
+            pass
+
+    def _llamar(self, metodo: str, *args, **kwargs) -> Any:
+        pendiente = {'evento': threading.Event(), 'respuesta': None}
+        for intento in range(2):
+            with self._lock:
+                conexion = self._conexion or self._conectar()
+                self._contador += 1
+                id_peticion = self._contador
+                pendiente['conexion'] = conexion
+                self._pendientes[id_peticion] = pendiente
+            try:
+                with self._lock_envio:
+                    conexion.send((id_peticion, metodo, args, kwargs))
+                break
+            except (EOFError, OSError) as e:
+                # Servidor reiniciado: se descarta la conexión y se reintenta una vez
+                self._descartar(conexion)
+                if intento:
+                    raise ConnectionError(f"No se pudo enviar la petición al servidor PLN: {e}")
+
+        if not pendiente['evento'].wait(self.timeout):
+            with self._lock:
+                self._pendientes.pop(id_peticion, None)
+            raise TimeoutError(f"El servidor PLN no respondió {metodo} en {self.timeout} s")
+
+        exito, resultado = pendiente['respuesta']
+        if isinstance(resultado, ConnectionError):
+            raise resultado
+        if not exito:
+            raise ValueError(resultado)
+        return resultado
+
+    def __getattr__(self, nombre: str):
+        if nombre not in METODOS_PERMITIDOS:
+            raise AttributeError(nombre)
+        return lambda *args, **kwargs: self._llamar(nombre, *args, **kwargs)
+
+    def close(self):
+        """Cierra la conexión con el servidor (los modelos siguen cargados allí)"""
+        with self._lock:
+            conexion = self._conexion
+        if conexion is not None:
+            self._descartar(conexion)
+
+
+def _ejecutar_servidor(ruta_socket: str, kwargs_pln: Dict):
+    ServidorPLN(ruta_socket, **kwargs_pln).iniciar()
+
+
+def iniciar_en_segundo_plano(ruta_socket: str = None, espera_max: float = 300.0,
+                             **kwargs_pln) -> Optional[multiprocessing.Process]:
+    """
+    Lanza el servidor en un proceso aparte y espera a que el socket esté listo.
+    gunicorn.conf.py lo llama en el hook on_starting (antes de crear los
+    workers) cuando está definido PLN_SOCKET.
+
+    Args:
+        ruta_socket: Ruta del socket Unix (por defecto, PLN_SOCKET)
+        espera_max: Segundos máximos de espera mientras se cargan los modelos
+        kwargs_pln: Argumentos para el constructor de PLN
+
+    Returns:
+        El proceso del servidor, o None si no arrancó a tiempo
+    """
+    ruta_socket = ruta_socket or PLN_SOCKET or '/tmp/pln.sock'
+    for ruta in (ruta_socket, ruta_clave(ruta_socket)):
+        if os.path.exists(ruta):
+            os.unlink(ruta)
+
+    proceso = multiprocessing.get_context('spawn').Process(
+        target=_ejecutar_servidor, args=(ruta_socket, kwargs_pln), daemon=True
+    )
+    proceso.start()
+
+    limite = time.monotonic() + espera_max
+    while time.monotonic() < limite:
+        if os.path.exists(ruta_socket):
+            return proceso
+        if not proceso.is_alive():
+            break
+        time.sleep(0.5)
+
+    print("Error: el servidor PLN no arrancó a tiempo")
+    proceso.terminate()
+    return None
+
+
+def obtener_pln(**kwargs_pln):
+    """
+    Devuelve un ClientePLN si hay un servidor activo en PLN_SOCKET;
+    si no, una instancia local de PLN.
+    """
+    if PLN_SOCKET and os.path.exists(PLN_SOCKET):
+        try:
+            return ClientePLN(PLN_SOCKET)
+        except Exception as e:
+            print(f"Advertencia: no se pudo conectar al servidor PLN ({e}), se cargan modelos locales")
+
+    from .PLN import PLN
+    return PLN(**kwargs_pln)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Servidor local de modelos PLN')
+    parser.add_argument('--socket', default=PLN_SOCKET or '/tmp/pln.sock')
+    parser.add_argument('--tam-lote', type=int, default=32)
+    parser.add_argument('--espera-ms', type=float, default=5.0)
+    parser.add_argument('--hilos-otros', type=int, default=2)
+    argumentos = parser.parse_args()
+
+    ServidorPLN(argumentos.socket,
+                tam_lote_max=argumentos.tam_lote,
+                espera_lote_ms=argumentos.espera_ms,
+                hilos_otros=argumentos.hilos_otros).iniciar()
@@ -0,0 +1,173 @@
+import os
+import pickle
+import threading
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.preprocessing import normalize
+
+from .resumen import MotorResumen
+
+
+class AgrupadorTemas:
+    """
+    Temas a nivel de corpus con k-means por mini-lotes sobre los vectores
+    TF-IDF del MotorResumen (el mismo vocabulario e IDF de todo el corpus).
+
+    El modelo se ajusta en streaming con partial_fit, así el corpus nunca se
+    carga completo en memoria. En la app el modelo guardado solo asigna temas
+    (todos los workers comparten los mismos centroides); se reentrena fuera de
+    línea con cargar_json_anla.py --reentrenar-temas.
+    Cada tema se etiqueta con los términos que más distinguen su centroide; en
+    el buscador el tema es solo un campo keyword (sin PLN por consulta).
+    """
+
+    def __init__(self, motor_resumen: MotorResumen, num_temas: int = 12,
+                 tam_lote: int = 256, num_terminos: int = 4, semilla: int = 42):
+        """
+        Inicializa el agrupador (sin entrenar)
+
+        Args:
+            motor_resumen: MotorResumen ya entrenado (aporta el vectorizador TF-IDF)
+            num_temas: Número de temas (clusters)
+            tam_lote: Documentos por llamada a partial_fit
+            num_terminos: Términos usados en la etiqueta de cada tema
+            semilla: Semilla de k-means (resultados reproducibles)
+        """
+        if not motor_resumen.entrenado:
+            raise ValueError("El motor de resumen no está entrenado. Llama a entrenar() o cargar() primero.")
+
+        self.motor_resumen = motor_resumen
+        self.num_temas = num_temas
+        self.tam_lote = tam_lote
+        self.num_terminos = num_terminos
+        self.modelo = MiniBatchKMeans(n_clusters=num_temas, batch_size=tam_lote,
+                                      random_state=semilla, n_init=3)
+        self.entrenado = False
+        self.etiquetas: Dict[int, str] = {}
+
+        self._pendientes: List[str] = []
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        estado = self.__dict__.copy()
+        del estado['_lock']
+        return estado
+
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        self._lock = threading.Lock()
+
+    def _vectorizar(self, textos: List[str]):
+        """TF-IDF normalizado (L2): k-means con distancia euclidiana equivale a coseno"""
+        matriz = self.motor_resumen.vectorizer.transform([t or '' for t in textos])
+        return normalize(matriz)
+
+    def _ajustar(self, textos: List[str]):
+        """Un paso de partial_fit; el primero necesita al menos num_temas documentos"""
+        self.modelo.partial_fit(self._vectorizar(textos))
+        self.entrenado = True
+        self._actualizar_etiquetas()
+
+    def _actualizar_etiquetas(self):
+        """Etiqueta cada tema con los términos que más lo distinguen del centroide medio"""
+        terminos = self.motor_resumen.vectorizer.get_feature_names_out()
+        # Solo palabras (sin números de expediente, radicados, etc.)
+        validos = np.fromiter((t.isalpha() and len(t) > 3 for t in terminos),
+                              dtype=bool, count=len(terminos))
+        centros = self.modelo.cluster_centers_
+        distintivos = np.where(validos, centros - centros.mean(axis=0), -np.inf)
+        mejores = np.argsort(-distintivos, axis=1)[:, :self.num_terminos]
+        self.etiquetas = {
+            tema: ', '.join(terminos[i] for i in indices)
+            for tema, indices in enumerate(mejores)
+        }
+
+    def entrenar(self, textos: Iterable[str]) -> 'AgrupadorTemas':
+        """
+        Ajusta los temas recorriendo el corpus por mini-lotes
+
+        Args:
+            textos: Textos del corpus (puede ser un generador)
+
+        Returns:
+            El mismo agrupador, ya entrenado
+        """
+        with self._lock:
+            lote = self._pendientes
+            self._pendientes = []
+            for texto in textos:
+                lote.append(texto)
+                if len(lote) >= max(self.tam_lote, self.num_temas):
+                    self._ajustar(lote)
+                    lote = []
+            if len(lote) >= self.num_temas or (lote and self.entrenado):
+                self._ajustar(lote)
+            else:
+                self._pendientes = lote
+        return self
+
+    def asignar(self, textos: List[str]) -> List[Optional[Dict]]:
+        """
+        Asigna un tema a cada texto (no modifica el modelo)
+
+        Args:
+            textos: Lista de textos
+
+        Returns:
+            Lista de dicts {'tema_cluster', 'tema_etiqueta'} (None si aún no hay modelo)
+        """
+        with self._lock:
+            if not self.entrenado or not textos:
+                return [None] * len(textos)
+
+            temas = self.modelo.predict(self._vectorizar(textos))
+            return [
+                {'tema_cluster': str(tema), 'tema_etiqueta': self.etiquetas.get(int(tema), '')}
+                for tema in temas
+            ]
+
+    def guardar(self, ruta: str) -> bool:
+        """
+        Guarda el agrupador en disco (incluye su MotorResumen)
+
+        Args:
+            ruta: Ruta del archivo (p.ej. Data/modelos/agrupador_temas.pkl)
+
+        Returns:
+            True si se guardó correctamente
+        """
+        try:
+            directorio = os.path.dirname(ruta)
+            if directorio:
+                os.makedirs(directorio, exist_ok=True)
+            # Escritura atómica: los workers que recargan el modelo nunca leen un archivo a medias
+            temporal = ruta + '.tmp'
+            with self._lock, open(temporal, 'wb') as f:
+                pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporal, ruta)
+            return True
+        except Exception as e:
+            print(f"Error al guardar agrupador de temas: {e}")
+            return False
+
+    @staticmethod
+    def cargar(ruta: str) -> Optional['AgrupadorTemas']:
+        """
+        Carga un agrupador previamente guardado con guardar()
+
+        Args:
+            ruta: Ruta del archivo
+
+        Returns:
+            El agrupador cargado, o None si no existe o no se pudo leer
+        """
+        if not os.path.exists(ruta):
+            return None
+        try:
+            with open(ruta, 'rb') as f:
+                return pickle.load(f)
+        except Exception as e:
+            print(f"Error al cargar agrupador de temas {ruta}: {e}")
+            return None
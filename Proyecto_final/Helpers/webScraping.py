@@ -1,24 +1,117 @@
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup, SoupStrainer
+import re
 import json
+import codecs
+import hashlib
+import time
+import random
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from urllib.parse import urljoin
 import os
 from typing import List, Dict
 from Helpers import Funciones
+from Helpers.fronteraRastreo import FronteraRastreo, canonicalizar_url
+from Helpers.limitadorHosts import LimitadorHosts
+from Helpers.gestorDescargas import GestorDescargas
+from Helpers.cacheHTTP import CacheHTTP, CACHE_HTTP_DIR
+
+try:
+    import lxml.html as lxml_html
+except ImportError:
+    lxml_html = None
+
+# Páginas que se descargan en paralelo durante el rastreo (1 = secuencial)
+SCRAPING_CONCURRENCIA = int(os.getenv('SCRAPING_CONCURRENCIA', '4'))
+# Límites de cortesía por dominio: peticiones simultáneas y peticiones por segundo
+SCRAPING_CONCURRENCIA_HOST = int(os.getenv('SCRAPING_CONCURRENCIA_HOST', '4'))
+SCRAPING_TASA_HOST = float(os.getenv('SCRAPING_TASA_HOST', '4'))
+# Caché HTTP de páginas en CACHE_HTTP_DIR (desactivada por defecto; SCRAPING_CACHE=1 la activa)
+SCRAPING_CACHE = os.getenv('SCRAPING_CACHE', '0') == '1'
+# Repetir un rastreo solo desde la caché HTTP, sin red (SCRAPING_OFFLINE=1)
+SCRAPING_OFFLINE = os.getenv('SCRAPING_OFFLINE', '0') == '1'
+
+# Respuestas que se reintentan (sobrecarga o error transitorio del servidor)
+_ESTADOS_REINTENTO = {429, 500, 502, 503, 504}
+
+# href de los enlaces del primer div.containerblanco (el resto de la página no se recorre en Python)
+_XPATH_ENLACES = ("(//div[contains(concat(' ', normalize-space(@class), ' '), ' containerblanco ')])[1]"
+                  "//a/@href")
+
+# Charset declarado en la cabecera Content-Type o en un <meta> de la página
+_CHARSET = re.compile(rb'charset\s*=\s*["\']?\s*([\w.:-]+)', re.IGNORECASE)
+
+# Sin lxml: BeautifulSoup solo construye el div containerblanco (class puede tener varias clases)
+_SOLO_CONTENEDOR = SoupStrainer('div', class_=re.compile(r'(^|\s)containerblanco(\s|$)'))
+
+
+@lru_cache(maxsize=32)
+def _patron_extensiones(extensiones: tuple):
+    """Regex (compilada una vez por lista de extensiones) que reconoce '.<ext>' al final de la URL"""
+    return re.compile(r'\.(' + '|'.join(re.escape(ext) for ext in extensiones) + r')\Z', re.IGNORECASE)
+
+
+def _codificacion(contenido: bytes, content_type: str = '') -> str:
+    """Codificación de una página: cabecera, <meta> o, si no se declara, UTF-8 si es válido"""
+    m = _CHARSET.search(content_type.encode('latin-1', 'ignore')) or _CHARSET.search(contenido[:4096])
+    if m:
+        try:
+            return codecs.lookup(m.group(1).decode('ascii', 'ignore')).name
+        except LookupError:
+            pass
+    try:
+        contenido.decode('utf-8')
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'windows-1252'
 
 
 class WebScraping:
     """Clase para realizar web scraping y extracción de enlaces"""
     
-    def __init__(self, dominio_base: str = "https://www.minsalud.gov.co/Normativa/"):
+    def __init__(self, dominio_base: str = "https://www.minsalud.gov.co/Normativa/",
+                 concurrencia: int = None, concurrencia_por_host: int = None,
+                 tasa_por_host: float = None, reintentos: int = 3, espera_base: float = 1.0,
+                 cache_dir: str = None, offline: bool = None):
         """
         Inicializa la clase WebScraping
         
         Args:
             dominio_base: Dominio base para validar enlaces
+            concurrencia: Páginas descargadas en paralelo en el rastreo (por defecto SCRAPING_CONCURRENCIA)
+            concurrencia_por_host: Peticiones simultáneas máximas a un mismo dominio
+            tasa_por_host: Peticiones por segundo máximas a un mismo dominio
+            reintentos: Reintentos ante errores de red, 429 o 5xx
+            espera_base: Segundos base del backoff exponencial entre reintentos
+            cache_dir: Carpeta de la caché HTTP de páginas (por defecto sin caché, salvo con
+                SCRAPING_CACHE=1 o en modo offline, que usan CACHE_HTTP_DIR; '' la desactiva)
+            offline: Responder solo desde la caché HTTP (por defecto SCRAPING_OFFLINE)
         """
         self.dominio_base = dominio_base
+        self.concurrencia = max(1, concurrencia or SCRAPING_CONCURRENCIA)
+        self.reintentos = reintentos
+        self.espera_base = espera_base
+        self.limitador = LimitadorHosts(
+            concurrencia_por_host=concurrencia_por_host or SCRAPING_CONCURRENCIA_HOST,
+            tasa_por_host=tasa_por_host or SCRAPING_TASA_HOST
+        )
         self.session = requests.Session()
+        # Una conexión reutilizable por hilo del rastreo; con caché, las páginas
+        # ya vistas se revalidan (304) o se sirven desde disco
+        pool = {'pool_connections': 10, 'pool_maxsize': max(10, self.concurrencia)}
+        offline = SCRAPING_OFFLINE if offline is None else offline
+        if cache_dir is None:
+            cache_dir = CACHE_HTTP_DIR if SCRAPING_CACHE or offline else ''
+        if cache_dir or offline:
+            self.cache_http = CacheHTTP(cache_dir or None, offline=offline, **pool)
+            adaptador = self.cache_http
+        else:
+            self.cache_http = None
+            adaptador = HTTPAdapter(**pool)
+        self.session.mount('http://', adaptador)
+        self.session.mount('https://', adaptador)
         self.session.headers.update({
             'User-Agent': (
                 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) '
@@ -27,6 +120,51 @@ class WebScraping:
             )
         })
     
+    def _obtener(self, url: str, **kwargs) -> requests.Response:
+        """
+        GET respetando los límites por dominio, con reintentos y backoff con jitter
+        
+        Args:
+            url: URL a pedir
+            **kwargs: Argumentos para session.get (timeout, stream...)
+            
+        Returns:
+            La respuesta (lanza la excepción del último intento si todos fallan)
+        """
+        # Respuestas locales (caché vigente o modo offline): sin límites ni reintentos
+        if self.cache_http and (self.cache_http.offline or
+                                (not kwargs.get('stream') and self.cache_http.sirve_sin_red(url))):
+            return self.session.get(url, **kwargs)
+        
+        for intento in range(self.reintentos + 1):
+            # La latencia se mide dentro del turno: la espera por el límite no cuenta
+            inicio = None
+            try:
+                with self.limitador.turno(url):
+                    inicio = time.monotonic()
+                    response = self.session.get(url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                self.limitador.registrar(url, time.monotonic() - (inicio or time.monotonic()), None)
+                if intento >= self.reintentos:
+                    raise
+                espera = None
+            else:
+                self.limitador.registrar(url, time.monotonic() - inicio, response.status_code)
+                if response.status_code not in _ESTADOS_REINTENTO or intento >= self.reintentos:
+                    return response
+                espera = response.headers.get('Retry-After')
+                response.close()
+            
+            # Full jitter: los hilos que fallaron a la vez no reintentan a la vez
+            try:
+                espera = min(float(espera), 60.0) if espera else None
+            except ValueError:
+                espera = None
+            if espera is None:
+                espera = random.uniform(0, self.espera_base * (2 ** intento))
+            print(f"Reintentando {url} en {espera:.1f} s (intento {intento + 1}/{self.reintentos})")
+            time.sleep(espera)
+    
     def extract_links(self, url: str, listado_extensiones: List[str] = None) -> List[Dict]:
         """
         Extrae links internos según listado de extensiones que puede ser "PDF, ASPX, PHP"
@@ -44,38 +182,11 @@ class WebScraping:
             listado_extensiones = ['pdf', 'aspx']
         
         try:
-            response = self.session.get(url, timeout=30)
+            response = self._obtener(url, timeout=30)
             response.raise_for_status()  # Lanza excepción para códigos de error
             
-            soup = BeautifulSoup(response.content, 'lxml')
-            container_div = soup.find('div', class_='containerblanco')
-            # print(f"Encontrado div containerblanco: {container_div is not None}")
-            
-            links: List[Dict] = []
-            
-            if container_div:
-                for link in container_div.find_all('a'):
-                    href = link.get('href')
-                    if not href:
-                        continue
-
-                    full_url = urljoin(url, href)
-
-                    # Filtrar por dominio base
-                    if not full_url.startswith(self.dominio_base):
-                        continue
-                    
-                    # Verificar extensión
-                    for ext in listado_extensiones:
-                        ext_lower = ext.lower().strip()
-                        if full_url.lower().endswith(f'.{ext_lower}'):
-                            links.append({
-                                'url': full_url,
-                                'type': ext_lower
-                            })
-                            break  # Solo agregar una vez
-            
-            return links
+            return self.extraer_links_html(response.content, url, listado_extensiones,
+                                           response.headers.get('Content-Type', ''))
             
         except requests.exceptions.RequestException as e:
             print(f"Error fetching {url}: {e}")
@@ -84,12 +195,72 @@ class WebScraping:
             print(f"Error procesando {url}: {e}")
             return []
     
+    def extraer_links_html(self, contenido: bytes, url: str, listado_extensiones: List[str],
+                           content_type: str = '') -> List[Dict]:
+        """
+        Extrae los links del div containerblanco de una página ya descargada
+        
+        Con lxml se evalúa una sola XPath que devuelve los href (sin construir
+        el árbol de BeautifulSoup); sin lxml, BeautifulSoup solo parsea el
+        contenedor (SoupStrainer). Cada URL se resuelve, filtra y canonicaliza
+        en una pasada, y los repetidos dentro de la página se descartan.
+        
+        Args:
+            contenido: HTML de la página (bytes)
+            url: URL de la página (base para los enlaces relativos)
+            listado_extensiones: Lista de extensiones a filtrar
+            content_type: Cabecera Content-Type de la respuesta (para la codificación)
+            
+        Returns:
+            Lista de diccionarios con 'url' y 'type' de cada enlace encontrado
+        """
+        extensiones = tuple(ext.lower().strip() for ext in listado_extensiones if ext.strip())
+        if not contenido or not extensiones:
+            return []
+        patron = _patron_extensiones(extensiones)
+        
+        if lxml_html is not None:
+            parser = lxml_html.HTMLParser(encoding=_codificacion(contenido, content_type))
+            hrefs = lxml_html.document_fromstring(contenido, parser=parser).xpath(_XPATH_ENLACES)
+        else:
+            soup = BeautifulSoup(contenido, 'html.parser', parse_only=_SOLO_CONTENEDOR)
+            container_div = soup.find('div', class_='containerblanco')
+            hrefs = [a.get('href') for a in container_div.find_all('a')] if container_div else []
+        
+        links: List[Dict] = []
+        vistas = set()
+        for href in hrefs:
+            if not href:
+                continue
+            
+            full_url = urljoin(url, href)
+            
+            # Filtrar por dominio base
+            if not full_url.startswith(self.dominio_base):
+                continue
+            
+            # Verificar extensión
+            m = patron.search(full_url)
+            if not m:
+                continue
+            
+            canonica = canonicalizar_url(full_url)
+            if canonica in vistas:
+                continue
+            vistas.add(canonica)
+            links.append({'url': full_url, 'type': m.group(1).lower()})
+        
+        return links
+    
     def extraer_todos_los_links(
         self,
         url_inicial: str,
         json_file_path: str,
         listado_extensiones: List[str] = None,
-        max_iteraciones: int = 100
+        max_iteraciones: int = 100,
+        ruta_frontera: str = None,
+        guardar_cada: int = 25,
+        concurrencia: int = None
     ) -> Dict:
         """
         Extrae todos los links de forma recursiva desde una URL inicial
@@ -99,6 +270,10 @@ class WebScraping:
             json_file_path: Ruta del archivo JSON para guardar/cargar links
             listado_extensiones: Lista de extensiones a filtrar
             max_iteraciones: Número máximo de iteraciones para evitar loops infinitos
+            ruta_frontera: Archivo donde se guarda el estado del rastreo (opcional).
+                Si existe, el rastreo se reanuda desde ahí; se elimina al terminar
+            guardar_cada: Cada cuántas páginas visitadas se guarda el progreso
+            concurrencia: Páginas descargadas en paralelo (por defecto la del constructor)
             
         Returns:
             Diccionario con el resultado de la extracción
@@ -109,44 +284,82 @@ class WebScraping:
         # Cargar links existentes del archivo JSON
         all_links = self._cargar_links_desde_json(json_file_path)
         
+        # Reanudar un rastreo interrumpido, si hay estado guardado
+        frontera = FronteraRastreo.cargar(ruta_frontera) if ruta_frontera else None
+        reanudado = frontera is not None
+        
         # Si no hay links, extraer de la URL inicial
-        if not all_links:
+        if not all_links and not reanudado:
             print(f"Extrayendo links de la URL inicial: {url_inicial}")
             all_links = self.extract_links(url_inicial, listado_extensiones)
         
         # Filtrar links para que solo estén en el dominio especificado
         all_links = [link for link in all_links if link['url'].startswith(self.dominio_base)]
         
-        # Obtener links ASPX para visitar
-        aspx_links_to_visit = [
-            link['url'] for link in all_links 
-            if link['type'] == 'aspx' and link['url'].startswith(self.dominio_base)
-        ]
+        # URLs canónicas de los links ya conocidos: la verificación de duplicados es O(1)
+        urls_conocidas = set()
+        links_unicos = []
+        for link in all_links:
+            canonica = canonicalizar_url(link['url'])
+            if canonica not in urls_conocidas:
+                urls_conocidas.add(canonica)
+                links_unicos.append(link)
+        all_links = links_unicos
+        
+        if reanudado:
+            print(f"Reanudando rastreo: {len(frontera)} páginas pendientes")
+        else:
+            # Obtener links ASPX para visitar
+            frontera = FronteraRastreo()
+            frontera.marcar_vista(url_inicial)
+            for link in all_links:
+                if link['type'] == 'aspx':
+                    frontera.agregar(link['url'])
         
-        visited_aspx_links = set()
         iteraciones = 0
+        visitas_guardadas = 0
+        concurrencia = max(1, concurrencia or self.concurrencia)
         
-        # Recorrer links ASPX
-        while aspx_links_to_visit and iteraciones < max_iteraciones:
-            iteraciones += 1
-            current_aspx_url = aspx_links_to_visit.pop(0)
-            
-            if current_aspx_url not in visited_aspx_links:
-                visited_aspx_links.add(current_aspx_url)
-                print(f"Iteración {iteraciones}: Visitando: {current_aspx_url}")
+        # Recorrer links ASPX (en anchura). Con concurrencia > 1 se mantienen
+        # hasta ese número de páginas en descarga; los límites por dominio los
+        # aplica self.limitador dentro de extract_links
+        en_curso = {}
+        with ThreadPoolExecutor(max_workers=concurrencia) as executor:
+            while frontera or en_curso:
+                while frontera and len(en_curso) < concurrencia and iteraciones < max_iteraciones:
+                    iteraciones += 1
+                    current_aspx_url = frontera.siguiente()
+                    print(f"Iteración {iteraciones}: Visitando: {current_aspx_url}")
+                    futuro = executor.submit(self.extract_links, current_aspx_url, listado_extensiones)
+                    en_curso[futuro] = current_aspx_url
                 
-                new_links = self.extract_links(current_aspx_url, listado_extensiones)
+                if not en_curso:
+                    break
                 
-                for link in new_links:
-                    # Verificar si el link no está ya en la lista
-                    if not any(existing_link['url'] == link['url'] for existing_link in all_links):
+                terminados, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+                for futuro in terminados:
+                    del en_curso[futuro]
+                    
+                    for link in futuro.result():
+                        # Verificar si el link no está ya en la lista
+                        canonica = canonicalizar_url(link['url'])
+                        if canonica in urls_conocidas:
+                            continue
+                        urls_conocidas.add(canonica)
                         all_links.append(link)
                         
                         # Si es ASPX, agregarlo a la cola de visitas
-                        if link['type'] == 'aspx' and link['url'] not in visited_aspx_links:
-                            aspx_links_to_visit.append(link['url'])
+                        if link['type'] == 'aspx':
+                            frontera.agregar(link['url'])
+                
+                # Guardar progreso: si el proceso se interrumpe, se reanuda desde
+                # aquí (las páginas aún en descarga vuelven a la cola)
+                if ruta_frontera and iteraciones // guardar_cada > visitas_guardadas:
+                    visitas_guardadas = iteraciones // guardar_cada
+                    self._guardar_links_en_json(json_file_path, {"links": all_links})
+                    frontera.guardar(ruta_frontera, en_curso=list(en_curso.values()))
         
-        if iteraciones >= max_iteraciones:
+        if frontera and iteraciones >= max_iteraciones:
             print(f"Advertencia: Se alcanzó el máximo de {max_iteraciones} iteraciones")
         
         # Filtrar nuevamente para asegurar que todos están en el dominio
@@ -156,13 +369,21 @@ class WebScraping:
         json_output = {"links": all_links}
         self._guardar_links_en_json(json_file_path, json_output)
         
+        if ruta_frontera:
+            if frontera:
+                frontera.guardar(ruta_frontera)
+            elif os.path.exists(ruta_frontera):
+                # Rastreo completo: la próxima ejecución empieza de cero
+                os.remove(ruta_frontera)
+        
         print(f"Finalizado: Se encontraron {len(all_links)} links en total")
         
         return {
             'success': True,
             'total_links': len(all_links),
             'links': all_links,
-            'iteraciones': iteraciones
+            'iteraciones': iteraciones,
+            'pendientes': len(frontera)
         }
     
     def _cargar_links_desde_json(self, json_file_path: str) -> List[Dict]:
@@ -193,13 +414,21 @@ class WebScraping:
         except Exception as e:
             print(f"Error al guardar JSON: {e}")
     
-    def descargar_pdfs(self, json_file_path: str, carpeta_destino: str = "static/uploads") -> Dict:
+    def descargar_pdfs(self, json_file_path: str, carpeta_destino: str = "static/uploads",
+                       limpiar_destino: bool = False, validador=None) -> Dict:
         """
         Recorre el archivo JSON y descarga los archivos PDF en la carpeta especificada
         
+        Las descargas son paralelas e incrementales (GestorDescargas): los PDFs
+        que ya están en la carpeta y no cambiaron en el servidor no se vuelven a
+        bajar, y los que quedaron a medias se reanudan.
+        
         Args:
             json_file_path: Ruta del archivo JSON con los links
             carpeta_destino: Carpeta donde se descargarán los PDFs (default: static/uploads)
+            limpiar_destino: Borrar el contenido de la carpeta antes de descargar
+                (fuerza a descargar todo de nuevo)
+            validador: Función (ruta) -> bool para descartar archivos inválidos
             
         Returns:
             Diccionario con el resultado de la descarga
@@ -223,72 +452,73 @@ class WebScraping:
             Funciones.crear_carpeta(carpeta_destino)
             
             # Borrar contenido de la carpeta antes de descargar
-            print(f"Limpiando contenido de la carpeta: {carpeta_destino}")
-            Funciones.borrar_contenido_carpeta(carpeta_destino)
+            if limpiar_destino:
+                print(f"Limpiando contenido de la carpeta: {carpeta_destino}")
+                Funciones.borrar_contenido_carpeta(carpeta_destino)
+            
+            from werkzeug.utils import secure_filename
             
-            # Descargar PDFs
-            descargados = 0
-            errores = 0
-            archivos_errores = []
+            # Nombre de archivo de cada URL (sin repetir: dos URLs no escriben el mismo archivo).
+            # Una URL ya descargada conserva el nombre que tiene en el manifiesto, y los
+            # nombres nuevos dependen solo de la URL, no del orden en que se encontraron
+            manifiesto = GestorDescargas._cargar_manifiesto(carpeta_destino)
+            nombres_usados = {entrada['archivo'] for entrada in manifiesto.values() if entrada.get('archivo')}
+            archivos = []
+            for pdf_url in sorted({link['url'] for link in pdf_links}):
+                if manifiesto.get(pdf_url, {}).get('archivo'):
+                    archivos.append((pdf_url, manifiesto[pdf_url]['archivo']))
+                    continue
+                
+                sufijo = hashlib.sha1(pdf_url.encode('utf-8')).hexdigest()[:10]
+                # Obtener nombre del archivo desde la URL
+                nombre_archivo = os.path.basename(pdf_url.split('?')[0])  # Remover query params
+                
+                # Si no tiene extensión .pdf, agregarla
+                if not nombre_archivo.lower().endswith('.pdf'):
+                    nombre_archivo += '.pdf'
+                
+                # Limpiar nombre de archivo (remover caracteres especiales)
+                nombre_archivo = secure_filename(nombre_archivo)
+                
+                # Si el nombre está vacío, generar uno
+                # (secure_filename convierte '.pdf' en 'pdf')
+                if nombre_archivo in ('', '.pdf', 'pdf'):
+                    nombre_archivo = f"archivo_{sufijo}.pdf"
+                if nombre_archivo in nombres_usados:
+                    nombre_archivo = f"{os.path.splitext(nombre_archivo)[0]}_{sufijo}.pdf"
+                nombres_usados.add(nombre_archivo)
+                
+                archivos.append((pdf_url, nombre_archivo))
             
             print(f"Iniciando descarga de {len(pdf_links)} archivos PDF...")
             
-            for i, link in enumerate(pdf_links, 1):
-                pdf_url = link['url']
-                try:
-                    # Obtener nombre del archivo desde la URL
-                    nombre_archivo = os.path.basename(pdf_url.split('?')[0])  # Remover query params
-                    
-                    # Si no tiene extensión .pdf, agregarla
-                    if not nombre_archivo.lower().endswith('.pdf'):
-                        nombre_archivo += '.pdf'
-                    
-                    # Limpiar nombre de archivo (remover caracteres especiales)
-                    from werkzeug.utils import secure_filename
-                    nombre_archivo = secure_filename(nombre_archivo)
-                    
-                    # Si el nombre está vacío, generar uno
-                    if not nombre_archivo or nombre_archivo == '.pdf':
-                        nombre_archivo = f"archivo_{i}.pdf"
-                    
-                    ruta_archivo = os.path.join(carpeta_destino, nombre_archivo)
-                    
-                    # Descargar archivo
-                    print(f"Descargando [{i}/{len(pdf_links)}]: {nombre_archivo}")
-                    response = self.session.get(pdf_url, stream=True, timeout=60)
-                    response.raise_for_status()
-                    
-                    # Guardar archivo
-                    with open(ruta_archivo, 'wb') as f:
-                        for chunk in response.iter_content(chunk_size=8192):
-                            if chunk:
-                                f.write(chunk)
-                    
-                    descargados += 1
-                    
-                except Exception as e:
-                    errores += 1
-                    archivos_errores.append({
-                        'url': pdf_url,
-                        'error': str(e)
-                    })
-                    print(f"Error al descargar {pdf_url}: {e}")
+            gestor = GestorDescargas(self.session, n_hilos=self.concurrencia,
+                                     obtener=self._obtener, validador=validador)
+            estadisticas = gestor.descargar_todos(archivos, carpeta_destino)
             
             resultado = {
                 'success': True,
                 'total': len(pdf_links),
-                'descargados': descargados,
-                'errores': errores,
+                'descargados': estadisticas['descargados'],
+                'sin_cambios': estadisticas['sin_cambios'],
+                'reanudados': estadisticas['reanudados'],
+                'errores': estadisticas['errores'],
+                'bytes': estadisticas['bytes'],
+                'segundos': estadisticas['segundos'],
+                'mb_por_segundo': estadisticas['mb_por_segundo'],
                 'carpeta_destino': carpeta_destino
             }
             
-            if archivos_errores:
-                resultado['archivos_con_error'] = archivos_errores
+            if estadisticas['archivos_con_error']:
+                resultado['archivos_con_error'] = estadisticas['archivos_con_error']
             
             print(f"\nDescarga completada:")
             print(f"  Total: {len(pdf_links)}")
-            print(f"  Descargados: {descargados}")
-            print(f"  Errores: {errores}")
+            print(f"  Descargados: {estadisticas['descargados']} (reanudados: {estadisticas['reanudados']})")
+            print(f"  Sin cambios: {estadisticas['sin_cambios']}")
+            print(f"  Errores: {estadisticas['errores']}")
+            print(f"  {estadisticas['bytes'] / 1024 / 1024:.1f} MB en {estadisticas['segundos']} s "
+                  f"({estadisticas['mb_por_segundo']} MB/s)")
             
             return resultado
             
@@ -3,7 +3,11 @@ from dotenv import load_dotenv
 import os
 from datetime import datetime
 from werkzeug.utils import secure_filename
-from Helpers import MongoDB, ElasticSearch, Funciones, WebScraping
+from Helpers import MongoDB, ElasticSearch, Funciones, WebScraping, EnriquecedorPLN, GestorCargas, EspaciosTrabajo
+from Helpers.servidorPLN import obtener_pln
+from Helpers.elastic import (construir_knn_anla, buscar_resoluciones_anla_hibrida, buscar_pasajes_anla,
+                            crear_indice_anla_si_no_existe)
+import uuid
 import re
 import unicodedata
 
@@ -39,6 +43,13 @@ ELASTIC_PASSWORD      = os.getenv('ELASTIC_PASSWORD')       # tu password local
 # Índice por defecto para resoluciones ANLA
 ELASTIC_INDEX_DEFAULT = os.getenv('ELASTIC_INDEX_DEFAULT', 'anla_resoluciones')
 
+# Resultados del modo híbrido del buscador; cada recuperador (BM25 y kNN) aporta
+# ELASTIC_FACTOR_CANDIDATOS veces esa cantidad antes de fusionar
+BUSCADOR_RESULTADOS_HIBRIDO = int(os.getenv('BUSCADOR_RESULTADOS_HIBRIDO', '20'))
+
+# Temas del corpus (k-means por mini-lotes) entrenados por cargar_json_anla.py
+RUTA_AGRUPADOR_TEMAS = os.getenv('RUTA_AGRUPADOR_TEMAS', os.path.join('Data', 'modelos', 'agrupador_temas.pkl'))
+
 # Versión de la aplicación
 VERSION_APP = "1.3.0"
 CREATOR_APP = "Oswaldo Salgado Gómez"
@@ -69,6 +80,67 @@ mongo = MongoDB(MONGO_URI, MONGO_DB)
 # Por eso este constructor funciona tanto en local como en Render:
 elastic = ElasticSearch(ELASTIC_CLOUD_URL, ELASTIC_API_KEY)
 
+# PLN del buscador semántico. Se crea al
+# primer uso; si PLN_SOCKET está activo es un cliente del servidor PLN
+_pln = None
+
+def obtener_pln_app():
+    global _pln
+    if _pln is None:
+        _pln = obtener_pln()
+    return _pln
+
+# Enriquecimiento PLN en segundo plano (se crea al primer uso)
+_enriquecedor = None
+
+def obtener_enriquecedor() -> EnriquecedorPLN:
+    global _enriquecedor
+    if _enriquecedor is None:
+        # Si hay temas entrenados, los documentos nuevos reciben tema_cluster con
+        # el modelo guardado (se recarga cuando cargar_json_anla.py lo reentrena)
+        # Las etapas corren en procesos hijos, que obtienen su PLN con obtener_pln
+        _enriquecedor = EnriquecedorPLN(elastic.client, ruta_agrupador_temas=RUTA_AGRUPADOR_TEMAS)
+    return _enriquecedor
+
+# Una carpeta por trabajo de carga dentro de static/uploads; el recolector
+# elimina las carpetas vencidas o que excedan la cuota
+espacios_trabajo = EspaciosTrabajo()
+espacios_trabajo.iniciar_recolector()
+
+# Cargas por partes de archivos grandes (se crea al primer uso)
+_gestor_cargas = None
+
+_indices_preparados = set()
+
+def preparar_indice(index: str):
+    """
+    Antes de cargar en el índice ANLA: lo crea con su mapping y el pipeline que
+    da grupo_duplicados a cada documento si no existe (una vez por proceso)
+    """
+    if index == ELASTIC_INDEX_DEFAULT and index not in _indices_preparados:
+        crear_indice_anla_si_no_existe(index)
+        _indices_preparados.add(index)
+
+def procesar_carga_completa(carga: dict, ruta: str) -> dict:
+    """Entrega un archivo ya subido por partes al pipeline de ingesta (en segundo plano)"""
+    index = carga['datos'].get('index')
+    if not carga['nombre'].lower().endswith('.zip'):
+        raise ValueError('Solo se admiten archivos ZIP con JSON')
+    
+    # Los JSON se leen del ZIP en el mismo lugar donde se recibió (sin copiarlo)
+    errores_lectura = []
+    documentos = (doc for _, doc in Funciones.iterar_json_zip(ruta, errores_lectura))
+    preparar_indice(index)
+    resultado = elastic.indexar_streaming(index, documentos)
+    resultado['archivos_invalidos'] = errores_lectura[:50]
+    return resultado
+
+def obtener_gestor_cargas() -> GestorCargas:
+    global _gestor_cargas
+    if _gestor_cargas is None:
+        _gestor_cargas = GestorCargas(al_completar=procesar_carga_completa)
+    return _gestor_cargas
+
 # ==================== RUTAS PÚBLICAS ====================
 
 @app.route('/')
@@ -105,6 +177,10 @@ def buscador():
     - número de resolución
     - número de expediente
     - tipo de infracción (select)
+    - tema del corpus (select, tema_cluster)
+    - colapsar resoluciones casi duplicadas (checkbox)
+    - modo de búsqueda: texto (BM25), semántico (kNN sobre embeddings),
+      híbrido (ambos fusionados con RRF) o pasajes (página exacta)
     """
 
     # ---- Parámetros de la URL (GET) ----
@@ -114,6 +190,11 @@ def buscador():
     num_resolucion = (request.args.get('num_resolucion') or '').strip()
     num_expediente = (request.args.get('num_expediente') or '').strip()
     tipo_infraccion = (request.args.get('tipo_infraccion') or '').strip()
+    tema = (request.args.get('tema') or '').strip()
+    colapsar = request.args.get('colapsar') == '1'
+    modo = (request.args.get('modo') or 'texto').strip()
+    if modo not in ('texto', 'semantico', 'hibrido', 'pasajes'):
+        modo = 'texto'
 
     resultados = []
     total = 0
@@ -123,12 +204,22 @@ def buscador():
     # listas para los <select>
     empresas_opciones = []
     tipos_infraccion_opciones = []
+    temas_opciones = []
 
     try:
         must_clauses = []
 
         # ---- TEXTO LIBRE ----
-        if texto:
+        # En modo semántico/híbrido/pasajes el texto no va en la query de filtros:
+        # se usa como vector kNN (y como BM25 dentro de la búsqueda híbrida)
+        # o se busca en el índice de pasajes
+        if texto and modo == 'semantico':
+            filtros_activos["Texto (semántico)"] = texto
+        elif texto and modo == 'hibrido':
+            filtros_activos["Texto (híbrido)"] = texto
+        elif texto and modo == 'pasajes':
+            filtros_activos["Texto (pasajes)"] = texto
+        elif texto:
             filtros_activos["Texto"] = texto
             must_clauses.append({
                 "multi_match": {
@@ -199,12 +290,35 @@ def buscador():
                 }
             })
 
+        # ---- TEMA DEL CORPUS (select) ----
+        if tema:
+            filtros_activos["Tema"] = tema
+            must_clauses.append({
+                "term": {
+                    "tema_cluster": tema
+                }
+            })
+
         # ---- QUERY PRINCIPAL ----
-        if not must_clauses:
+        if texto and modo == 'semantico':
+            # Los demás filtros se aplican dentro de la búsqueda kNN
+            query_body = {
+                "knn": construir_knn_anla(texto, obtener_pln_app(), k=100,
+                                          num_candidates=200, filtros=must_clauses)
+            }
+        elif not must_clauses:
             query_body = {"query": {"match_all": {}}}
         else:
             query_body = {"query": {"bool": {"must": must_clauses}}}
 
+        # No devolver los vectores en los resultados
+        query_body["_source"] = {"excludes": ["embedding"]}
+
+        # ---- COLAPSAR CASI-DUPLICADOS (grupo_duplicados) ----
+        if colapsar:
+            filtros_activos["Sin duplicados"] = "Sí"
+            query_body["collapse"] = {"field": "grupo_duplicados"}
+
         # ---- AGREGACIONES PARA LLENAR LOS SELECTS ----
         aggs = {
             "empresas": {
@@ -218,21 +332,56 @@ def buscador():
                     "field": "tipos_infraccion",
                     "size": 200
                 }
+            },
+            # Temas precalculados en la ingesta: la faceta no ejecuta PLN
+            "temas": {
+                "terms": {
+                    "field": "tema_cluster",
+                    "size": 100
+                },
+                "aggs": {
+                    "etiqueta": {
+                        "terms": {
+                            "field": "tema_etiqueta",
+                            "size": 1
+                        }
+                    }
+                }
             }
         }
 
+        # En modo híbrido/pasajes esta llamada solo trae las agregaciones (con los
+        # filtros); los resultados vienen de la fusión BM25 + kNN o del índice de pasajes
+        es_hibrido = bool(texto) and modo == 'hibrido'
+        es_pasajes = bool(texto) and modo == 'pasajes'
+
         # Llamada a Elasticsearch mediante tu helper
         resultado = elastic.buscar(
             index=ELASTIC_INDEX_DEFAULT,
             query=query_body,
             aggs=aggs,
-            size=100
+            size=0 if (es_hibrido or es_pasajes) else 100
         )
 
         if resultado.get('success'):
             resultados = resultado.get('resultados', [])
             total = resultado.get('total', 0)
 
+            if es_hibrido:
+                respuesta_hibrida = buscar_resoluciones_anla_hibrida(
+                    texto, obtener_pln_app(), size=BUSCADOR_RESULTADOS_HIBRIDO,
+                    filtros=must_clauses, colapsar_duplicados=colapsar,
+                    index_name=ELASTIC_INDEX_DEFAULT
+                )
+                resultados = respuesta_hibrida['hits']['hits']
+                total = respuesta_hibrida['hits']['total']['value']
+
+            if es_pasajes:
+                # Un hit por resolución (collapse por pdf_id) con sus mejores pasajes
+                respuesta_pasajes = buscar_pasajes_anla(texto, size=100, filtros=must_clauses)
+                resultados = respuesta_pasajes['hits']['hits']
+                total = respuesta_pasajes['hits']['total']['value']
+
             aggs_result = resultado.get('aggs', {}) or {}
 
             empresas_opciones = [
@@ -242,6 +391,18 @@ def buscador():
                 b["key"] for b in aggs_result.get("tipos_infraccion", {}).get("buckets", [])
             ]
 
+            temas_opciones = sorted(
+                (
+                    {
+                        "valor": b["key"],
+                        "etiqueta": next(iter(b.get("etiqueta", {}).get("buckets", [])), {}).get("key", ""),
+                        "total": b["doc_count"]
+                    }
+                    for b in aggs_result.get("temas", {}).get("buckets", [])
+                ),
+                key=lambda t: int(t["valor"]) if t["valor"].isdigit() else 0
+            )
+
             empresas_opciones = sorted(empresas_opciones)
             tipos_infraccion_opciones = sorted(tipos_infraccion_opciones)
 
@@ -273,8 +434,12 @@ def buscador():
         num_resolucion=num_resolucion,
         num_expediente=num_expediente,
         tipo_infraccion=tipo_infraccion,
+        tema=tema,
+        colapsar=colapsar,
+        modo=modo,
         empresas_opciones=empresas_opciones,
         tipos_infraccion_opciones=tipos_infraccion_opciones,
+        temas_opciones=temas_opciones,
         resultados=resultados,
         total=total,
         error=error,
@@ -612,33 +777,35 @@ def procesar_webscraping_elastic():
         # Inicializar WebScraping
         scraper = WebScraping(dominio_base=url.rsplit('/', 1)[0] + '/')
         
-        # Limpiar carpeta de uploads
-        carpeta_upload = 'static/uploads'
-        Funciones.crear_carpeta(carpeta_upload)
-        Funciones.borrar_contenido_carpeta(carpeta_upload)
-        
-        # Extraer todos los enlaces
-        json_path = os.path.join(carpeta_upload, 'links.json')
-        resultado = scraper.extraer_todos_los_links(
-            url_inicial=url,
-            json_file_path=json_path,
-            listado_extensiones=todas_extensiones,
-            max_iteraciones=50
-        )
+        # Carpeta propia de este trabajo (otras cargas simultáneas no se ven afectadas)
+        trabajo_id, carpeta_upload = espacios_trabajo.crear()
         
-        if not resultado['success']:
-            return jsonify({'success': False, 'error': 'Error al extraer enlaces'}), 500
+        # El espacio queda marcado en uso mientras dura el scraping (el recolector no lo elimina)
+        with espacios_trabajo.en_uso(trabajo_id):
+            # Extraer todos los enlaces
+            json_path = os.path.join(carpeta_upload, 'links.json')
+            resultado = scraper.extraer_todos_los_links(
+                url_inicial=url,
+                json_file_path=json_path,
+                listado_extensiones=todas_extensiones,
+                max_iteraciones=50
+            )
         
-        # Descargar archivos PDF (o los tipos especificados)
-        resultado_descarga = scraper.descargar_pdfs(json_path, carpeta_upload)
+            if not resultado['success']:
+                return jsonify({'success': False, 'error': 'Error al extraer enlaces'}), 500
         
-        scraper.close()
+            # Descargar archivos PDF (o los tipos especificados)
+            # La carpeta del trabajo es nueva: no hace falta (ni se debe) vaciarla
+            resultado_descarga = scraper.descargar_pdfs(json_path, carpeta_upload, limpiar_destino=False)
+        
+            scraper.close()
         
         # Listar archivos descargados
         archivos = Funciones.listar_archivos_carpeta(carpeta_upload, lista_tipos_archivos)
         
         return jsonify({
             'success': True,
+            'trabajo_id': trabajo_id,
             'archivos': archivos,
             'mensaje': f'Se descargaron {len(archivos)} archivos',
             'stats': {
@@ -653,7 +820,11 @@ def procesar_webscraping_elastic():
 
 @app.route('/procesar-zip-elastic', methods=['POST'])
 def procesar_zip_elastic():
-    """API para procesar archivo ZIP con archivos JSON y listarlos para carga"""
+    """
+    API para procesar archivo ZIP con archivos JSON y listarlos para carga.
+    Con modo=streaming los JSON se leen del ZIP y se indexan en una sola pasada
+    (sin guardar ni descomprimir en static/uploads).
+    """
     try:
         if not session.get('logged_in'):
             return jsonify({'success': False, 'error': 'No autorizado'}), 401
@@ -674,11 +845,28 @@ def procesar_zip_elastic():
         if not index:
             return jsonify({'success': False, 'error': 'Índice no especificado'}), 400
         
-        # Guardar archivo ZIP temporalmente
+        if request.form.get('modo') == 'streaming':
+            # El ZIP subido se lee desde el stream de la petición (seekable)
+            errores_lectura = []
+            documentos = (doc for _, doc in Funciones.iterar_json_zip(file.stream, errores_lectura))
+            preparar_indice(index)
+            resultado = elastic.indexar_streaming(index, documentos)
+            
+            if not resultado.get('success'):
+                return jsonify({'success': False, 'error': resultado.get('error')}), 500
+            
+            return jsonify({
+                'success': True,
+                'streaming': True,
+                'indexados': resultado.get('indexados', 0),
+                'errores': resultado.get('fallidos', 0) + len(errores_lectura),
+                'archivos_invalidos': errores_lectura[:50],
+                'mensaje': f"Se indexaron {resultado.get('indexados', 0)} documentos directamente desde el ZIP"
+            })
+        
+        # Guardar archivo ZIP temporalmente en la carpeta propia de este trabajo
         filename = secure_filename(file.filename)
-        carpeta_upload = 'static/uploads'
-        Funciones.crear_carpeta(carpeta_upload)
-        Funciones.borrar_contenido_carpeta(carpeta_upload)
+        trabajo_id, carpeta_upload = espacios_trabajo.crear()
         
         zip_path = os.path.join(carpeta_upload, filename)
         file.save(zip_path)
@@ -695,6 +883,7 @@ def procesar_zip_elastic():
         
         return jsonify({
             'success': True,
+            'trabajo_id': trabajo_id,
             'archivos': archivos_json,
             'mensaje': f'Se encontraron {len(archivos_json)} archivos JSON'
         })
@@ -721,89 +910,198 @@ def cargar_documentos_elastic():
         if not archivos or not index:
             return jsonify({'success': False, 'error': 'Archivos e índice son requeridos'}), 400
         
-        documentos = []
-        
-        if metodo == 'zip':
-            # Cargar archivos JSON directamente
-            for archivo in archivos:
-                ruta = archivo.get('ruta')
-                print(f"Procesando archivo JSON: {ruta}")
-                if ruta and os.path.exists(ruta):
-                    doc = Funciones.leer_json(ruta)
-                    if doc:
-                        documentos.append(doc)
-        
-        elif metodo == 'webscraping':
-            # Procesar archivos con PLN (aquí está simulado)
-            for archivo in archivos:
-                ruta = archivo.get('ruta')
-                if not ruta or not os.path.exists(ruta):
-                    continue
-                
-                extension = archivo.get('extension', '').lower()
-                
-                # Extraer texto según tipo de archivo
-                texto = ""
-                if extension == 'pdf':
-                    # Intentar extracción normal
-                    texto = Funciones.extraer_texto_pdf(ruta)
-                    
-                    # Si no se extrajo texto, intentar con OCR
-                    if not texto or len(texto.strip()) < 100:
-                        try:
-                            texto = Funciones.extraer_texto_pdf_ocr(ruta)
-                        except:
-                            pass
-                
-                elif extension == 'txt':
-                    try:
-                        with open(ruta, 'r', encoding='utf-8') as f:
-                            texto = f.read()
-                    except:
+        # El trabajo debe existir: es el espacio que se marca en uso mientras se leen los archivos
+        trabajo_id = data.get('trabajo_id')
+        carpeta_trabajo = espacios_trabajo.ruta(trabajo_id)
+        if not carpeta_trabajo:
+            return jsonify({'success': False, 'error': 'Trabajo no válido o ya eliminado'}), 400
+        
+        # Las rutas vienen del navegador: solo se aceptan archivos del espacio de este trabajo
+        carpeta_trabajo = os.path.realpath(carpeta_trabajo)
+        archivos = [a for a in archivos if a.get('ruta') and os.path.commonpath(
+            [carpeta_trabajo, os.path.realpath(a['ruta'])]) == carpeta_trabajo]
+        if not archivos:
+            return jsonify({'success': False, 'error': 'Archivos no válidos o ya eliminados'}), 400
+        
+        # Los archivos se leen (y se les hace OCR) con el espacio marcado en uso
+        with espacios_trabajo.en_uso(trabajo_id):
+            documentos = []
+            ids = None
+
+            if metodo == 'zip':
+                # Cargar archivos JSON directamente
+                for archivo in archivos:
+                    ruta = archivo.get('ruta')
+                    print(f"Procesando archivo JSON: {ruta}")
+                    if ruta and os.path.exists(ruta):
+                        doc = Funciones.leer_json(ruta)
+                        if doc:
+                            documentos.append(doc)
+
+            elif metodo == 'webscraping':
+                # Se indexa el texto de inmediato; el PLN (resumen, entidades, temas)
+                # se ejecuta después en segundo plano con EnriquecedorPLN
+                ids = []
+                for archivo in archivos:
+                    ruta = archivo.get('ruta')
+                    if not ruta or not os.path.exists(ruta):
+                        continue
+
+                    extension = archivo.get('extension', '').lower()
+
+                    # Extraer texto según tipo de archivo
+                    texto = ""
+                    if extension == 'pdf':
+                        # Capa de texto página por página; OCR solo en las páginas
+                        # vacías o ilegibles (anexos escaneados)
+                        texto = Funciones.extraer_texto_pdf_hibrido(ruta)
+
+                    elif extension == 'txt':
                         try:
-                            with open(ruta, 'r', encoding='latin-1') as f:
+                            with open(ruta, 'r', encoding='utf-8') as f:
                                 texto = f.read()
                         except:
-                            pass
-                
-                if not texto or len(texto.strip()) < 50:
-                    continue
-                
-                # Procesar con PLN (simulado, sin modelos reales)
-                try:
-                    resumen = ""
-                    entidades = ""
-                    temas = []  # lista de (palabra, relevancia)
-                    
-                    # Crear documento
-                    documento = {
-                        'texto': texto,
-                        'fecha': datetime.now().isoformat(),
-                        'ruta': ruta,
-                        'nombre_archivo': archivo.get('nombre', ''),
-                        'resumen': resumen,
-                        'entidades': entidades,
-                        'temas': [{'palabra': palabra, 'relevancia': relevancia} for palabra, relevancia in temas]
-                    }
-                    
-                    documentos.append(documento)
-                
-                except Exception as e:
-                    print(f"Error al procesar {archivo.get('nombre')}: {e}")
-                    continue
-        
+                            try:
+                                with open(ruta, 'r', encoding='latin-1') as f:
+                                    texto = f.read()
+                            except:
+                                pass
+
+                    if not texto or len(texto.strip()) < 50:
+                        continue
+
+                    try:
+                        # Crear documento (resumen, entidades y temas los agrega el enriquecimiento)
+                        documento = {
+                            'texto': texto,
+                            'fecha': datetime.now().isoformat(),
+                            'ruta': ruta,
+                            'nombre_archivo': archivo.get('nombre', ''),
+                            'enriquecimiento': 'pendiente'
+                        }
+
+                        documentos.append(documento)
+                        ids.append(uuid.uuid4().hex)
+
+                    except Exception as e:
+                        print(f"Error al procesar {archivo.get('nombre')}: {e}")
+                        continue
+
         if not documentos:
             return jsonify({'success': False, 'error': 'No se pudieron procesar documentos'}), 400
         
         # Indexar documentos en Elastic
-        resultado = elastic.indexar_bulk(index, documentos)
+        preparar_indice(index)
+        resultado = elastic.indexar_bulk(index, documentos, ids=ids)
         
-        return jsonify({
+        respuesta = {
             'success': resultado.get('success', True),
             'indexados': resultado.get('indexados', 0),
             'errores': resultado.get('fallidos', 0)
-        })
+        }
+        
+        # Encolar el enriquecimiento PLN sin bloquear la respuesta HTTP
+        if ids and resultado.get('success'):
+            enriquecedor = obtener_enriquecedor()
+            trabajo_id = enriquecedor.crear_trabajo(len(ids))
+            enriquecedor.encolar_en_segundo_plano(trabajo_id, index, [
+                {'doc_id': doc_id, 'texto': doc['texto']} for doc_id, doc in zip(ids, documentos)
+            ])
+            respuesta['trabajo_enriquecimiento'] = trabajo_id
+        
+        return jsonify(respuesta)
+        
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/cargas-elastic', methods=['POST'])
+def iniciar_carga_elastic():
+    """API para iniciar una carga por partes (reanudable) de un ZIP grande"""
+    try:
+        if not session.get('logged_in'):
+            return jsonify({'success': False, 'error': 'No autorizado'}), 401
+        
+        permisos = session.get('permisos', {})
+        if not permisos.get('admin_data_elastic'):
+            return jsonify({'success': False, 'error': 'No tiene permisos para cargar datos'}), 403
+        
+        data = request.get_json() or {}
+        nombre = secure_filename(data.get('nombre') or '')
+        tamano = int(data.get('tamano') or 0)
+        index = data.get('index')
+        
+        if not nombre or tamano <= 0 or not index:
+            return jsonify({'success': False, 'error': 'Nombre, tamaño e índice son requeridos'}), 400
+        
+        carga = obtener_gestor_cargas().iniciar(nombre, tamano, sha256=data.get('sha256'),
+                                                datos={'index': index})
+        return jsonify({'success': True, 'carga': carga})
+    
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/cargas-elastic/<carga_id>', methods=['GET', 'PUT', 'DELETE'])
+def carga_elastic(carga_id):
+    """
+    API de una carga por partes:
+    - GET: estado (offset para reanudar, resultado de la ingesta)
+    - PUT ?offset=N: agrega una parte (cuerpo binario; header opcional X-Chunk-SHA256)
+    - DELETE: cancela la carga
+    """
+    try:
+        if not session.get('logged_in'):
+            return jsonify({'success': False, 'error': 'No autorizado'}), 401
+        
+        permisos = session.get('permisos', {})
+        if not permisos.get('admin_data_elastic'):
+            return jsonify({'success': False, 'error': 'No tiene permisos para cargar datos'}), 403
+        
+        gestor = obtener_gestor_cargas()
+        
+        if request.method == 'DELETE':
+            if not gestor.cancelar(carga_id):
+                return jsonify({'success': False, 'error': 'Carga no encontrada'}), 404
+            return jsonify({'success': True})
+        
+        if request.method == 'PUT':
+            offset = request.args.get('offset', type=int)
+            if offset is None:
+                return jsonify({'success': False, 'error': 'Offset requerido'}), 400
+            
+            # El cuerpo se lee por bloques desde el stream (sin parsear formularios)
+            resultado = gestor.escribir_parte(carga_id, offset, request.stream,
+                                              request.headers.get('X-Chunk-SHA256'))
+            if resultado.get('success'):
+                return jsonify(resultado)
+            if resultado.get('error') == 'Carga no encontrada':
+                return jsonify(resultado), 404
+            return jsonify(resultado), 409
+        
+        carga = gestor.estado(carga_id)
+        if carga is None:
+            return jsonify({'success': False, 'error': 'Carga no encontrada'}), 404
+        return jsonify({'success': True, 'carga': carga})
+    
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+@app.route('/estado-enriquecimiento/<trabajo_id>')
+def estado_enriquecimiento(trabajo_id):
+    """API para consultar el avance del enriquecimiento PLN de una carga"""
+    try:
+        if not session.get('logged_in'):
+            return jsonify({'success': False, 'error': 'No autorizado'}), 401
         
+        permisos = session.get('permisos', {})
+        if not permisos.get('admin_data_elastic'):
+            return jsonify({'success': False, 'error': 'No tiene permisos para cargar datos'}), 403
+        
+        estado = obtener_enriquecedor().estado(trabajo_id)
+        if estado is None:
+            return jsonify({'success': False, 'error': 'Trabajo no encontrado'}), 404
+        
+        return jsonify({'success': True, 'estado': estado})
+    
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -1,9 +1,78 @@
 import os
-from Helpers.elastic import indexar_json_anla, ELASTIC_INDEX_DEFAULT
+import argparse
+from Helpers.elastic import (elastic, indexar_json_anla, indexar_pasajes_anla, reasignar_temas_anla,
+                             asegurar_grupo_duplicados, ELASTIC_INDEX_DEFAULT, ELASTIC_INDEX_PASAJES)
+from Helpers.resumen import MotorResumen
+from Helpers.temas import AgrupadorTemas
+from Helpers import Funciones
+from Helpers.corpusEmpaquetado import CorpusEmpaquetado
+from Helpers.metadatosParquet import AlmacenMetadatos, pa
+from Helpers.servidorPLN import obtener_pln
+
+# Motor de resumen ajustado una sola vez sobre todo el corpus
+RUTA_MOTOR_RESUMEN = os.path.join("Data", "modelos", "motor_resumen.pkl")
+
+# Temas del corpus; app.py carga el mismo archivo para los documentos nuevos
+# (y lo vuelve a cargar cuando se reentrena con --reentrenar-temas)
+RUTA_AGRUPADOR_TEMAS = os.getenv("RUTA_AGRUPADOR_TEMAS", os.path.join("Data", "modelos", "agrupador_temas.pkl"))
+
+
+def obtener_motor_resumen(json_dir: str) -> MotorResumen:
+    """Carga el motor de resumen guardado o lo entrena sobre el corpus y lo guarda"""
+    motor = MotorResumen.cargar(RUTA_MOTOR_RESUMEN)
+    if motor is not None:
+        print("Motor de resumen cargado desde:", RUTA_MOTOR_RESUMEN)
+        return motor
+
+    print("Entrenando motor de resumen sobre el corpus...")
+    textos = (
+        doc.get("texto_completo") or ""
+        for _, doc in Funciones.iterar_documentos_json(json_dir)
+    )
+    motor = MotorResumen().entrenar(textos)
+    motor.guardar(RUTA_MOTOR_RESUMEN)
+    return motor
+
+
+def obtener_agrupador_temas(json_dir: str, motor_resumen: MotorResumen,
+                            reentrenar: bool = False) -> AgrupadorTemas:
+    """Carga el agrupador de temas guardado o lo entrena en streaming sobre el corpus"""
+    agrupador = None if reentrenar else AgrupadorTemas.cargar(RUTA_AGRUPADOR_TEMAS)
+    if agrupador is not None:
+        print("Agrupador de temas cargado desde:", RUTA_AGRUPADOR_TEMAS)
+        return agrupador
+
+    print("Entrenando temas del corpus (k-means por mini-lotes)...")
+    textos = (
+        doc.get("texto_completo") or ""
+        for _, doc in Funciones.iterar_documentos_json(json_dir)
+    )
+    agrupador = AgrupadorTemas(motor_resumen).entrenar(textos)
+    agrupador.guardar(RUTA_AGRUPADOR_TEMAS)
+    for tema, etiqueta in sorted(agrupador.etiquetas.items()):
+        print(f"  Tema {tema}: {etiqueta}")
+    return agrupador
+
 
 if __name__ == "__main__":
-    # Carpeta donde están tus JSON ANLA (ruta relativa a este archivo)
+    parser = argparse.ArgumentParser(description="Indexa el corpus ANLA en Elasticsearch")
+    parser.add_argument("--reentrenar-temas", action="store_true",
+                        help="Reentrena los temas del corpus y los reasigna a todos los documentos")
+    parser.add_argument("--completar-grupos-duplicados", action="store_true",
+                        help="Instala el pipeline de grupo_duplicados en el índice existente y lo "
+                             "asigna a los documentos que no lo tienen (update_by_query en el clúster)")
+    argumentos = parser.parse_args()
+
+    if argumentos.completar_grupos_duplicados:
+        print("Pipeline grupo_duplicados:",
+              asegurar_grupo_duplicados(ELASTIC_INDEX_DEFAULT, completar_existentes=True))
+
+    # Carpeta donde están tus JSON ANLA (ruta relativa a este archivo).
+    # Si existe el corpus empaquetado (python -m Helpers.corpusEmpaquetado
+    # empaquetar Data/ANLA_json Data/ANLA_paquete) se lee de ahí
     json_dir = os.path.join("Data", "ANLA_json")
+    if CorpusEmpaquetado.es_paquete(os.path.join("Data", "ANLA_paquete")):
+        json_dir = os.path.join("Data", "ANLA_paquete")
 
     print("Usando carpeta:", os.path.abspath(json_dir))
     print("Índice destino:", ELASTIC_INDEX_DEFAULT)
@@ -11,6 +80,37 @@ if __name__ == "__main__":
     if not os.path.isdir(json_dir):
         print("❌ La carpeta de JSON no existe. Revisa la ruta:", json_dir)
     else:
-        resultado = indexar_json_anla(json_dir, ELASTIC_INDEX_DEFAULT)
+        motor_resumen = obtener_motor_resumen(json_dir)
+        agrupador_temas = obtener_agrupador_temas(json_dir, motor_resumen,
+                                                  reentrenar=argumentos.reentrenar_temas)
+
+        # Modelos para el embedding (campo dense_vector de la búsqueda semántica)
+        pln = obtener_pln()
+
+        resultado = indexar_json_anla(json_dir, ELASTIC_INDEX_DEFAULT,
+                                      motor_resumen=motor_resumen, pln=pln,
+                                      agrupador_temas=agrupador_temas)
         print("Resultado indexación:")
-        print(resultado)
\ No newline at end of file
+        print({k: v for k, v in resultado.items() if k not in ("grupos_duplicados", "temas")})
+
+        if argumentos.reentrenar_temas:
+            # Los documentos cargados desde la app quedan con los centroides nuevos
+            print("Temas de documentos cargados desde la app:")
+            print(reasignar_temas_anla(agrupador_temas, ELASTIC_INDEX_DEFAULT))
+
+        # Pasajes de página/párrafo para la búsqueda de "página exacta"
+        print("Índice de pasajes:", ELASTIC_INDEX_PASAJES)
+        resultado_pasajes = indexar_pasajes_anla(
+            json_dir, ELASTIC_INDEX_PASAJES,
+            grupos_duplicados=resultado.get("grupos_duplicados"),
+            temas=resultado.get("temas")
+        )
+        print("Resultado indexación de pasajes:")
+        print(resultado_pasajes)
+
+        # Metadatos en Parquet para conteos por empresa/año/infracción. Se leen
+        # del índice para incluir grupo_duplicados y los temas calculados arriba
+        if pa is not None:
+            elastic.client.indices.refresh(index=ELASTIC_INDEX_DEFAULT)
+            print("Metadatos columnares:", os.path.abspath(AlmacenMetadatos().ruta))
+            print(AlmacenMetadatos().construir_desde_elastic(index_name=ELASTIC_INDEX_DEFAULT))
@@ -0,0 +1,28 @@
+# Configuración de gunicorn: gunicorn -c gunicorn.conf.py app:app
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('GUNICORN_WORKERS', '2'))
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '300'))
+
+# Proceso del servidor PLN compartido por los workers (si se definió PLN_SOCKET)
+_servidor_pln = None
+
+
+def on_starting(server):
+    """Carga los modelos una sola vez, antes de crear los workers"""
+    global _servidor_pln
+    if not os.getenv('PLN_SOCKET'):
+        return
+    from Helpers.servidorPLN import iniciar_en_segundo_plano
+    _servidor_pln = iniciar_en_segundo_plano()
+    if _servidor_pln is None:
+        server.log.warning("Servidor PLN no disponible: cada worker cargará sus modelos")
+
+
+def on_exit(server):
+    """Detiene el servidor PLN al apagar gunicorn"""
+    if _servidor_pln is not None and _servidor_pln.is_alive():
+        _servidor_pln.terminate()
+        _servidor_pln.join(timeout=10)
@@ -0,0 +1,74 @@
+import os
+import tempfile
+
+import pytest
+from PyPDF2 import PdfWriter
+
+from Helpers import cacheExtraccion
+from Helpers import funciones
+from Helpers.cacheExtraccion import CacheExtraccion
+from Helpers.funciones import Funciones
+
+
+def _pdf(ruta, paginas=3):
+    escritor = PdfWriter()
+    for _ in range(paginas):
+        escritor.add_blank_page(200, 200)
+    with open(ruta, 'wb') as f:
+        escritor.write(f)
+    return ruta
+
+
+def test_entrada_por_contenido(tmp_path=None):
+    carpeta = str(tmp_path) if tmp_path else tempfile.mkdtemp()
+    cache = CacheExtraccion(os.path.join(carpeta, 'cache'))
+
+    # El mismo contenido con otro nombre tiene la misma clave
+    uno = os.path.join(carpeta, 'uno.pdf')
+    dos = os.path.join(carpeta, 'dos.pdf')
+    for ruta in (uno, dos):
+        with open(ruta, 'wb') as f:
+            f.write(b'%PDF-1.4 mismo contenido')
+    sha = CacheExtraccion.sha256_archivo(uno)
+    assert CacheExtraccion.sha256_archivo(dos) == sha
+
+    assert cache.obtener(sha) is None
+    assert cache.guardar(sha, {'sha256': sha, 'paginas_texto': ['á', 'b']})
+    assert cache.obtener(sha)['paginas_texto'] == ['á', 'b']
+    assert os.listdir(os.path.join(carpeta, 'cache', sha[:2])) == [f"{sha}.json.gz"]
+
+    # Una entrada dañada se trata como ausente
+    with open(cache._ruta(sha), 'wb') as f:
+        f.write(b'no es gzip')
+    assert cache.obtener(sha) is None
+
+
+def test_extraccion_reutiliza_la_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(cacheExtraccion, 'CACHE_EXTRACCION_DIR', str(tmp_path / 'cache'))
+    ruta = _pdf(str(tmp_path / 'resolucion.pdf'))
+
+    paginas = list(Funciones.iterar_paginas_pdf(ruta, backend='pypdf2', n_procesos=1))
+    assert [numero for numero, _ in paginas] == [1, 2, 3]
+
+    entrada = CacheExtraccion().obtener(CacheExtraccion.sha256_archivo(ruta))
+    assert entrada['num_paginas'] == 3
+    assert entrada['backend'] == 'pypdf2'
+    assert 'texto' in entrada['tiempos']
+
+    # La segunda extracción no vuelve a leer el PDF
+    def _no_extraer(*args, **kwargs):
+        raise AssertionError("se volvió a extraer un PDF con entrada en caché")
+    monkeypatch.setattr(funciones, '_iterar_paginas_texto', _no_extraer)
+    assert list(Funciones.iterar_paginas_pdf(ruta, backend='pypdf2', n_procesos=1)) == paginas
+
+    # Sin caché se extrae siempre
+    with pytest.raises(AssertionError):
+        list(Funciones.iterar_paginas_pdf(ruta, backend='pypdf2', n_procesos=1, usar_cache=False))
+
+
+if __name__ == '__main__':
+    import pathlib
+    test_entrada_por_contenido()
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_extraccion_reutiliza_la_cache(monkeypatch, pathlib.Path(tempfile.mkdtemp()))
+    print("OK")
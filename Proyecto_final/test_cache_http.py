@@ -0,0 +1,122 @@
+import tempfile
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from Helpers.cacheHTTP import CacheHTTP
+
+ETAG = '"pagina-v1"'
+
+
+class Manejador(BaseHTTPRequestHandler):
+    """Servidor local: /pagina con ETag, /redireccion -> /pagina y /privada con no-store"""
+
+    peticiones = []
+
+    def do_GET(self):
+        Manejador.peticiones.append((self.path, self.headers.get('If-None-Match')))
+        if self.path == '/redireccion':
+            self.send_response(301)
+            self.send_header('Location', '/pagina')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if self.path == '/pagina' and self.headers.get('If-None-Match') == ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+        cuerpo = f"<html>{self.path} ñ</html>".encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(cuerpo)))
+        if self.path == '/pagina':
+            self.send_header('ETag', ETAG)
+        if self.path == '/privada':
+            self.send_header('Cache-Control', 'no-store')
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+@contextmanager
+def _servidor_local():
+    Manejador.peticiones = []
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Manejador)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    try:
+        yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+@pytest.fixture
+def servidor():
+    with _servidor_local() as url:
+        yield url
+
+
+def _sesion(directorio, **kwargs):
+    sesion = requests.Session()
+    cache = CacheHTTP(directorio, **kwargs)
+    sesion.mount('http://', cache)
+    return sesion, cache
+
+
+def test_revalida_con_etag(servidor, tmp_path):
+    sesion, cache = _sesion(str(tmp_path))
+
+    primera = sesion.get(servidor + '/pagina')
+    segunda = sesion.get(servidor + '/pagina')
+
+    assert primera.text == segunda.text == "<html>/pagina ñ</html>"
+    assert getattr(segunda, 'from_cache', False)
+    assert Manejador.peticiones == [('/pagina', None), ('/pagina', ETAG)]
+    assert cache.estadisticas == {'aciertos': 0, 'revalidadas': 1, 'fallos': 1}
+
+
+def test_max_edad_sirve_sin_revalidar(servidor, tmp_path):
+    sesion, cache = _sesion(str(tmp_path), max_edad=3600)
+
+    sesion.get(servidor + '/pagina')
+    assert cache.sirve_sin_red(servidor + '/pagina')
+    assert sesion.get(servidor + '/pagina').text == "<html>/pagina ñ</html>"
+    assert len(Manejador.peticiones) == 1
+
+    # no-store no se guarda
+    sesion.get(servidor + '/privada')
+    sesion.get(servidor + '/privada')
+    assert [p for p, _ in Manejador.peticiones].count('/privada') == 2
+
+
+def test_offline_repite_el_rastreo_con_redirecciones(servidor, tmp_path):
+    sesion, _ = _sesion(str(tmp_path))
+    assert sesion.get(servidor + '/redireccion').url == servidor + '/pagina'
+    peticiones = len(Manejador.peticiones)
+
+    sesion_offline, cache = _sesion(str(tmp_path), offline=True)
+    respuesta = sesion_offline.get(servidor + '/redireccion')
+
+    assert respuesta.url == servidor + '/pagina'
+    assert respuesta.text == "<html>/pagina ñ</html>"
+    assert len(Manejador.peticiones) == peticiones
+    assert cache.estadisticas['aciertos'] == 2
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        sesion_offline.get(servidor + '/no_guardada')
+    with pytest.raises(requests.exceptions.ConnectionError):
+        sesion_offline.get(servidor + '/pagina', stream=True)
+
+
+if __name__ == '__main__':
+    import pathlib
+    for prueba in (test_revalida_con_etag, test_max_edad_sirve_sin_revalidar,
+                   test_offline_repite_el_rastreo_con_redirecciones):
+        with _servidor_local() as url:
+            prueba(url, pathlib.Path(tempfile.mkdtemp()))
+    print("OK")
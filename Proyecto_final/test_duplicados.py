@@ -0,0 +1,46 @@
+from Helpers.duplicados import DetectorDuplicados
+
+TEXTO = ("Por la cual se resuelve el recurso de reposición interpuesto por la empresa "
+         "contra la resolución que impuso una medida preventiva en el bloque petrolero "
+         "del departamento del Meta, por vertimientos sin permiso en el caño")
+
+
+def test_casi_duplicados_mismo_grupo():
+    detector = DetectorDuplicados()
+    detector.agregar('2', TEXTO)
+    duplicados = detector.agregar('1', TEXTO + " Notifíquese.")
+    detector.agregar('3', "Resolución sobre licencia ambiental de un proyecto vial en Antioquia, "
+                          "con obligaciones de compensación forestal y seguimiento semestral")
+    assert duplicados == ['2']
+    assert detector.grupos() == {'1': '1', '2': '1', '3': '3'}
+    assert detector.clusters() == [['1', '2']]
+
+
+def test_textos_sin_palabras_tienen_grupo_propio():
+    detector = DetectorDuplicados()
+    assert detector.agregar('a', '') == []
+    assert detector.agregar('b', '   ') == []
+    assert detector.agregar('c', None) == []
+    assert detector.agregar('d', '... ¡¿!?') == []
+    assert detector.grupos() == {'a': 'a', 'b': 'b', 'c': 'c', 'd': 'd'}
+    assert detector.similitud_estimada('a', 'b') == 0.0
+    assert detector.candidatos(detector.firma('')) == []
+
+
+def test_agregar_de_nuevo_no_repite_cubetas():
+    detector = DetectorDuplicados()
+    detector.agregar('1', TEXTO)
+    detector.agregar('1', TEXTO)
+    entradas = sum(len(ids) for cubetas in detector._cubetas for ids in cubetas.values())
+    assert entradas == detector.bandas
+
+    # Si el texto del documento queda vacío sale de las cubetas
+    detector.agregar('1', '')
+    assert detector.candidatos(detector.firma(TEXTO)) == []
+
+
+if __name__ == '__main__':
+    test_casi_duplicados_mismo_grupo()
+    test_textos_sin_palabras_tienen_grupo_propio()
+    test_agregar_de_nuevo_no_repite_cubetas()
+    print("OK")
@@ -0,0 +1,50 @@
+import os
+import tempfile
+
+from Helpers.fronteraRastreo import FronteraRastreo, canonicalizar_url
+
+
+def test_canonicalizar_url():
+    assert (canonicalizar_url("HTTPS://Www.ANLA.gov.co:443/Gaceta/Ver%2fdoc?b=2&a=1#inicio")
+            == "https://www.anla.gov.co/Gaceta/Ver%2Fdoc?a=1&b=2")
+    # Puerto no estándar, ruta vacía y parámetros vacíos se conservan
+    assert canonicalizar_url("http://host:8080?x=&a=1") == "http://host:8080/?a=1&x="
+    # La ruta distingue mayúsculas
+    assert canonicalizar_url("https://anla.gov.co/A") != canonicalizar_url("https://anla.gov.co/a")
+
+
+def test_frontera_sin_duplicados_y_en_orden():
+    frontera = FronteraRastreo(["https://anla.gov.co/"])
+
+    assert frontera.agregar("https://anla.gov.co/b?y=1&x=2")
+    assert not frontera.agregar("https://ANLA.gov.co/b?x=2&y=1#fragmento")
+    assert not frontera.agregar("https://anla.gov.co:443/")
+    assert frontera.marcar_vista("https://anla.gov.co/doc.pdf")
+    assert not frontera.agregar("https://anla.gov.co/doc.pdf")
+    assert "https://anla.gov.co/doc.pdf" in frontera
+
+    assert len(frontera) == 2
+    assert frontera.siguiente() == "https://anla.gov.co/"
+    assert frontera.siguiente() == "https://anla.gov.co/b?y=1&x=2"
+    assert frontera.siguiente() is None
+
+
+def test_guardar_y_reanudar(tmp_path=None):
+    ruta = os.path.join(str(tmp_path) if tmp_path else tempfile.mkdtemp(), 'frontera.json')
+    frontera = FronteraRastreo(["https://anla.gov.co/1", "https://anla.gov.co/2"])
+    en_curso = frontera.siguiente()
+    assert frontera.guardar(ruta, en_curso=[en_curso])
+
+    reanudada = FronteraRastreo.cargar(ruta)
+    # La URL que se estaba visitando vuelve al inicio de la cola
+    assert reanudada.siguiente() == "https://anla.gov.co/1"
+    assert reanudada.siguiente() == "https://anla.gov.co/2"
+    assert not reanudada.agregar("https://anla.gov.co/1")
+    assert FronteraRastreo.cargar(ruta + '.no_existe') is None
+
+
+if __name__ == '__main__':
+    test_canonicalizar_url()
+    test_frontera_sin_duplicados_y_en_orden()
+    test_guardar_y_reanudar()
+    print("OK")
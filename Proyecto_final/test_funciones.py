@@ -0,0 +1,77 @@
+from Helpers.funciones import Funciones
+
+
+def _unir(fragmentos):
+    return ''.join(fragmento for _, fragmento in fragmentos)
+
+
+def test_fragmentos_son_subcadenas_con_offset():
+    texto = ("Primera página.\n\nSegundo párrafo de la primera página.\f"
+             "Segunda página con una línea\ny otra línea bastante más larga que la anterior.\f"
+             "Tercera página " + "palabra " * 30)
+
+    fragmentos = Funciones.dividir_en_fragmentos(texto, max_caracteres=60)
+
+    assert _unir(fragmentos) == texto
+    for inicio, fragmento in fragmentos:
+        assert 0 < len(fragmento) <= 60
+        assert texto[inicio:inicio + len(fragmento)] == fragmento
+
+
+def test_fragmentos_cortan_primero_en_saltos_de_pagina():
+    paginas = ["a" * 40, "b" * 40, "c" * 40]
+    texto = "\f".join(paginas)
+
+    fragmentos = Funciones.dividir_en_fragmentos(texto, max_caracteres=50)
+
+    # Cada página cabe: el corte es en \f, que queda al final del fragmento anterior
+    assert [f for _, f in fragmentos] == ["a" * 40 + "\f", "b" * 40 + "\f", "c" * 40]
+
+
+def test_fragmentos_sin_separadores_y_texto_vacio():
+    texto = "x" * 25
+    fragmentos = Funciones.dividir_en_fragmentos(texto, max_caracteres=10)
+    assert fragmentos == [(0, "x" * 10), (10, "x" * 10), (20, "x" * 5)]
+
+    assert Funciones.dividir_en_fragmentos("", 10) == []
+    assert Funciones.dividir_en_fragmentos("corto", 10) == [(0, "corto")]
+
+
+def _resolucion(total, encabezados):
+    paginas = [f"Contenido de la página {n} de la resolución." for n in range(1, total + 1)]
+    return "\n".join(
+        (f"Hoja No. {n} de {total}\n" if n in encabezados else "") + pagina
+        for n, pagina in enumerate(paginas, 1)
+    )
+
+
+def test_marcar_saltos_pagina_por_encabezados():
+    texto = _resolucion(4, {2, 3, 4})
+    marcado = Funciones.marcar_saltos_pagina(texto)
+
+    # El \f reemplaza al \n previo al encabezado: misma longitud, mismos offsets
+    assert len(marcado) == len(texto)
+    assert marcado.count("\f") == 3
+    assert marcado.split("\f")[1].startswith("Hoja No. 2 de 4")
+
+
+def test_marcar_saltos_pagina_sin_encabezados_suficientes():
+    # Solo la hoja 2 de 6: no se reconoce la mitad de las páginas
+    texto = _resolucion(6, {2})
+    assert Funciones.marcar_saltos_pagina(texto) == texto
+
+    # Encabezados fuera de orden o de otro total no cuentan
+    texto = _resolucion(3, {2, 3}).replace("Hoja No. 2 de 3", "Hoja No. 2 de 9")
+    assert "\f" not in Funciones.marcar_saltos_pagina(texto)
+
+    # Un texto que ya trae \f no se toca
+    assert Funciones.marcar_saltos_pagina("a\fHoja No. 2 de 2") == "a\fHoja No. 2 de 2"
+
+
+if __name__ == '__main__':
+    test_fragmentos_son_subcadenas_con_offset()
+    test_fragmentos_cortan_primero_en_saltos_de_pagina()
+    test_fragmentos_sin_separadores_y_texto_vacio()
+    test_marcar_saltos_pagina_por_encabezados()
+    test_marcar_saltos_pagina_sin_encabezados_suficientes()
+    print("OK")
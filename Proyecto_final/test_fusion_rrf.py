@@ -0,0 +1,34 @@
+import pytest
+
+from Helpers.elastic import fusionar_rrf
+
+
+def _hits(*ids):
+    return [{"_id": doc_id, "_score": 10.0 - i, "_source": {"pdf_id": doc_id}}
+            for i, doc_id in enumerate(ids)]
+
+
+def test_rrf_premia_documentos_en_ambas_listas():
+    bm25 = _hits("a", "b", "c")
+    knn = _hits("c", "a", "d")
+
+    fusionados = fusionar_rrf([bm25, knn], k_rrf=60)
+
+    assert [h["_id"] for h in fusionados] == ["a", "c", "b", "d"]
+    assert fusionados[0]["_score"] == pytest.approx(1 / 61 + 1 / 62)
+    assert fusionados[2]["_score"] == pytest.approx(1 / 62)
+
+
+def test_rrf_no_modifica_los_hits_originales():
+    bm25 = _hits("a")
+    fusionados = fusionar_rrf([bm25, []])
+
+    assert fusionados[0]["_source"] == {"pdf_id": "a"}
+    assert bm25[0]["_score"] == 10.0
+    assert fusionar_rrf([]) == []
+
+
+if __name__ == '__main__':
+    test_rrf_premia_documentos_en_ambas_listas()
+    test_rrf_no_modifica_los_hits_originales()
+    print("OK")
@@ -0,0 +1,65 @@
+import os
+import json
+import tempfile
+
+from Helpers.gacetaANLA import GacetaANLA
+
+TARJETAS_POR_PAGINA = 10
+
+
+class GacetaFalsa(GacetaANLA):
+    """Gaceta en memoria: lo más reciente primero, TARJETAS_POR_PAGINA por página"""
+
+    def __init__(self, pdf_ids):
+        super().__init__(concurrencia=2, filtro=None)
+        self.pdf_ids = list(pdf_ids)
+
+    def publicar(self, pdf_ids):
+        self.pdf_ids = list(pdf_ids) + self.pdf_ids
+
+    def obtener_tarjetas(self, pagina):
+        inicio = (pagina - 1) * TARJETAS_POR_PAGINA
+        return [{
+            "titulo": f"Resolución {pdf_id}", "fecha_publicacion": None, "proyecto": None,
+            "ubicacion": None, "descripcion": None, "pdf_id": pdf_id,
+            "pdf_url": f"https://gaceta/descargar?q={pdf_id}", "texto_busqueda": ""
+        } for pdf_id in self.pdf_ids[inicio:inicio + TARJETAS_POR_PAGINA]]
+
+
+def test_ejecucion_cortada_y_luego_incremental(tmp_path=None):
+    """Una ejecución cortada por max_docs no deja resoluciones antiguas inalcanzables"""
+    carpeta = str(tmp_path) if tmp_path else tempfile.mkdtemp()
+    ruta = os.path.join(carpeta, 'ANLA_enlaces.json')
+    gaceta = GacetaFalsa(str(i) for i in range(100, 75, -1))
+
+    # 1. Ejecución cortada: solo las 12 más recientes, el cursor queda pendiente
+    resultado = gaceta.actualizar_catalogo(ruta, max_docs=12)
+    assert resultado['nuevas'] == 12
+    assert not resultado['completo']
+    assert not GacetaANLA.cargar_estado(ruta)['completo']
+
+    # 2. Se publican resoluciones nuevas (las páginas se corren) y la siguiente
+    #    ejecución, sin límite, llega hasta las más antiguas
+    gaceta.publicar(['103', '102', '101'])
+    resultado = gaceta.actualizar_catalogo(ruta)
+    assert resultado['completo']
+    catalogo = GacetaANLA.cargar_catalogo(ruta)
+    assert {d['pdf_id'] for d in catalogo} == {str(i) for i in range(76, 104)}
+    assert len(catalogo) == 28
+
+    # 3. Con el catálogo completo vuelve la parada en conocidos: solo se recorre el principio
+    gaceta.publicar(['105', '104'])
+    resultado = gaceta.actualizar_catalogo(ruta)
+    assert resultado['nuevas'] == 2
+    assert resultado['completo']
+    assert resultado['paginas'] == 2
+    assert [d['pdf_id'] for d in GacetaANLA.cargar_catalogo(ruta)][:3] == ['105', '104', '103']
+
+    with open(GacetaANLA.ruta_estado(ruta), 'r', encoding='utf-8') as f:
+        assert json.load(f) == {'completo': True, 'pagina': 1}
+    gaceta.close()
+
+
+if __name__ == '__main__':
+    test_ejecucion_cortada_y_luego_incremental()
+    print("OK")
@@ -0,0 +1,107 @@
+import io
+import os
+import time
+import hashlib
+import tempfile
+
+from Helpers.gestorCargas import GestorCargas
+
+DATOS = bytes(range(256)) * 40
+
+
+def _esperar(gestor, carga_id, estados=('completada', 'error'), espera=5.0):
+    limite = time.monotonic() + espera
+    while time.monotonic() < limite:
+        carga = gestor.estado(carga_id)
+        if carga['estado'] in estados:
+            return carga
+        time.sleep(0.02)
+    return gestor.estado(carga_id)
+
+
+def test_partes_en_orden_y_reanudacion(tmp_path=None):
+    carpeta = str(tmp_path) if tmp_path else tempfile.mkdtemp()
+    recibidos = {}
+
+    def al_completar(carga, ruta):
+        with open(ruta, 'rb') as f:
+            recibidos['contenido'] = f.read()
+        return {'success': True}
+
+    gestor = GestorCargas(carpeta, al_completar=al_completar, tam_parte_max=4096, tam_bloque=1000)
+    carga_id = gestor.iniciar('a.zip', len(DATOS), sha256=hashlib.sha256(DATOS).hexdigest())['carga_id']
+
+    assert gestor.escribir_parte(carga_id, 0, io.BytesIO(DATOS[:4096]))['carga']['offset'] == 4096
+
+    # Parte repetida u offset adelantado: se indica desde dónde continuar
+    assert gestor.escribir_parte(carga_id, 0, io.BytesIO(DATOS[:4096]))['offset'] == 4096
+    assert gestor.escribir_parte(carga_id, 8192, io.BytesIO(DATOS[8192:]))['offset'] == 4096
+
+    # Parte demasiado grande o con checksum incorrecto: se descarta sin tocar el archivo
+    assert not gestor.escribir_parte(carga_id, 4096, io.BytesIO(DATOS[4096:8193]))['success']
+    respuesta = gestor.escribir_parte(carga_id, 4096, io.BytesIO(DATOS[4096:8192]), sha256_parte='00')
+    assert respuesta['offset'] == 4096
+
+    # Otro proceso (gestor nuevo, sin hash en memoria) continúa la carga
+    gestor = GestorCargas(carpeta, al_completar=al_completar, tam_parte_max=4096, tam_bloque=1000)
+    parte = DATOS[4096:8192]
+    assert gestor.escribir_parte(carga_id, 4096, io.BytesIO(parte),
+                                 sha256_parte=hashlib.sha256(parte).hexdigest())['success']
+    assert gestor.escribir_parte(carga_id, 8192, io.BytesIO(DATOS[8192:]))['success']
+
+    carga = _esperar(gestor, carga_id)
+    assert carga['estado'] == 'completada'
+    assert carga['sha256'] == hashlib.sha256(DATOS).hexdigest()
+    assert recibidos['contenido'] == DATOS
+    assert not os.path.exists(os.path.join(carpeta, f"{carga_id}.part"))
+    assert not os.path.exists(os.path.join(carpeta, f"{carga_id}.proceso"))
+
+
+def test_checksum_final_incorrecto(tmp_path=None):
+    carpeta = str(tmp_path) if tmp_path else tempfile.mkdtemp()
+    gestor = GestorCargas(carpeta, al_completar=lambda carga, ruta: {'success': True})
+    carga_id = gestor.iniciar('a.zip', 100, sha256='0' * 64)['carga_id']
+
+    resultado = gestor.escribir_parte(carga_id, 0, io.BytesIO(DATOS[:100]))
+    assert resultado['carga']['estado'] == 'error_checksum'
+    assert not os.path.exists(os.path.join(carpeta, f"{carga_id}.part"))
+
+
+def test_carga_cancelada_antes_de_procesar(tmp_path=None):
+    carpeta = str(tmp_path) if tmp_path else tempfile.mkdtemp()
+    llamadas = []
+    gestor = GestorCargas(carpeta, al_completar=lambda carga, ruta: llamadas.append(ruta))
+    carga_id = gestor.iniciar('a.zip', 10)['carga_id']
+    gestor.cancelar(carga_id)
+
+    # Sin estado, el procesamiento no falla ni vuelve a crear la carga
+    gestor._procesar(carga_id)
+    assert llamadas == []
+    assert gestor.estado(carga_id) is None
+
+
+def test_no_expira_cargas_en_proceso(tmp_path=None):
+    carpeta = str(tmp_path) if tmp_path else tempfile.mkdtemp()
+    dentro = []
+
+    def al_completar(carga, ruta):
+        # Otro gestor (otro worker) intenta expirar la carga mientras se procesa
+        otro = GestorCargas(carpeta, max_edad_inactiva=0)
+        otro._expirar_cargas()
+        dentro.append(otro.estado(carga['carga_id']) is not None)
+        return {'success': True}
+
+    gestor = GestorCargas(carpeta, al_completar=al_completar)
+    carga_id = gestor.iniciar('a.zip', 10)['carga_id']
+    gestor.escribir_parte(carga_id, 0, io.BytesIO(DATOS[:10]))
+
+    assert _esperar(gestor, carga_id)['estado'] == 'completada'
+    assert dentro == [True]
+
+
+if __name__ == '__main__':
+    test_partes_en_orden_y_reanudacion()
+    test_checksum_final_incorrecto()
+    test_carga_cancelada_antes_de_procesar()
+    test_no_expira_cargas_en_proceso()
+    print("OK")
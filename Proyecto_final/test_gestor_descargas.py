@@ -0,0 +1,139 @@
+import io
+import os
+import tempfile
+
+import requests
+
+from Helpers.gestorDescargas import GestorDescargas, SUFIJO_PARCIAL
+
+CONTENIDO = b"%PDF-1.4 " + bytes(range(256)) * 8
+ETAG = '"v1"'
+
+
+class CuerpoCortado(io.BytesIO):
+    """Cuerpo que corta la conexión después de limite bytes"""
+
+    def __init__(self, datos, limite):
+        super().__init__(datos)
+        self.limite = limite
+
+    def read(self, n=-1):
+        if self.tell() >= self.limite:
+            raise requests.exceptions.ConnectionError("conexión cortada")
+        restante = self.limite - self.tell()
+        return super().read(restante if n is None or n < 0 else min(n, restante))
+
+
+class ServidorFalso:
+    """Servidor HTTP en memoria con ETag, Range e If-Range (se pasa como obtener)"""
+
+    def __init__(self, contenido=CONTENIDO, etag=ETAG, cortar_en=None):
+        self.contenido = contenido
+        self.etag = etag
+        self.cortar_en = cortar_en
+        self.peticiones = []
+
+    def __call__(self, url, stream=True, timeout=None, headers=None):
+        headers = headers or {}
+        self.peticiones.append(dict(headers))
+        respuesta = requests.Response()
+        respuesta.url = url
+        respuesta.headers['ETag'] = self.etag
+        cuerpo = self.contenido
+
+        if headers.get('If-None-Match') == self.etag:
+            respuesta.status_code = 304
+            cuerpo = b''
+        elif 'Range' in headers and headers.get('If-Range') == self.etag:
+            inicio = int(headers['Range'].split('=')[1].rstrip('-'))
+            if inicio >= len(self.contenido):
+                respuesta.status_code = 416
+                respuesta.headers['Content-Range'] = f"bytes */{len(self.contenido)}"
+                cuerpo = b''
+            else:
+                respuesta.status_code = 206
+                respuesta.headers['Content-Range'] = (
+                    f"bytes {inicio}-{len(self.contenido) - 1}/{len(self.contenido)}")
+                cuerpo = self.contenido[inicio:]
+        else:
+            respuesta.status_code = 200
+
+        respuesta.headers['Content-Length'] = str(len(cuerpo))
+        if self.cortar_en is not None and respuesta.status_code == 200:
+            respuesta.raw = CuerpoCortado(cuerpo, self.cortar_en)
+            self.cortar_en = None
+        else:
+            respuesta.raw = io.BytesIO(cuerpo)
+        return respuesta
+
+
+def _leer(ruta):
+    with open(ruta, 'rb') as f:
+        return f.read()
+
+
+def test_304_no_vuelve_a_descargar(tmp_path=None):
+    ruta = os.path.join(str(tmp_path) if tmp_path else tempfile.mkdtemp(), 'a.pdf')
+    servidor = ServidorFalso()
+    gestor = GestorDescargas(obtener=servidor, tam_bloque=100)
+
+    primero = gestor.descargar("https://anla.gov.co/a.pdf", ruta)
+    assert primero['estado'] == 'descargado'
+    assert _leer(ruta) == CONTENIDO
+    assert primero['manifiesto'] == {'etag': ETAG, 'last_modified': None, 'tamano': len(CONTENIDO)}
+
+    segundo = gestor.descargar("https://anla.gov.co/a.pdf", ruta, primero['manifiesto'])
+    assert segundo['estado'] == 'sin_cambios'
+    assert servidor.peticiones[-1] == {'If-None-Match': ETAG}
+
+
+def test_206_reanuda_una_descarga_cortada(tmp_path=None):
+    ruta = os.path.join(str(tmp_path) if tmp_path else tempfile.mkdtemp(), 'a.pdf')
+    servidor = ServidorFalso(cortar_en=700)
+    gestor = GestorDescargas(obtener=servidor, tam_bloque=100)
+
+    resultado = gestor.descargar("https://anla.gov.co/a.pdf", ruta)
+
+    assert resultado['estado'] == 'reanudado'
+    assert servidor.peticiones[1] == {'Range': 'bytes=700-', 'If-Range': ETAG}
+    assert resultado['bytes'] == len(CONTENIDO)
+    assert _leer(ruta) == CONTENIDO
+    assert not os.path.exists(ruta + SUFIJO_PARCIAL)
+
+
+def test_416_publica_un_part_completo(tmp_path=None):
+    ruta = os.path.join(str(tmp_path) if tmp_path else tempfile.mkdtemp(), 'a.pdf')
+    # Una ejecución anterior bajó todo pero se cortó antes del rename
+    with open(ruta + SUFIJO_PARCIAL, 'wb') as f:
+        f.write(CONTENIDO)
+    servidor = ServidorFalso()
+    gestor = GestorDescargas(obtener=servidor)
+
+    resultado = gestor.descargar("https://anla.gov.co/a.pdf", ruta, {'etag_parcial': ETAG})
+
+    assert resultado['estado'] == 'reanudado'
+    assert resultado['manifiesto']['tamano'] == len(CONTENIDO)
+    assert len(servidor.peticiones) == 1
+    assert _leer(ruta) == CONTENIDO
+
+
+def test_416_con_part_mas_largo_baja_el_archivo_entero(tmp_path=None):
+    ruta = os.path.join(str(tmp_path) if tmp_path else tempfile.mkdtemp(), 'a.pdf')
+    with open(ruta + SUFIJO_PARCIAL, 'wb') as f:
+        f.write(CONTENIDO + b'basura')
+    servidor = ServidorFalso()
+    gestor = GestorDescargas(obtener=servidor)
+
+    resultado = gestor.descargar("https://anla.gov.co/a.pdf", ruta, {'etag_parcial': ETAG})
+
+    assert resultado['estado'] == 'descargado'
+    assert 'Range' not in servidor.peticiones[-1]
+    assert _leer(ruta) == CONTENIDO
+
+
+if __name__ == '__main__':
+    test_304_no_vuelve_a_descargar()
+    test_206_reanuda_una_descarga_cortada()
+    test_416_publica_un_part_completo()
+    test_416_con_part_mas_largo_baja_el_archivo_entero()
+    print("OK")
@@ -0,0 +1,77 @@
+import time
+import threading
+
+from Helpers.limitadorHosts import LimitadorHosts
+
+
+def test_rafaga_y_tasa_por_host():
+    limitador = LimitadorHosts(tasa_por_host=20.0, rafaga=2)
+
+    inicio = time.monotonic()
+    for _ in range(4):
+        with limitador.turno("https://anla.gov.co/a"):
+            pass
+    # 2 de ráfaga + 2 a 20 por segundo
+    assert time.monotonic() - inicio >= 0.09
+
+    # Otro dominio tiene su propio bucket
+    inicio = time.monotonic()
+    with limitador.turno("https://otro.gov.co/"):
+        pass
+    assert time.monotonic() - inicio < 0.05
+
+
+def test_concurrencia_por_host():
+    limitador = LimitadorHosts(concurrencia_por_host=2, tasa_por_host=1000.0, rafaga=100)
+    activos = []
+    maximo = []
+    lock = threading.Lock()
+
+    def _peticion():
+        with limitador.turno("https://ANLA.gov.co/x"):
+            with lock:
+                activos.append(1)
+                maximo.append(len(activos))
+            time.sleep(0.05)
+            with lock:
+                activos.pop()
+
+    hilos = [threading.Thread(target=_peticion) for _ in range(6)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert max(maximo) == 2
+
+
+def test_aimd_frena_y_recupera():
+    url = "https://anla.gov.co/"
+    limitador = LimitadorHosts(tasa_por_host=4.0, latencia_objetivo=1.0, tasa_minima=0.5,
+                               incremento=0.5, suavizado=1.0)
+
+    limitador.registrar(url, 0.1, 503)
+    assert limitador.tasas()['anla.gov.co']['tasa'] == 2.0
+    # Respuestas que ya estaban en curso no vuelven a frenar en la misma ventana
+    limitador.registrar(url, 0.1, 429)
+    assert limitador.tasas()['anla.gov.co']['tasa'] == 2.0
+
+    # Respuestas rápidas suben de a poco hasta la tasa configurada
+    for _ in range(10):
+        limitador.registrar(url, 0.1, 200)
+    assert limitador.tasas()['anla.gov.co']['tasa'] == 4.0
+
+    # La latencia alta también frena, pero nunca por debajo de la mínima
+    limitador._hosts['anla.gov.co']['ultimo_freno'] = 0.0
+    limitador.registrar(url, 3.0, 200)
+    assert limitador.tasas()['anla.gov.co'] == {'tasa': 2.0, 'latencia': 3.0}
+    limitador._hosts['anla.gov.co']['tasa'] = 0.6
+    limitador._hosts['anla.gov.co']['ultimo_freno'] = 0.0
+    limitador.registrar(url, 3.0, None)
+    assert limitador.tasas()['anla.gov.co']['tasa'] == 0.5
+
+
+if __name__ == '__main__':
+    test_rafaga_y_tasa_por_host()
+    test_concurrencia_por_host()
+    test_aimd_frena_y_recupera()
+    print("OK")
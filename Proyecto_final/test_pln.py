@@ -0,0 +1,55 @@
+import numpy as np
+
+from Helpers.PLN import _top_k_por_bloques
+
+
+def _normalizados(filas: int, dimension: int, semilla: int) -> np.ndarray:
+    matriz = np.random.default_rng(semilla).standard_normal((filas, dimension)).astype(np.float32)
+    return matriz / np.linalg.norm(matriz, axis=1, keepdims=True)
+
+
+def test_top_k_por_bloques_igual_a_matriz_completa():
+    consultas = _normalizados(37, 16, 1)
+    corpus = _normalizados(53, 16, 2)
+    k = 5
+
+    # Bloques que no dividen exacto a m ni a n
+    indices, similitudes = _top_k_por_bloques(consultas, corpus, k, tam_bloque=8)
+
+    completa = consultas @ corpus.T
+    esperados = np.argsort(-completa, axis=1)[:, :k]
+    assert indices.shape == similitudes.shape == (37, k)
+    assert np.array_equal(indices, esperados)
+    assert np.allclose(similitudes, np.take_along_axis(completa, esperados, axis=1), atol=1e-6)
+    assert np.all(np.diff(similitudes, axis=1) <= 0)
+
+
+def test_top_k_por_bloques_excluye_la_propia_fila():
+    corpus = _normalizados(20, 8, 3)
+    excluir = np.arange(20)
+
+    indices, similitudes = _top_k_por_bloques(corpus, corpus, 3, tam_bloque=6, excluir=excluir)
+
+    completa = corpus @ corpus.T
+    np.fill_diagonal(completa, -np.inf)
+    assert not np.any(indices == excluir[:, None])
+    assert np.array_equal(indices, np.argsort(-completa, axis=1)[:, :3])
+
+
+def test_top_k_mayor_que_el_corpus():
+    consultas = _normalizados(4, 8, 4)
+    corpus = _normalizados(2, 8, 5)
+
+    indices, similitudes = _top_k_por_bloques(consultas, corpus, 3, tam_bloque=1)
+
+    # Las posiciones que sobran quedan en -1 con similitud -inf
+    assert np.all(indices[:, 2] == -1)
+    assert np.all(np.isneginf(similitudes[:, 2]))
+    assert np.all(np.sort(indices[:, :2], axis=1) == [0, 1])
+
+
+if __name__ == '__main__':
+    test_top_k_por_bloques_igual_a_matriz_completa()
+    test_top_k_por_bloques_excluye_la_propia_fila()
+    test_top_k_mayor_que_el_corpus()
+    print("OK")